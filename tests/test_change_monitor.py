@@ -0,0 +1,53 @@
+import sqlite3
+
+import web_scheduling_system as wss
+
+
+def make_monitor(tmp_path):
+    path = str(tmp_path / 'markers.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE Room (Room_ID INTEGER PRIMARY KEY, Capacity INTEGER)")
+    conn.execute("CREATE TABLE Teacher (F_ID INTEGER PRIMARY KEY, Last_Name TEXT)")
+    conn.executemany("INSERT INTO Room VALUES (?, ?)", [(1, 30), (2, 60)])
+    conn.commit()
+    wss.install_sqlite_change_tracking(conn, ['Room', 'Teacher'])
+    monitor = wss.TableChangeMonitor(wss.sqlite_connection(path), ['Room', 'Teacher'],
+                                     marker_sql=wss.SQLITE_CHANGE_MARKER_SQL)
+    return monitor, conn
+
+
+def test_first_poll_only_records_baseline(tmp_path):
+    monitor, _ = make_monitor(tmp_path)
+    assert monitor.poll() == []
+    assert set(monitor.markers) == {'Room', 'Teacher'}
+    assert monitor.poll() == []
+
+
+def test_insert_and_delete_are_detected_per_table(tmp_path):
+    monitor, conn = make_monitor(tmp_path)
+    monitor.poll()
+
+    conn.execute("INSERT INTO Teacher VALUES (7, 'Chan')")
+    conn.commit()
+    assert monitor.poll() == ['Teacher']
+
+    conn.execute("DELETE FROM Room WHERE Room_ID = 1")
+    conn.commit()
+    assert monitor.poll() == ['Room']
+    assert monitor.poll() == []
+
+
+def test_updates_and_count_preserving_rewrites_are_detected(tmp_path):
+    monitor, conn = make_monitor(tmp_path)
+    monitor.poll()
+
+    conn.execute("UPDATE Room SET Capacity = 45 WHERE Room_ID = 2")
+    conn.commit()
+    assert monitor.poll() == ['Room']
+
+    # Same row count and largest id as before
+    conn.execute("DELETE FROM Room WHERE Room_ID = 1")
+    conn.execute("INSERT INTO Room VALUES (1, 90)")
+    conn.commit()
+    assert monitor.poll() == ['Room']
+    assert monitor.poll() == []
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+import web_scheduling_system as wss
+
+
+class FakeConnection:
+    def __init__(self, counter):
+        self.counter = counter
+        self.healthy = True
+        self.closed = False
+
+    def cursor(self):
+        if not self.healthy:
+            raise RuntimeError("connection lost")
+        return self
+
+    def execute(self, sql, *params):
+        return self
+
+    def fetchall(self):
+        return [(1,)]
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.counter.closed()
+
+
+class ConnectionCounter:
+    """connect() for the pool that tracks how many connections are open at once"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.open = 0
+        self.peak = 0
+        self.connections = []
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self.lock:
+            self.open += 1
+            self.peak = max(self.peak, self.open)
+            conn = FakeConnection(self)
+            self.connections.append(conn)
+        return conn
+
+    def closed(self):
+        with self.lock:
+            self.open -= 1
+
+
+def hammer(pool, threads=12, checkouts=20, hold=0.001):
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(checkouts):
+                with pool.connection():
+                    time.sleep(hold)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return errors
+
+
+def test_pool_never_opens_more_than_max_size():
+    counter = ConnectionCounter(delay=0.002)
+    pool = wss.ConnectionPool(counter, max_size=3, timeout=5)
+    assert hammer(pool) == []
+    assert counter.peak <= 3
+    stats = pool.stats()
+    assert stats['open'] <= 3 and stats['checkouts'] == 12 * 20
+
+
+def test_replacing_stale_connections_keeps_within_max_size():
+    counter = ConnectionCounter(delay=0.002)
+    pool = wss.ConnectionPool(counter, max_size=2, timeout=5, health_check_idle=0)
+
+    def break_idle_connections():
+        while not done.is_set():
+            for conn in list(counter.connections):
+                conn.healthy = False
+            time.sleep(0.001)
+
+    done = threading.Event()
+    breaker = threading.Thread(target=break_idle_connections)
+    breaker.start()
+    try:
+        assert hammer(pool, threads=8, checkouts=10) == []
+    finally:
+        done.set()
+        breaker.join()
+    assert counter.peak <= 2
+    assert pool.stats()['open'] <= 2
+    assert pool.stats()['health_check_failures'] > 0
+
+
+def test_failed_connect_releases_its_slot():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        raise RuntimeError("server down")
+
+    pool = wss.ConnectionPool(connect, max_size=1, timeout=0.1)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            with pool.connection():
+                pass
+    assert len(attempts) == 3
+    assert pool.stats()['open'] == 0
+
+
+def test_checkout_times_out_when_every_connection_is_in_use():
+    pool = wss.ConnectionPool(ConnectionCounter(), max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(wss.ConnectionPoolTimeout):
+            with pool.connection():
+                pass
+    assert pool.stats()['timeouts'] == 1
@@ -0,0 +1,169 @@
+import threading
+import time
+
+import pytest
+
+import web_scheduling_system as wss
+
+
+class Workspace:
+    def __init__(self, token):
+        self.token = token
+
+
+def stepping_run(steps=5, delay=0.02, result=None):
+    """run(job) that reports progress at every step, like the solver loops do"""
+    def run(job):
+        for step in range(steps):
+            job.report('greedy', placed=step, total=steps)
+            job.emit('placed', {'placed': step + 1})
+            time.sleep(delay)
+        return dict(result or {'success': True, 'scheduled_count': steps})
+    return run
+
+
+def blocking_run(release):
+    def run(job):
+        while not release.wait(0.01):
+            job.report('greedy')
+        return {'success': True}
+    return run
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+def test_job_runs_to_a_result_with_progress_events():
+    jobs = wss.JobManager(max_workers=1)
+    job, outcome = jobs.submit(Workspace('a'), stepping_run())
+    assert outcome == 'queued'
+    job.future.result(timeout=5)
+
+    status = jobs.describe(jobs.get(job.job_id, 'a'), include_result=True)
+    assert status['status'] == 'succeeded'
+    assert status['result'] == {'success': True, 'scheduled_count': 5}
+    events, finished = job.wait_events(0, timeout=0)
+    assert finished
+    assert [event['event'] for event in events] == ['phase'] + ['placed'] * 5 + ['done']
+    assert jobs.get(job.job_id, 'someone-else') is None
+
+
+def test_failed_solve_is_reported_with_its_error():
+    jobs = wss.JobManager(max_workers=1)
+    job, _ = jobs.submit(Workspace('a'), stepping_run(1, result={'success': False, 'error': 'No classes selected'}))
+    job.future.result(timeout=5)
+    assert job.status == 'failed' and job.error == 'No classes selected'
+    assert 'result' not in job.status_dict(include_result=True)
+
+
+def test_cancel_stops_a_running_job_at_its_next_checkpoint():
+    jobs = wss.JobManager(max_workers=1)
+    release = threading.Event()
+    job, _ = jobs.submit(Workspace('a'), blocking_run(release))
+    wait_until(lambda: job.status == 'running')
+    jobs.cancel(job.job_id, 'a')
+    job.future.result(timeout=5)
+    assert job.status == 'cancelled'
+    assert job.status_dict()['cancel_requested']
+
+
+def test_cancel_of_a_queued_job_never_runs_it():
+    jobs = wss.JobManager(max_workers=1)
+    release = threading.Event()
+    running, _ = jobs.submit(Workspace('a'), blocking_run(release))
+    queued, _ = jobs.submit(Workspace('b'), stepping_run())
+    assert jobs.describe(queued)['queue_position'] == 1
+    jobs.cancel(queued.job_id, 'b')
+    assert queued.status == 'cancelled'
+    release.set()
+    running.future.result(timeout=5)
+    assert running.status == 'succeeded'
+
+
+def test_identical_requests_share_a_job_and_it_stops_only_when_all_cancel():
+    jobs = wss.JobManager(max_workers=1)
+    release = threading.Event()
+    job, _ = jobs.submit(Workspace('a'), blocking_run(release), key='same')
+    joined, outcome = jobs.submit(Workspace('b'), stepping_run(), key='same')
+    assert outcome == 'coalesced' and joined is job
+    assert jobs.submit(Workspace('a'), stepping_run(), key='other') == (job, 'busy')
+
+    jobs.cancel(job.job_id, 'a')
+    assert not job.cancel_requested.is_set()
+    jobs.cancel(job.job_id, 'b')
+    job.future.result(timeout=5)
+    assert job.status == 'cancelled'
+    assert jobs.close(job) == {'a', 'b'}
+
+
+def test_queue_limit_refuses_extra_jobs():
+    jobs = wss.JobManager(max_workers=1, max_queued=1)
+    release = threading.Event()
+    jobs.submit(Workspace('a'), blocking_run(release))
+    wait_until(lambda: jobs.stats()['jobs'].get('running') == 1)
+    assert jobs.submit(Workspace('b'), stepping_run())[1] == 'queued'
+    assert jobs.submit(Workspace('c'), stepping_run()) == (None, 'full')
+    release.set()
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two JobManagers on one SQLite job store, standing in for two worker processes"""
+    path = str(tmp_path / 'state.db')
+
+    def manager():
+        store = wss.SqlJobStore(wss.sqlite_connection(path), wss.JOB_TABLE_SQL['sqlite'], poll_seconds=0.02)
+        return wss.JobManager(max_workers=1, shared=store, publish_seconds=0.02)
+    return manager(), manager()
+
+
+def test_shared_job_is_visible_with_events_and_result_on_another_worker(workers):
+    owner, other = workers
+    job, _ = owner.submit(Workspace('a'), stepping_run())
+    seen = other.get(job.job_id, 'a')
+    assert isinstance(seen, wss.SharedJob)
+    assert other.get(job.job_id, 'someone-else') is None
+
+    names, position = [], 0
+    while True:
+        events, finished = seen.wait_events(position, timeout=5)
+        names += [event['event'] for event in events]
+        position += len(events)
+        if finished and not events:
+            break
+    assert names == ['phase'] + ['placed'] * 5 + ['done']
+    status = other.describe(other.get(job.job_id, 'a'), include_result=True)
+    assert status['status'] == 'succeeded'
+    assert status['result'] == {'success': True, 'scheduled_count': 5}
+
+
+def test_shared_job_is_joined_and_cancelled_from_another_worker(workers):
+    owner, other = workers
+    release = threading.Event()
+    job, _ = owner.submit(Workspace('a'), blocking_run(release), key='same')
+    joined, outcome = other.submit(Workspace('b'), stepping_run(), key='same')
+    assert outcome == 'coalesced' and joined.job_id == job.job_id
+    assert other.submit(Workspace('b'), stepping_run(), key='other')[1] == 'busy'
+
+    other.cancel(job.job_id, 'a')
+    other.cancel(job.job_id, 'b')
+    job.future.result(timeout=5)
+    assert job.status == 'cancelled'
+    assert job.workspace_tokens == {'a', 'b'}
+    wait_until(lambda: other.get(job.job_id, 'b').status == 'cancelled')
+
+
+def test_shared_job_without_heartbeat_counts_as_failed(workers, tmp_path):
+    owner, _ = workers
+    job = wss.ScheduleJob('a')
+    owner.shared.insert(job)  # Recorded, but no worker publishes it
+    store = wss.SqlJobStore(wss.sqlite_connection(str(tmp_path / 'state.db')), wss.JOB_TABLE_SQL['sqlite'],
+                            stale_seconds=0)
+    time.sleep(0.01)
+    assert store.load(job.job_id).status == 'failed'
+    assert store.unfinished() == []
@@ -0,0 +1,243 @@
+import random
+from collections import namedtuple
+
+import pytest
+
+import web_scheduling_system as wss
+
+Instance = namedtuple('Instance', ['capacities', 'requirements', 'teachers', 'n_slots', 'n_teachers'])
+
+
+def random_instance(seed):
+    """Tight random timetable: about as many classes as room-slots, some too big for every room"""
+    rng = random.Random(seed)
+    n_rooms, n_slots, n_teachers = rng.randint(4, 10), rng.randint(5, 12), rng.randint(5, 15)
+    capacities = sorted(rng.choice((20, 30, 40, 60, 90)) for _ in range(n_rooms))
+    n_classes = int(n_rooms * n_slots * rng.uniform(0.85, 1.1))
+    requirements = [rng.choice((10, 20, 30, 40, 60, 90, 120)) for _ in range(n_classes)]
+    teachers = [rng.randrange(-1, n_teachers) for _ in range(n_classes)]
+    return Instance(capacities, requirements, teachers, n_slots, n_teachers)
+
+
+def new_grid(instance):
+    return wss.OccupancyGrid(range(len(instance.capacities)), range(instance.n_slots), range(instance.n_teachers))
+
+
+def new_mask(instance):
+    return wss.FeasibilityMask(instance.capacities, instance.requirements, instance.teachers,
+                               [True] * instance.n_slots)
+
+
+def class_nbrs(instance):
+    return [1000 + i for i in range(len(instance.requirements))]
+
+
+def assert_valid(instance, placements, unplaced, grid=None):
+    """Every class placed or unplaced once; no room or teacher double-booked; every room big enough"""
+    assert sorted(list(placements) + list(unplaced)) == list(range(len(instance.requirements)))
+    rooms_used, teachers_used = set(), set()
+    for i, (room, slot) in placements.items():
+        assert instance.capacities[room] >= instance.requirements[i]
+        assert (room, slot) not in rooms_used
+        rooms_used.add((room, slot))
+        if instance.teachers[i] >= 0:
+            assert (instance.teachers[i], slot) not in teachers_used
+            teachers_used.add((instance.teachers[i], slot))
+    if grid is not None:
+        assert int(grid.room_busy.sum()) == len(placements)
+        for i, (room, slot) in placements.items():
+            assert grid.room_owner[room, slot] == 1000 + i
+
+
+def run_greedy(instance, seed):
+    grid = new_grid(instance)
+    mask = new_mask(instance)
+    rng = random.Random(seed)
+    placements, unplaced = {}, []
+    for i, class_nbr in enumerate(class_nbrs(instance)):
+        placement = wss.place_first_fit(grid, int(mask.room_starts[i]), instance.teachers[i], class_nbr, rng)
+        if placement is None:
+            unplaced.append(i)
+        else:
+            placements[i] = placement
+    return placements, unplaced, grid
+
+
+def run_dsatur(instance, **options):
+    grid = new_grid(instance)
+    solver = wss.DsaturSolver(grid, new_mask(instance).room_starts, instance.teachers, class_nbrs(instance), **options)
+    placements, unplaced = solver.solve()
+    return placements, unplaced, grid, solver
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_greedy_placements_are_valid_and_above_the_lower_bound(seed):
+    instance = random_instance(seed)
+    placements, unplaced, grid = run_greedy(instance, seed)
+    assert_valid(instance, placements, unplaced, grid)
+    assert new_mask(instance).conflict_lower_bounds()['flow'] <= len(unplaced)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_dsatur_placements_are_valid_and_above_the_lower_bound(seed):
+    instance = random_instance(seed)
+    placements, unplaced, grid, solver = run_dsatur(instance)
+    assert_valid(instance, placements, unplaced, grid)
+    assert new_mask(instance).conflict_lower_bounds()['flow'] <= len(unplaced)
+    assert solver.backtracks <= solver.max_backtracks
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_flow_bound_is_the_tightest_lower_bound(seed):
+    bounds = new_mask(random_instance(seed)).conflict_lower_bounds()
+    assert bounds['flow'] >= max(bounds['capacity'], bounds['teacher'])
+
+
+def test_dsatur_skips_repair_for_classes_no_move_can_place():
+    # One room, two slots: class 2 fits no room, and teacher 0 has three classes for two slots
+    instance = Instance([30], [10, 10, 50, 10], [0, 0, 1, 0], 2, 2)
+    placements, unplaced, grid, solver = run_dsatur(instance)
+    assert_valid(instance, placements, unplaced, grid)
+    assert len(unplaced) == 2 and 2 in unplaced
+    assert solver.repairs_skipped == 2
+    assert solver.backtracks == 0
+
+
+def test_dsatur_repair_moves_a_blocking_class():
+    # The small class sits in the only room big enough for the large one; the small room is free
+    instance = Instance([20, 60], [10, 50], [-1, -1], 1, 0)
+    grid = new_grid(instance)
+    solver = wss.DsaturSolver(grid, new_mask(instance).room_starts, instance.teachers, class_nbrs(instance))
+    solver._assign(0, (1, 0))
+    assert solver._repair(1, 1, {1})
+    assert solver.placements == {0: (0, 0), 1: (1, 0)}
+    assert solver.backtracks == 1
+
+
+def test_hopcroft_karp_finds_a_maximum_matching_and_keeps_initial_pairs():
+    # Left 0 can use 0 or 1, left 1 only 0, left 2 only 1: all three cannot fit into two rooms
+    adjacency = [[0, 1], [0], [1]]
+    match_left, match_right = wss.hopcroft_karp(adjacency, 2, [1, -1, -1])
+    assert sum(v >= 0 for v in match_left) == 2
+    assert match_left[0] >= 0  # Matched initially, so never unmatched
+    for u, v in enumerate(match_left):
+        if v >= 0:
+            assert v in adjacency[u] and match_right[v] == u
+
+
+def test_max_flow_matches_a_known_network():
+    edges = [(0, 1, 3), (0, 2, 2), (1, 2, 1), (1, 3, 2), (2, 3, 3)]
+    assert wss.max_flow(4, edges, 0, 3) == 5
+
+
+def test_min_waste_assignment_seats_largest_classes_first():
+    # Rooms in ascending capacity; room starts are the first row each class fits
+    assert wss.min_waste_assignment([0, 2, 1], 3) == [0, 2, 1]
+    assert wss.min_waste_assignment([2, 2], 3) is None
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_room_matching_keeps_placements_valid_and_never_loses_sections(seed):
+    instance = random_instance(seed)
+    placements, unplaced, grid = run_greedy(instance, seed)
+    mask = new_mask(instance)
+    matched, still_unplaced, stats = wss.match_rooms_per_slot(
+        grid, instance.capacities, mask.room_starts.tolist(), instance.requirements, instance.teachers,
+        class_nbrs(instance), placements, unplaced
+    )
+    assert_valid(instance, matched, still_unplaced, grid)
+    assert set(placements) <= set(matched)
+    assert len(still_unplaced) == len(unplaced) - stats['added_sections']
+    assert mask.conflict_lower_bounds()['flow'] <= len(still_unplaced)
+
+
+def restart_problem(instance):
+    mask = new_mask(instance)
+    return {
+        'n_rooms': len(instance.capacities),
+        'n_slots': instance.n_slots,
+        'n_teachers': instance.n_teachers,
+        'capacities': instance.capacities,
+        'room_starts': mask.room_starts.tolist(),
+        'requirements': instance.requirements,
+        'teachers': instance.teachers,
+        'class_nbrs': class_nbrs(instance)
+    }
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_greedy_restart_is_valid_and_reproducible(seed):
+    instance = random_instance(seed)
+    problem = restart_problem(instance)
+    conflicts, wasted, returned_seed, placements = wss._run_greedy_restart(seed, problem)
+    unplaced = [i for i in range(len(instance.requirements)) if i not in placements]
+    assert_valid(instance, placements, unplaced)
+    assert returned_seed == seed and conflicts == len(unplaced)
+    assert wasted == sum(instance.capacities[room] - instance.requirements[i] for i, (room, _) in placements.items())
+    assert wss._run_greedy_restart(seed, problem) == (conflicts, wasted, seed, placements)
+
+
+@pytest.mark.parametrize('value, expected', [(1, 1), ('3', 3), (2.0, 2), (500, 64)])
+def test_count_option_accepts_positive_whole_numbers_up_to_the_cap(value, expected):
+    assert wss.count_option(value, 'restarts', 64) == expected
+
+
+@pytest.mark.parametrize('value', [0, -2, 2.5, True, None, 'x', float('nan'), float('inf')])
+def test_count_option_rejects_everything_else(value):
+    with pytest.raises(ValueError):
+        wss.count_option(value, 'restarts', 64)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_local_search_stays_valid_never_adds_conflicts_and_keeps_to_its_budget(seed):
+    instance = random_instance(seed)
+    placements, unplaced, grid = run_greedy(instance, seed)
+    improver = wss.LocalSearchImprover(
+        grid, new_mask(instance).room_starts.tolist(), instance.teachers, class_nbrs(instance),
+        instance.requirements, instance.capacities, placements, unplaced, seed
+    )
+    improved, still_unplaced, stats = improver.run(0.05)
+    assert_valid(instance, improved, still_unplaced, grid)
+    assert len(still_unplaced) <= len(unplaced)
+    assert new_mask(instance).conflict_lower_bounds()['flow'] <= len(still_unplaced)
+    assert stats['seconds'] < 0.05 + 0.5
+
+
+def test_local_search_returns_at_once_when_no_unplaced_class_can_be_placed():
+    # Class 0 fits no room; classes 1 and 2 share teacher 0, who has one slot
+    instance = Instance([30], [50, 10, 10], [-1, 0, 0], 1, 1)
+    placements, unplaced, grid = run_greedy(instance, 0)
+    improver = wss.LocalSearchImprover(
+        grid, new_mask(instance).room_starts.tolist(), instance.teachers, class_nbrs(instance),
+        instance.requirements, instance.capacities, placements, unplaced, 0
+    )
+    improved, still_unplaced, stats = improver.run(2.0)
+    assert_valid(instance, improved, still_unplaced, grid)
+    assert stats['iterations'] == 0
+    assert stats['seconds'] < 0.5
+
+
+def test_local_search_stops_when_no_move_is_kept():
+    # The only pair is held by a kept session the search may not move
+    instance = Instance([30], [10], [-1], 1, 0)
+    grid = new_grid(instance)
+    grid.occupy(0, 0, -1, 999)
+    improver = wss.LocalSearchImprover(
+        grid, new_mask(instance).room_starts.tolist(), instance.teachers, class_nbrs(instance),
+        instance.requirements, instance.capacities, {}, [0], 0, stall_iterations=100
+    )
+    _, still_unplaced, stats = improver.run(5.0)
+    assert still_unplaced == [0]
+    assert stats['stalled'] and stats['iterations'] == 100
+    assert stats['seconds'] < 0.5
+
+
+@pytest.mark.parametrize('value, expected', [(0, 0.0), ('1.5', 1.5), (600, 30)])
+def test_seconds_option_accepts_finite_non_negative_budgets_up_to_the_cap(value, expected):
+    assert wss.seconds_option(value, 'improve_seconds', 30) == expected
+
+
+@pytest.mark.parametrize('value', [-1, True, None, 'x', 'nan', float('inf')])
+def test_seconds_option_rejects_everything_else(value):
+    with pytest.raises(ValueError):
+        wss.seconds_option(value, 'improve_seconds', 30)
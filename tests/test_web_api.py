@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+import web_scheduling_system as wss
+
+
+def new_api(monkeypatch):
+    """Flask test client and its WebSchedulingSystem, with no database behind them"""
+    created = []
+
+    class Scheduler(wss.WebSchedulingSystem):
+        def __init__(self):
+            super().__init__()
+            created.append(self)
+
+        def start_warmup(self, *args, **kwargs):
+            pass
+
+    monkeypatch.setattr(wss, 'WebSchedulingSystem', Scheduler)
+    app = wss.create_web_api()
+    return app.test_client(), created[0]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    return new_api(monkeypatch)
+
+
+def test_refused_schedule_request_changes_nothing_and_the_job_solves_its_own_copy(api):
+    client, scheduler = api
+    release, seen = threading.Event(), []
+
+    def generate_timetable(**options):
+        release.wait(5)
+        seen.append((list(scheduler.selections['classes']), set(scheduler.disabled_time_slots)))
+        return {'success': True}
+
+    scheduler.generate_timetable = generate_timetable
+    started = client.post('/api/generate_schedule', json={'classes': [1, 2]})
+    assert started.status_code == 202
+    token = started.headers['X-Workspace-Token']
+    workspace = scheduler.workspaces.get(token)
+    disabled = set(workspace.disabled_time_slots)
+
+    refused = client.post('/api/generate_schedule', json={'classes': [3]})
+    assert refused.status_code == 409
+    assert workspace.selections['classes'] == [1, 2]
+
+    edited = client.post('/api/disable_time_slots', json={'time_slot_patterns': ['Monday_08:00-09:15']})
+    assert edited.status_code == 200
+    workspace.selections['classes'].append(4)
+    release.set()
+    scheduler.jobs.get(started.json['job_id'], token).future.result(timeout=5)
+    assert seen == [([1, 2], disabled)]
+
+
+@pytest.mark.parametrize('seed', ['7', 1.5, True, [1], {'a': 1}])
+def test_schedule_request_with_a_bad_seed_is_refused_before_queueing(api, seed):
+    client, scheduler = api
+    response = client.post('/api/generate_schedule', json={'classes': [1], 'seed': seed})
+    assert response.status_code == 400
+    assert response.json == {'success': False, 'error': 'seed must be a whole number'}
+    assert scheduler.jobs.stats()['jobs'] == {}
+
+
+def test_schedule_request_passes_a_whole_number_seed_to_the_job(api):
+    client, scheduler = api
+    seen = []
+    scheduler.generate_timetable = lambda **options: seen.append(options['seed']) or {'success': True}
+    response = client.post('/api/generate_schedule', json={'classes': [1], 'seed': 42})
+    assert response.status_code == 202
+    scheduler.jobs.get(response.json['job_id'], response.headers['X-Workspace-Token']).future.result(timeout=5)
+    assert seen == [42]
+
+
+def finished_job(client, scheduler):
+    """Job id of a run that emitted three placed events before it finished"""
+    def generate_timetable(**options):
+        job = scheduler.request_state.job
+        for k in range(3):
+            job.emit('placed', {'placed': k + 1})
+        return {'success': True}
+
+    scheduler.generate_timetable = generate_timetable
+    response = client.post('/api/generate_schedule', json={'classes': [1]})
+    scheduler.jobs.get(response.json['job_id'], response.headers['X-Workspace-Token']).future.result(timeout=5)
+    return response.json['job_id']
+
+
+def event_ids(response):
+    return [int(line[4:]) for line in response.get_data(as_text=True).splitlines() if line.startswith('id: ')]
+
+
+@pytest.mark.parametrize('last_event_id, expected_from', [(None, 0), ('1', 2), ('-5', 0), ('garbage', 0), ('', 0)])
+def test_event_stream_resumes_after_last_event_id_and_restarts_on_a_bad_one(api, last_event_id, expected_from):
+    client, scheduler = api
+    job_id = finished_job(client, scheduler)
+    headers = {} if last_event_id is None else {'Last-Event-ID': last_event_id}
+    response = client.get(f'/api/jobs/{job_id}/events', headers=headers)
+    assert response.status_code == 200
+    all_ids = event_ids(client.get(f'/api/jobs/{job_id}/events'))
+    assert event_ids(response) == all_ids[expected_from:]
+
+
+def test_routes_without_planner_state_answer_while_the_database_is_down(monkeypatch):
+    monkeypatch.setattr(wss, 'STATE_BACKEND', 'sqlserver')
+    client, scheduler = new_api(monkeypatch)
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        raise RuntimeError("server down")
+
+    scheduler.pool.connect = connect
+    for url in ('/', '/api/db_pool_status', '/api/cache_status'):
+        assert client.get(url).status_code == 200
+    assert attempts == []
+
+    # Planner routes still load the workspace, and need the database for it
+    assert client.get('/api/get_time_slot_status').status_code == 500
+    assert attempts
@@ -0,0 +1,87 @@
+import pytest
+
+import web_scheduling_system as wss
+
+
+def new_workspace(token):
+    return wss.PlannerWorkspace(token, {'Monday_08:00'})
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    def make(**limits):
+        return wss.SqlWorkspaceStore(new_workspace, wss.sqlite_connection(str(tmp_path / 'state.db')),
+                                     wss.WORKSPACE_TABLE_SQL['sqlite'], **limits)
+    return make
+
+
+def test_sqlite_store_round_trips_a_workspace_between_instances(sqlite_store):
+    first, second = sqlite_store(), sqlite_store()  # Two worker processes sharing one file
+    workspace = first.get()
+    workspace.selections.update(term='2401', classes=[101, 102])
+    workspace.disabled_time_slots.add('Friday_13:00')
+    workspace.current_schedule_results = {'generated': True, 'scheduled_sessions': [{'Class_Nbr': 101}]}
+    workspace.dirty = True
+    first.release(workspace)
+
+    loaded = second.get(workspace.token)
+    assert loaded.token == workspace.token
+    assert loaded.selections == workspace.selections
+    assert loaded.disabled_time_slots == {'Monday_08:00', 'Friday_13:00'}
+    assert loaded.current_schedule_results == workspace.current_schedule_results
+    assert not loaded.dirty
+
+
+def test_unknown_tokens_get_a_fresh_workspace_or_none(sqlite_store):
+    store = sqlite_store()
+    workspace = store.get('forged-token')
+    assert workspace.token != 'forged-token'
+    assert store.get('forged-token', create=False) is None
+    assert store.get(workspace.token, create=False).token == workspace.token
+
+
+def test_concurrent_writes_to_different_parts_are_merged(sqlite_store):
+    store = sqlite_store()
+    token = store.get().token
+    job_copy = store.get(token)  # Read when the job started
+    request_copy = store.get(token)  # Planner edits while it runs
+
+    request_copy.selections['classes'] = [7]
+    request_copy.disabled_time_slots.add('Tuesday_09:30')
+    request_copy.dirty = True
+    store.release(request_copy)
+
+    job_copy.current_schedule_results = {'generated': True, 'scheduled_sessions': [7]}
+    job_copy.dirty = True
+    store.release(job_copy)
+
+    stored = store.get(token)
+    assert stored.selections['classes'] == [7]
+    assert 'Tuesday_09:30' in stored.disabled_time_slots
+    assert stored.current_schedule_results['scheduled_sessions'] == [7]
+
+    # A copy read before the job finished does not revert its results
+    request_copy.selections['term'] = '2402'
+    request_copy.dirty = True
+    store.release(request_copy)
+    stored = store.get(token)
+    assert stored.selections['term'] == '2402'
+    assert stored.current_schedule_results['scheduled_sessions'] == [7]
+
+
+def test_sqlite_store_evicts_least_recently_used_beyond_max_count(sqlite_store):
+    store = sqlite_store(max_count=2)
+    tokens = [store.get().token for _ in range(4)]
+    assert store.stats()['workspaces'] == 2
+    assert store.get(tokens[0], create=False) is None
+    assert store.get(tokens[-1], create=False) is not None
+
+
+def test_memory_store_evicts_and_never_adopts_client_tokens():
+    store = wss.WorkspaceStore(new_workspace, max_count=2)
+    first = store.get()
+    assert store.get(first.token) is first
+    assert store.get('made-up').token != 'made-up'
+    store.get()
+    assert store.get(first.token, create=False) is None
+    assert store.stats()['evicted_lru'] == 1
@@ -1,12 +1,23 @@
-import pandas as pd
+import numpy as np
 import pyodbc
 from datetime import datetime, timedelta
+import copy
 import random
-from collections import defaultdict
-import sqlalchemy
-from sqlalchemy import create_engine
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+import hashlib
 import json
+import math
 import os
+import pickle
+import secrets
+import sqlite3
+import sys
+from bisect import bisect_left
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
 
 # ===============================================
 #  Database Configuration Macros
@@ -32,17 +43,2597 @@ DB_PASSWORD = "SchedulingApp2025!"
 # For Windows Authentication, set to True and ensure service account has DB permissions
 USE_WINDOWS_AUTH = False
 
+# Connection pool shared by all request threads
+DB_POOL_SIZE = 8               # Max open pyodbc connections
+DB_POOL_TIMEOUT = 10           # Seconds to wait for a free connection before failing
+DB_POOL_HEALTH_CHECK_IDLE = 30  # Re-check connections idle for longer than this (seconds)
+DB_BULK_CHUNK_SIZE = 1000      # Rows per executemany batch when saving results
+
+# Resource cache invalidation: per-table change markers polled in the background.
+# CHECKSUM_AGG also catches in-place updates. SQLite has no checksum aggregate, so
+# its marker is a per-table version that triggers bump on every insert, update and
+# delete (see install_sqlite_change_tracking).
+CACHE_POLL_SECONDS = 60        # 0 disables the background watcher
+CHANGE_MARKER_SQL = "SELECT COUNT_BIG(*), CHECKSUM_AGG(BINARY_CHECKSUM(*)) FROM {table}"
+SQLITE_CHANGE_MARKER_SQL = "SELECT COALESCE(MAX(Version), 0) FROM ChangeVersion WHERE Table_Name = '{table}'"
+SQLITE_CHANGE_TRACKING_SQL = """
+CREATE TABLE IF NOT EXISTS ChangeVersion (
+    Table_Name TEXT PRIMARY KEY,
+    Version INTEGER NOT NULL
+)
+"""
+SQLITE_CHANGE_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS {table}_Change_{event} AFTER {event} ON {table}
+BEGIN
+    INSERT OR IGNORE INTO ChangeVersion (Table_Name, Version) VALUES ('{table}', 0);
+    UPDATE ChangeVersion SET Version = Version + 1 WHERE Table_Name = '{table}';
+END
+"""
+
+# Startup: the web server comes up without touching the database; the cache
+# warm-up retries in the background until SQL Server answers
+DB_LOGIN_TIMEOUT = 5           # Seconds pyodbc waits for a login before failing
+DB_CONNECT_RETRY_INITIAL = 1   # First warm-up retry delay (seconds), doubled after each failure
+DB_CONNECT_RETRY_MAX = 60      # Cap on the warm-up retry delay (seconds)
+
+# Local copy of the reference data (resource lists + catalog), rewritten after
+# every load and served on the next start until its change markers are checked.
+# None disables it; bump the format number when the cached columns change.
+REFERENCE_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'reference_snapshot.pkl')
+REFERENCE_SNAPSHOT_FORMAT = 1
+
+# Per-planner workspaces (selections, disabled slots, latest results), keyed by a session cookie
+WORKSPACE_COOKIE = 'planner_workspace'
+WORKSPACE_MAX_COUNT = 64                 # Most workspaces kept at once (least recently used go first)
+WORKSPACE_MAX_BYTES = 256 * 1024 * 1024  # Budget for all workspaces' measured sizes
+WORKSPACE_IDLE_SECONDS = 4 * 60 * 60     # Drop workspaces unused for this long
+# Where workspaces live: 'memory' (one process only), 'sqlite' (STATE_SQLITE_PATH, worker
+# processes on one machine) or 'sqlserver' (PlannerWorkspace table, any number of hosts)
+STATE_BACKEND = 'memory'
+STATE_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'planner_state.db')
+
+# Limits on the solver options a /api/generate_schedule request may ask for
+MULTISTART_MAX_RESTARTS = 64   # Seeded greedy passes per run; larger requests are capped
+MULTISTART_MAX_WORKERS = 8     # Processes per multi-start run (also capped at the CPU count)
+IMPROVE_SECONDS_MAX = 30       # Longest local-search budget (improve_seconds) a request may ask for
+
+# Background schedule generation (/api/generate_schedule -> /api/jobs/<id>)
+JOB_WORKERS = 2                # Timetable runs executing at once; more wait in the queue
+JOB_RETENTION_SECONDS = 3600   # Keep finished jobs (and their results) this long
+JOB_MAX_RETAINED = 50          # ... and at most this many of them
+JOB_EVENT_BATCH_SIZE = 50      # Classes per 'placed'/'conflict' event on the progress stream
+JOB_MAX_QUEUED = 8             # Jobs allowed to wait for a worker; more are refused with 429
+JOB_PUBLISH_SECONDS = 1        # 'sqlite'/'sqlserver' backends: how often running jobs are written for other workers
+JOB_STALE_SECONDS = 60         # ... and how long without a write before a job counts as lost with its worker
+EXPORT_CONCURRENCY = 2         # Excel exports running at once, per worker process
+EXPORT_MAX_WAITING = 4         # Exports allowed to wait for a slot (per process); more are refused with 429
+EXPORT_WAIT_SECONDS = 60       # Longest an export waits for a slot before it is refused
+
+# ===============================================
+#  Database Connection Pool
+# ===============================================
+
+
+class ConnectionPoolTimeout(Exception):
+    """No pooled connection became free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of pyodbc connections
+
+    connection() checks a connection out for a with-block: idle connections
+    are reused most-recently-returned first, new ones are opened while fewer
+    than max_size exist, otherwise the caller waits up to timeout seconds.
+    A connection idle for more than health_check_idle seconds is probed with
+    SELECT 1 on checkout and replaced if the probe fails. Uncommitted work
+    is rolled back on return, and connections that raised a pyodbc.Error
+    are discarded instead of being reused.
+    """
+
+    def __init__(self, connect, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 health_check_idle=DB_POOL_HEALTH_CHECK_IDLE, min_size=0):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self.lock = threading.Condition()
+        self.idle = []  # (connection, returned_at) stack
+        self.open_count = 0
+        self.metrics = {
+            'checkouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'health_check_failures': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0
+        }
+
+        # Optionally open min_size connections up front (the default is fully lazy)
+        for _ in range(min(min_size, max_size)):
+            self.idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        conn = self.connect()
+        with self.lock:
+            self.open_count += 1
+            self.metrics['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.open_count -= 1
+            self.metrics['discarded'] += 1
+            self.lock.notify()
+
+    def _healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        started = time.monotonic()
+        waited = False
+        with self.lock:
+            while not self.idle and self.open_count >= self.max_size:
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.metrics['timeouts'] += 1
+                    raise ConnectionPoolTimeout(
+                        f"No database connection free after {self.timeout}s (pool size {self.max_size})"
+                    )
+                waited = True
+                self.lock.wait(remaining)
+
+            if waited:
+                wait = time.monotonic() - started
+                self.metrics['waits'] += 1
+                self.metrics['wait_seconds_total'] += wait
+                self.metrics['wait_seconds_max'] = max(self.metrics['wait_seconds_max'], wait)
+            self.metrics['checkouts'] += 1
+
+            if self.idle:
+                conn, returned_at = self.idle.pop()
+            else:
+                conn, returned_at = None, None
+                self.open_count += 1  # Reserve the slot before connecting outside the lock
+                self.metrics['created'] += 1
+
+        if conn is None:
+            try:
+                return self.connect()
+            except Exception:
+                with self.lock:
+                    self.open_count -= 1
+                    self.lock.notify()
+                raise
+
+        if time.monotonic() - returned_at > self.health_check_idle and not self._healthy(conn):
+            print("Discarding stale pooled database connection")
+            try:
+                conn.close()
+            except Exception:
+                pass
+            # Reuse the stale connection's slot: open_count stays put, so no
+            # waiter can claim it between closing and reconnecting
+            with self.lock:
+                self.metrics['health_check_failures'] += 1
+                self.metrics['discarded'] += 1
+                self.metrics['created'] += 1
+            try:
+                return self.connect()
+            except Exception:
+                with self.lock:
+                    self.open_count -= 1
+                    self.lock.notify()
+                raise
+        return conn
+
+    def _checkin(self, conn):
+        with self.lock:
+            self.idle.append((conn, time.monotonic()))
+            self.lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out for the duration of a with-block"""
+        conn = self._checkout()
+        try:
+            yield conn
+        except pyodbc.Error:
+            self._discard(conn)
+            raise
+        except BaseException:
+            self._rollback_and_return(conn)
+            raise
+        else:
+            self._rollback_and_return(conn)
+
+    def _rollback_and_return(self, conn):
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        self._checkin(conn)
+
+    def stats(self):
+        """Pool size and wait metrics"""
+        with self.lock:
+            stats = dict(self.metrics)
+            stats.update({
+                'max_size': self.max_size,
+                'open': self.open_count,
+                'idle': len(self.idle),
+                'in_use': self.open_count - len(self.idle),
+                'timeout_seconds': self.timeout
+            })
+        stats['wait_seconds_total'] = round(stats['wait_seconds_total'], 4)
+        stats['wait_seconds_max'] = round(stats['wait_seconds_max'], 4)
+        return stats
+
+    def close(self):
+        """Close all idle connections"""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+def id_list_sql(sql_type='INT'):
+    """IN-list fragment for an ID set passed as one JSON array parameter (see id_list_param)
+
+    Used as `WHERE col IN {id_list_sql()}` with id_list_param(ids) as the
+    parameter, OPENJSON unpacks the array server-side (compatibility level
+    130+). The statement text, and so its cached plan, is the same for any
+    number of IDs, and there is no 2100-parameter ceiling.
+    """
+    return f"(SELECT CAST([value] AS {sql_type}) FROM OPENJSON(?))"
+
+
+def id_list_param(values):
+    """JSON array parameter for id_list_sql, duplicates dropped"""
+    return json.dumps(list(dict.fromkeys(values)), default=str)
+
+
+# ===============================================
+#  Catalog Snapshot
+# ===============================================
+
+
+class CatalogSnapshot:
+    """Read-only, indexed in-memory copy of CourseCatalog / ClassSection / CourseOffering
+
+    Built from three row lists (dicts keyed by column name) and never
+    mutated afterwards (apart from memoised lookup answers), so request
+    threads can read it without locking;
+    a refresh builds a new snapshot with the next version and swaps it in.
+    Rows with an empty Course_Code (or Subject, for the subject lists) are
+    left out, as in the SQL the lookups replace.
+    """
+
+    def __init__(self, catalog_rows, section_rows, offering_rows, version=1):
+        self.version = version
+        self.loaded_at = datetime.now()
+
+        # Acad_Group -> Subject -> {Course_Code}, and Subject -> {Acad_Group} without the code filter
+        self.subject_codes_by_group = defaultdict(lambda: defaultdict(set))
+        self.groups_by_subject = defaultdict(set)
+        # Subject -> sorted distinct (Course_Code, Course_Title)
+        courses_by_subject = defaultdict(set)
+        for row in catalog_rows:
+            subject, code, group = row['Subject'], row['Course_Code'], row['Acad_Group']
+            if subject is None:
+                continue
+            self.groups_by_subject[subject].add(group)
+            if code is None or code == '':
+                continue
+            self.subject_codes_by_group[group][subject].add(code)
+            courses_by_subject[subject].add((code, row['Course_Title']))
+        self.courses_by_subject = {
+            subject: sorted(pairs, key=lambda pair: (pair[0], pair[1] or ''))
+            for subject, pairs in courses_by_subject.items()
+        }
+        # Subject -> {Acad_Group with at least one Course_Code} for cross-departmental lookups
+        self.coded_groups_by_subject = defaultdict(set)
+        for group, subjects in self.subject_codes_by_group.items():
+            for subject in subjects:
+                self.coded_groups_by_subject[subject].add(group)
+        self.cross_departmental_cache = {}
+
+        # Course_Code -> active sections ordered by Section
+        self.sections_by_code = defaultdict(list)
+        for row in section_rows:
+            self.sections_by_code[row['Course_Code']].append(row)
+        for sections in self.sections_by_code.values():
+            sections.sort(key=lambda row: row['Section'] or '')
+
+        # Catalog -> offerings ordered by Offer_Nbr
+        self.offerings_by_catalog = defaultdict(list)
+        for row in offering_rows:
+            self.offerings_by_catalog[row['Catalog']].append(row)
+        for offerings in self.offerings_by_catalog.values():
+            offerings.sort(key=lambda row: row['Offer_Nbr'] or 0)
+
+        self.counts = {
+            'catalog_rows': len(catalog_rows),
+            'sections': len(section_rows),
+            'offerings': len(offering_rows),
+            'acad_groups': len(self.subject_codes_by_group),
+            'subjects': len(self.courses_by_subject)
+        }
+
+    def subjects(self, acad_groups):
+        """Subject rows with distinct Course_Code counts, ordered by Acad_Group then Subject"""
+        rows = []
+        for group in sorted(set(acad_groups), key=str):
+            for subject, codes in sorted(self.subject_codes_by_group.get(group, {}).items()):
+                rows.append({'Subject': subject, 'Acad_Group': group, 'Course_Count': len(codes)})
+        return rows
+
+    def courses(self, subject):
+        """Distinct (Course_Code, Course_Title) rows of a subject"""
+        return [{'Course_Code': code, 'Course_Title': title} for code, title in self.courses_by_subject.get(subject, [])]
+
+    def sections(self, course_codes):
+        """Active sections of the given courses, ordered by Course_Code then Section"""
+        rows = []
+        for code in sorted(set(course_codes), key=str):
+            rows.extend(dict(row) for row in self.sections_by_code.get(code, []))
+        return rows
+
+    def offerings(self, catalog):
+        """Offerings of a catalog entry, ordered by Offer_Nbr"""
+        return [dict(row) for row in self.offerings_by_catalog.get(catalog, [])]
+
+    def cross_departmental_subjects(self, acad_groups):
+        """Subjects offered by more than one of the given groups, most shared first
+
+        Answered from the Subject -> {Acad_Group} inverted index and memoised
+        per group set (the snapshot never changes, so entries stay valid).
+        """
+        groups = frozenset(acad_groups)
+        rows = self.cross_departmental_cache.get(groups)
+        if rows is None:
+            rows = []
+            for subject, subject_groups in self.coded_groups_by_subject.items():
+                shared = subject_groups & groups
+                if len(shared) > 1:
+                    rows.append({
+                        'Subject': subject,
+                        'Course_Count': len(set().union(*(self.subject_codes_by_group[g][subject] for g in shared))),
+                        'Group_Count': len(shared),
+                        'Academic_Groups': sorted(self.groups_by_subject[subject] & groups, key=str)
+                    })
+            rows.sort(key=lambda row: (-row['Group_Count'], row['Subject']))
+            if len(self.cross_departmental_cache) >= 256:
+                self.cross_departmental_cache.clear()
+            self.cross_departmental_cache[groups] = rows
+        return [dict(row, Academic_Groups=list(row['Academic_Groups'])) for row in rows]
+
+    def status(self):
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at.isoformat(),
+            **self.counts
+        }
+
+
+class TableChangeMonitor:
+    """Detects table changes by polling one cheap marker row per table
+
+    connection is a callable returning a context manager that yields a
+    DB-API connection: ConnectionPool.connection with CHANGE_MARKER_SQL, or
+    sqlite_connection(path) with SQLITE_CHANGE_MARKER_SQL as a stand-in, once
+    install_sqlite_change_tracking has added its triggers to the tables.
+    The first poll only records the baseline markers.
+    """
+
+    def __init__(self, connection, tables, marker_sql=CHANGE_MARKER_SQL):
+        self.connection = connection
+        self.tables = list(tables)
+        self.marker_sql = marker_sql
+        self.markers = {}
+        self.last_poll = None
+
+    def poll(self):
+        """Read every table's marker - returns the tables that changed since the last poll"""
+        markers = {}
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for table in self.tables:
+                cursor.execute(self.marker_sql.format(table=table))
+                markers[table] = tuple(cursor.fetchone())
+
+        changed = [table for table in self.tables if table in self.markers and self.markers[table] != markers[table]]
+        self.markers = markers
+        self.last_poll = datetime.now()
+        return changed
+
+
+class ReferenceSnapshotFile:
+    """Versioned on-disk copy of the cached reference data, for warm restarts
+
+    The payload holds, per cached entry (a resource option or 'catalog'),
+    its rows as (columns, tuples) plus the change markers of its source
+    tables as they were before the rows were read. A reader treats an entry
+    as current only while those markers still match the database. Writes go
+    to a temp file that is then renamed over the old one, so a crash never
+    leaves a half-written snapshot behind. Files written with another
+    format_version are ignored.
+    """
+
+    def __init__(self, path, format_version=REFERENCE_SNAPSHOT_FORMAT):
+        self.path = path
+        self.format_version = format_version
+
+    def save(self, entries):
+        """Write {name: {'markers': ..., 'rows': ...}} - returns the file size in bytes"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {'format': self.format_version, 'written_at': datetime.now(), 'entries': entries}
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+        return os.path.getsize(self.path)
+
+    def load(self):
+        """The saved payload, or None if there is no usable snapshot"""
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable reference snapshot {self.path}: {str(e)}")
+            return None
+        if not isinstance(payload, dict) or payload.get('format') != self.format_version:
+            return None
+        return payload
+
+
+class ResourceTable:
+    """Read-only rows of one cached resource list (terms, rooms, ...)
+
+    Rows are namedtuples - no per-row dict, and fields read as attributes.
+    key names the column indexed by get(). The JSON payload for the list
+    endpoint is serialized once per load and reused by every request.
+    """
+
+    __slots__ = ('name', 'columns', 'rows', 'key', 'by_key', '_json')
+
+    def __init__(self, name, columns, rows, key=None):
+        record = namedtuple(f'{name.title().replace("_", "")}Row', columns, rename=True)
+        self.name = name
+        self.columns = tuple(columns)
+        self.rows = [record._make(row) for row in rows]
+        self.key = key
+        self.by_key = {}
+        if key is not None:
+            pos = self.columns.index(key)
+            for row in self.rows:
+                self.by_key.setdefault(row[pos], row)
+        self._json = None
+
+    @classmethod
+    def from_cursor(cls, name, cursor, key=None):
+        """Build from an executed DB-API cursor"""
+        return cls(name, [col[0] for col in cursor.description], cursor.fetchall(), key)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __reduce__(self):
+        # The row class is built per table, so pickle plain tuples (and drop the JSON cache)
+        return ResourceTable, (self.name, self.columns, [tuple(row) for row in self.rows], self.key)
+
+    def get(self, key):
+        """Row whose key column equals key, or None"""
+        return self.by_key.get(key)
+
+    def column(self, name):
+        """All values of one column, in row order"""
+        pos = self.columns.index(name)
+        return [row[pos] for row in self.rows]
+
+    def records(self, rows=None):
+        """Rows as plain dicts (the shape the API has always returned)"""
+        return [dict(zip(self.columns, row)) for row in (self.rows if rows is None else rows)]
+
+    def to_json(self, dumps):
+        """Serialized records, built with dumps on first use and then cached"""
+        if self._json is None:
+            self._json = dumps(self.records())
+        return self._json
+
+
+# ===============================================
+#  Planner Workspaces
+# ===============================================
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate deep size in bytes of nested lists/tuples/sets/dicts and their values"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    return size
+
+
+class PlannerWorkspace:
+    """One planner's selections, disabled time slots and latest schedule results"""
+
+    PARTS = ('selections', 'disabled_time_slots', 'current_schedule_results')
+
+    def __init__(self, token, disabled_time_slots):
+        self.token = token
+        self.created_at = datetime.now()
+        self.last_used = time.monotonic()
+        self.selections = {
+            'term': None,
+            'session': None,
+            'campus': None,
+            'acad_group': None,
+            'subject': None,
+            'classes': [],
+            'teachers': [],
+            'rooms': []
+        }
+        self.disabled_time_slots = disabled_time_slots
+        self.current_schedule_results = {
+            'scheduled_sessions': [],
+            'conflicts': [],
+            'class_details': {},
+            'generated': False,
+            'timestamp': None
+        }
+        self.size_bytes = 0
+        self.dirty = True  # Size needs recounting / state needs writing back
+        self.stored = None  # Payload this copy was read from or last written as (shared-state backends)
+
+    def dump(self):
+        """Serialized state, for the shared-state backends"""
+        return pickle.dumps({
+            'created_at': self.created_at,
+            'selections': self.selections,
+            'disabled_time_slots': self.disabled_time_slots,
+            'current_schedule_results': self.current_schedule_results
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, token, payload):
+        """Workspace rebuilt from dump() output"""
+        state = pickle.loads(payload)
+        workspace = cls(token, state['disabled_time_slots'])
+        workspace.created_at = state['created_at']
+        workspace.selections = state['selections']
+        workspace.current_schedule_results = state['current_schedule_results']
+        workspace.size_bytes = len(payload)
+        workspace.stored = payload
+        return workspace
+
+    def rebase(self, payload):
+        """Adopt a newer stored state for every part this copy has not changed since it was read
+
+        Parts changed here win, so a finished job only contributes its
+        schedule results and a request only the selections it edited.
+        """
+        base = pickle.loads(self.stored) if self.stored is not None else None
+        current = pickle.loads(payload)
+        for part in self.PARTS:
+            if base is not None and getattr(self, part) == base[part]:
+                setattr(self, part, current[part])
+        self.stored = payload
+
+    def measure(self):
+        """Recount size_bytes (kept as it was if another request is changing the workspace)"""
+        try:
+            self.size_bytes = deep_sizeof([self.selections, self.disabled_time_slots, self.current_schedule_results])
+            self.dirty = False
+        except RuntimeError:  # Container resized mid-count
+            pass
+        return self.size_bytes
+
+
+class WorkspaceStore:
+    """LRU store of PlannerWorkspaces keyed by an opaque session token
+
+    get() hands out the workspace for a known token, or a new one under a
+    freshly generated token (client-chosen tokens are never adopted).
+    Workspaces idle for more than idle_seconds are dropped, then the least
+    recently used ones while there are more than max_count or their
+    measured sizes add up to more than max_bytes. The workspace being
+    handed out is never evicted by its own get/release.
+    """
+
+    def __init__(self, factory, max_count=WORKSPACE_MAX_COUNT, max_bytes=WORKSPACE_MAX_BYTES,
+                 idle_seconds=WORKSPACE_IDLE_SECONDS):
+        self.factory = factory
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.lock = threading.Lock()
+        self.workspaces = OrderedDict()  # token -> workspace, least recently used first
+        self.metrics = {'created': 0, 'evicted_idle': 0, 'evicted_lru': 0}
+
+    def get(self, token=None, create=True):
+        """Workspace for token, creating one (with a new token) if it is unknown or was evicted
+
+        With create=False an unknown token gives None instead.
+        """
+        with self.lock:
+            workspace = self.workspaces.get(token) if token else None
+            if workspace is None:
+                if not create:
+                    return None
+                workspace = self.factory(secrets.token_urlsafe(24))
+                self.workspaces[workspace.token] = workspace
+                self.metrics['created'] += 1
+            else:
+                self.workspaces.move_to_end(token)
+            workspace.last_used = time.monotonic()
+            self._evict(keep=workspace)
+        return workspace
+
+    def release(self, workspace):
+        """Recount a workspace changed by a request and evict if the store is now over budget"""
+        if workspace.dirty:
+            workspace.measure()
+        with self.lock:
+            workspace.last_used = time.monotonic()
+            self._evict(keep=workspace)
+
+    def _evict(self, keep):
+        # Caller holds self.lock
+        cutoff = time.monotonic() - self.idle_seconds
+        for token in [t for t, ws in self.workspaces.items() if ws.last_used < cutoff and ws is not keep]:
+            del self.workspaces[token]
+            self.metrics['evicted_idle'] += 1
+
+        total = sum(ws.size_bytes for ws in self.workspaces.values())
+        for token in list(self.workspaces):
+            if len(self.workspaces) <= self.max_count and total <= self.max_bytes:
+                break
+            workspace = self.workspaces[token]
+            if workspace is keep:
+                continue
+            del self.workspaces[token]
+            total -= workspace.size_bytes
+            self.metrics['evicted_lru'] += 1
+
+    def stats(self):
+        """Workspace count, memory accounting and eviction counters"""
+        with self.lock:
+            sizes = [ws.size_bytes for ws in self.workspaces.values()]
+            stats = dict(self.metrics)
+        stats.update({
+            'workspaces': len(sizes),
+            'total_bytes': sum(sizes),
+            'largest_bytes': max(sizes, default=0),
+            'max_count': self.max_count,
+            'max_bytes': self.max_bytes,
+            'idle_seconds': self.idle_seconds
+        })
+        return stats
+
+
+class SqlWorkspaceStore:
+    """WorkspaceStore kept in a database table, so every worker process sees the same workspaces
+
+    connection is a callable returning a context manager that yields a
+    DB-API connection (ConnectionPool.connection for SQL Server, or
+    sqlite_connection for a local file). Each get() reads a private copy
+    of the workspace; release() writes it back if the request changed it,
+    merging with anything written since the copy was read (see release).
+    Eviction follows the same rules as the in-memory store, using
+    Last_Used (epoch seconds) and the stored payload size.
+    """
+
+    def __init__(self, factory, connection, create_sql, max_count=WORKSPACE_MAX_COUNT,
+                 max_bytes=WORKSPACE_MAX_BYTES, idle_seconds=WORKSPACE_IDLE_SECONDS):
+        self.factory = factory
+        self.connection = connection
+        self.create_sql = create_sql
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.table_ready = False
+
+    def _cursor_for(self, conn):
+        cursor = conn.cursor()
+        if not self.table_ready:
+            cursor.execute(self.create_sql)
+            conn.commit()
+            self.table_ready = True
+        return cursor
+
+    def get(self, token=None, create=True):
+        """Workspace for token, creating one (with a new token) if it is unknown or was evicted
+
+        With create=False an unknown token gives None instead.
+        """
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            row = None
+            if token:
+                cursor.execute("SELECT Payload FROM PlannerWorkspace WHERE Token = ?", (token,))
+                row = cursor.fetchone()
+            if row is not None:
+                cursor.execute("UPDATE PlannerWorkspace SET Last_Used = ? WHERE Token = ?", (time.time(), token))
+                conn.commit()
+                workspace = PlannerWorkspace.load(token, row[0])
+                workspace.dirty = False
+                return workspace
+        if not create:
+            return None
+        workspace = self.factory(secrets.token_urlsafe(24))
+        self.release(workspace)
+        return workspace
+
+    def release(self, workspace):
+        """Write a workspace changed by a request back and evict if the store is now over budget
+
+        The update only applies while the row still holds the payload this
+        copy was read from. If another request or a finished job wrote it
+        in between, the copy is rebased onto the stored row (keeping only
+        the parts it changed itself) and the write is retried.
+        """
+        if not workspace.dirty:
+            return
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            while True:
+                payload = workspace.dump()
+                cursor.execute("UPDATE PlannerWorkspace SET Payload = ?, Size_Bytes = ?, Last_Used = ? "
+                               "WHERE Token = ? AND Payload = ?",
+                               (payload, len(payload), time.time(), workspace.token, workspace.stored))
+                if cursor.rowcount:
+                    break
+                cursor.execute("SELECT Payload FROM PlannerWorkspace WHERE Token = ?", (workspace.token,))
+                row = cursor.fetchone()
+                if row is None:  # New, or evicted meanwhile
+                    cursor.execute("INSERT INTO PlannerWorkspace (Token, Payload, Size_Bytes, Last_Used) VALUES (?, ?, ?, ?)",
+                                   (workspace.token, payload, len(payload), time.time()))
+                    break
+                workspace.rebase(row[0])
+            self._evict(cursor, keep=workspace.token)
+            conn.commit()
+        workspace.stored = payload
+        workspace.size_bytes = len(payload)
+        workspace.dirty = False
+
+    def _evict(self, cursor, keep):
+        cursor.execute("DELETE FROM PlannerWorkspace WHERE Last_Used < ? AND Token <> ?",
+                       (time.time() - self.idle_seconds, keep))
+        cursor.execute("SELECT Token, Size_Bytes FROM PlannerWorkspace ORDER BY Last_Used DESC")
+        rows = cursor.fetchall()
+        total = sum(size for _, size in rows)
+        count = len(rows)
+        # Oldest first, skipping the workspace being released
+        for token, size in reversed(rows):
+            if count <= self.max_count and total <= self.max_bytes:
+                break
+            if token == keep:
+                continue
+            cursor.execute("DELETE FROM PlannerWorkspace WHERE Token = ?", (token,))
+            count -= 1
+            total -= size
+
+    def stats(self):
+        """Workspace count and memory accounting"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("SELECT COUNT(*), SUM(Size_Bytes), MAX(Size_Bytes) FROM PlannerWorkspace")
+            count, total, largest = cursor.fetchone()
+        return {
+            'workspaces': count,
+            'total_bytes': total or 0,
+            'largest_bytes': largest or 0,
+            'max_count': self.max_count,
+            'max_bytes': self.max_bytes,
+            'idle_seconds': self.idle_seconds
+        }
+
+
+WORKSPACE_TABLE_SQL = {
+    'sqlite': """
+    CREATE TABLE IF NOT EXISTS PlannerWorkspace (
+        Token TEXT PRIMARY KEY, Payload BLOB NOT NULL, Size_Bytes INTEGER NOT NULL, Last_Used REAL NOT NULL
+    )
+    """,
+    'sqlserver': """
+    IF OBJECT_ID('dbo.PlannerWorkspace', 'U') IS NULL
+    CREATE TABLE dbo.PlannerWorkspace (
+        Token VARCHAR(64) NOT NULL PRIMARY KEY, Payload VARBINARY(MAX) NOT NULL,
+        Size_Bytes INT NOT NULL, Last_Used FLOAT NOT NULL
+    )
+    """
+}
+
+
+def sqlite_connection(path):
+    """Connection factory for a SQLite file, in the shape SqlWorkspaceStore expects"""
+    @contextmanager
+    def connection():
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    return connection
+
+
+def install_sqlite_change_tracking(conn, tables):
+    """Add the triggers behind SQLITE_CHANGE_MARKER_SQL to each table (idempotent)"""
+    conn.execute(SQLITE_CHANGE_TRACKING_SQL)
+    for table in tables:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(SQLITE_CHANGE_TRIGGER_SQL.format(table=table, event=event))
+    conn.commit()
+
+
+def create_workspace_store(backend, factory, db_connection=None):
+    """WorkspaceStore for STATE_BACKEND: 'memory', 'sqlite' (STATE_SQLITE_PATH) or 'sqlserver'"""
+    if backend == 'memory':
+        return WorkspaceStore(factory)
+    if backend == 'sqlite':
+        directory = os.path.dirname(STATE_SQLITE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return SqlWorkspaceStore(factory, sqlite_connection(STATE_SQLITE_PATH), WORKSPACE_TABLE_SQL['sqlite'])
+    if backend == 'sqlserver':
+        return SqlWorkspaceStore(factory, db_connection, WORKSPACE_TABLE_SQL['sqlserver'])
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r} (expected 'memory', 'sqlite' or 'sqlserver')")
+
+
+# ===============================================
+#  Background Schedule Jobs
+# ===============================================
+
+
+class JobCancelled(Exception):
+    """Raised at a progress checkpoint of a job whose cancellation was requested"""
+
+
+class ScheduleJob:
+    """State of one background timetable run, updated by the solver through report()
+
+    Everything that happens to the job is also appended to events (phase
+    changes, batched placements and conflicts, the final status), which
+    /api/jobs/<id>/events streams to the browser; wait_events() blocks
+    until there is something new.
+    """
+
+    def __init__(self, workspace_token, key=None):
+        self.job_id = secrets.token_urlsafe(12)
+        self.workspace_token = workspace_token
+        self.key = key  # Identical requests (same key) share this job, see JobManager.submit
+        self.workspace_tokens = {workspace_token}  # The submitter, then every workspace that joined
+        self.accepting = True  # Still open to followers
+        self.cancel_votes = set()
+        self.status = 'queued'  # queued -> running -> succeeded / failed / cancelled
+        self.phase = 'queued'
+        self.placed = 0
+        self.total = 0
+        self.conflicts = 0
+        self.created_at = datetime.now()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = threading.Event()
+        self.future = None
+        self.events = []
+        self.events_changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def report(self, phase, placed=None, total=None, conflicts=None, cancellable=True):
+        """Record progress; raises JobCancelled here if the job was cancelled and may still stop"""
+        if cancellable and self.cancel_requested.is_set():
+            raise JobCancelled()
+        phase_changed = phase != self.phase
+        self.phase = phase
+        if total is not None:
+            self.total = total
+        if placed is not None:
+            self.placed = placed
+        if conflicts is not None:
+            self.conflicts = conflicts
+        if phase_changed:
+            self.emit('phase', self.status_dict())
+
+    def emit(self, event, data):
+        """Append an event for the stream and wake its readers"""
+        with self.events_changed:
+            self.events.append({'id': len(self.events), 'event': event, 'data': data})
+            self.events_changed.notify_all()
+
+    def wait_events(self, position, timeout):
+        """Events from index position on, waiting up to timeout seconds for one - returns (events, finished)"""
+        with self.events_changed:
+            if position >= len(self.events) and not self.done:
+                self.events_changed.wait(timeout)
+            return self.events[position:], self.done
+
+    def finish(self, status, error=None):
+        """Record the final status and emit the closing 'done' event"""
+        with self.events_changed:  # Readers must never see the job done without its 'done' event
+            self.error = error
+            self.finished = time.monotonic()
+            self.phase = 'done' if status == 'succeeded' else status
+            self.status = status
+            self.emit('done', self.status_dict())
+
+    def status_dict(self, include_result=False):
+        """JSON-ready job status (and the result once it succeeded, if asked for)"""
+        if self.started is None:
+            elapsed = 0
+        else:
+            elapsed = (self.finished or time.monotonic()) - self.started
+        status = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'phase': self.phase,
+            'placed': self.placed,
+            'total': self.total,
+            'percent_placed': round(100.0 * self.placed / self.total, 1) if self.total else 0.0,
+            'conflicts': self.conflicts,
+            'elapsed_seconds': round(elapsed, 2),
+            'created_at': self.created_at.isoformat(),
+            'cancel_requested': self.cancel_requested.is_set(),
+            'error': self.error
+        }
+        if include_result and self.status == 'succeeded':
+            status['result'] = self.result
+        return status
+
+
+class PlacementStream:
+    """Batches the placements of a solver loop into 'placed' / 'conflict' job events
+
+    add() is called once per class and only appends to a list; every
+    batch_size classes the batch is turned into session previews (the
+    fields the timetable grid shows) and emitted with throughput counters.
+    Each flush is also a cancellation checkpoint for the job. preview marks
+    events from a pass whose placements may still be thrown away (the greedy
+    pass of engine='dsatur').
+    """
+
+    def __init__(self, job, phase, classes_data, assigned_teachers, room_index, time_slots,
+                 placed=0, batch_size=JOB_EVENT_BATCH_SIZE, preview=False):
+        self.job = job
+        self.phase = phase
+        self.preview = preview
+        self.classes_data = classes_data
+        self.assigned_teachers = assigned_teachers
+        self.room_index = room_index
+        self.time_slots = time_slots
+        self.batch_size = batch_size
+        self.pending = []
+        self.placed = placed
+        self.conflicts = 0
+        self.processed = 0
+        self.started = time.perf_counter()
+
+    def add(self, i, placement):
+        """Record the outcome for class i (placement None for a conflict)"""
+        self.pending.append((i, placement))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Emit the pending batch"""
+        if not self.pending:
+            return
+        sessions, conflicts = [], []
+        for i, placement in self.pending:
+            class_info = self.classes_data[i]
+            if placement is None:
+                conflicts.append({
+                    'class_nbr': class_info['Class_Nbr'],
+                    'course_code': class_info.get('Course_Code'),
+                    'section': class_info.get('Section')
+                })
+                continue
+            room_row, slot = placement
+            time_slot = self.time_slots[slot]
+            sessions.append({
+                'class_nbr': class_info['Class_Nbr'],
+                'course_code': class_info.get('Course_Code'),
+                'section': class_info.get('Section'),
+                'teacher': self.assigned_teachers[i] or '',
+                'room': self.room_index.sorted_rooms[room_row].Room_ID,
+                'day': time_slot['day'],
+                'time': f"{time_slot['start_time']}-{time_slot['end_time']}"
+            })
+        self.processed += len(self.pending)
+        self.pending = []
+        self.placed += len(sessions)
+        self.conflicts += len(conflicts)
+
+        elapsed = time.perf_counter() - self.started
+        counters = {
+            'phase': self.phase,
+            'preview': self.preview,
+            'placed': self.placed,
+            'conflicts': self.conflicts,
+            'total': self.job.total,
+            'classes_per_second': round(self.processed / elapsed, 1) if elapsed > 0 else None
+        }
+        if sessions:
+            self.job.emit('placed', dict(counters, sessions=sessions))
+        if conflicts:
+            self.job.emit('conflict', dict(counters, classes=conflicts))
+        self.job.report(self.phase, placed=self.placed, conflicts=self.conflicts)
+
+
+class AdmissionRejected(Exception):
+    """An expensive request was refused because its admission queue is full"""
+
+    def __init__(self, message, waiting, max_waiting):
+        super().__init__(message)
+        self.waiting = waiting
+        self.max_waiting = max_waiting
+
+
+class AdmissionGate:
+    """At most limit callers inside admit() at once, and at most max_waiting queued for a slot
+
+    Callers beyond that, or waiting longer than timeout seconds, get
+    AdmissionRejected instead of piling more load onto the database.
+    The counts are per process: with N worker processes up to N * limit
+    callers run at once, so size the limits for the whole deployment.
+    """
+
+    def __init__(self, name, limit, max_waiting, timeout):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.lock = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.metrics = {'admitted': 0, 'queued': 0, 'rejected': 0}
+
+    @contextmanager
+    def admit(self):
+        """Hold one slot for the duration of a with-block"""
+        with self.lock:
+            if self.active >= self.limit:
+                if self.waiting >= self.max_waiting:
+                    self.metrics['rejected'] += 1
+                    raise AdmissionRejected(f"Too many {self.name} requests queued, try again shortly",
+                                            self.waiting, self.max_waiting)
+                self.waiting += 1
+                self.metrics['queued'] += 1
+                deadline = time.monotonic() + self.timeout
+                try:
+                    while self.active >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.metrics['rejected'] += 1
+                            raise AdmissionRejected(f"No {self.name} slot free after {self.timeout}s",
+                                                    self.waiting, self.max_waiting)
+                        self.lock.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.metrics['admitted'] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.lock.notify()
+
+    def stats(self):
+        """Slots in use, callers waiting and admission counters"""
+        with self.lock:
+            return dict(self.metrics, active=self.active, waiting=self.waiting,
+                        limit=self.limit, max_waiting=self.max_waiting)
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; callers arriving while it runs share its outcome
+
+    Only callers in the same process share: another worker process runs
+    its own copy of the computation.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> {'done': Event, 'result', 'error'}
+
+    def do(self, key, fn):
+        """fn() for the first caller with this key - returns (result, shared); errors are re-raised to everyone"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+        else:
+            try:
+                call['result'] = fn()
+            except Exception as e:
+                call['error'] = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call['done'].set()
+        if call['error'] is not None:
+            raise call['error']
+        return call['result'], not leader
+
+
+class SharedJob:
+    """A job as last published to a SqlJobStore, for workers other than the one running it
+
+    Offers what the /api/jobs routes use from ScheduleJob; wait_events()
+    polls the store instead of waiting on a condition.
+    """
+
+    def __init__(self, store, job_id, state, tokens):
+        self.store = store
+        self.job_id = job_id
+        self.state = state  # ScheduleJob.status_dict() as published
+        self.status = state['status']
+        self.workspace_tokens = tokens
+
+    @property
+    def done(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def status_dict(self, include_result=False):
+        status = dict(self.state)
+        if include_result and self.status == 'succeeded':
+            status['result'] = self.store.result(self.job_id)
+        return status
+
+    def wait_events(self, position, timeout):
+        """Events from index position on, polling up to timeout seconds for one - returns (events, finished)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.load(self.job_id)  # Status first: a finished job's 'done' event is already stored
+            finished = job is None or job.done
+            events = self.store.events(self.job_id, position)
+            remaining = deadline - time.monotonic()
+            if events or finished or remaining <= 0:
+                return events, finished
+            time.sleep(min(self.store.poll_seconds, remaining))
+
+
+class SqlJobStore:
+    """Schedule jobs published to database tables, so every worker process can serve them
+
+    The worker running a job inserts it on submit and republishes its
+    status, new events and heartbeat every JOB_PUBLISH_SECONDS (see
+    JobManager). Other workers read it back as a SharedJob, join it when an
+    identical request arrives, and record cancel votes for its owner to
+    pick up. A queued or running job whose heartbeat is older than
+    stale_seconds belonged to a worker that went away and counts as failed.
+    connection is a callable returning a context manager that yields a
+    DB-API connection, as for SqlWorkspaceStore.
+    """
+
+    UNFINISHED = ('queued', 'running')
+
+    def __init__(self, connection, create_sql, stale_seconds=JOB_STALE_SECONDS, poll_seconds=JOB_PUBLISH_SECONDS):
+        self.connection = connection
+        self.create_sql = create_sql
+        self.stale_seconds = stale_seconds
+        self.poll_seconds = poll_seconds
+        self.table_ready = False
+
+    def _cursor_for(self, conn):
+        cursor = conn.cursor()
+        if not self.table_ready:
+            for statement in self.create_sql:
+                cursor.execute(statement)
+            conn.commit()
+            self.table_ready = True
+        return cursor
+
+    @staticmethod
+    def _tokens(text):
+        return set(json.loads(text))
+
+    def insert(self, job):
+        """Record a newly submitted job"""
+        now = time.time()
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute(
+                "INSERT INTO PlannerJob (Job_ID, Job_Key, Status, Accepting, Tokens, Cancel_Votes, Created, Updated, Payload) "
+                "VALUES (?, ?, ?, 1, ?, '[]', ?, ?, ?)",
+                (job.job_id, job.key, job.status, json.dumps(sorted(job.workspace_tokens)), now, now,
+                 pickle.dumps(job.status_dict(), protocol=pickle.HIGHEST_PROTOCOL))
+            )
+            conn.commit()
+
+    def publish(self, job, status, events, result=None):
+        """Write a job's status, heartbeat, new events (and final result) - returns (tokens, cancel votes)"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("UPDATE PlannerJob SET Status = ?, Updated = ?, Payload = ? WHERE Job_ID = ?",
+                           (status['status'], time.time(), pickle.dumps(status, protocol=pickle.HIGHEST_PROTOCOL),
+                            job.job_id))
+            if result is not None:
+                cursor.execute("UPDATE PlannerJob SET Result = ? WHERE Job_ID = ?",
+                               (pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), job.job_id))
+            if events:
+                cursor.executemany("INSERT INTO PlannerJobEvent (Job_ID, Event_ID, Payload) VALUES (?, ?, ?)",
+                                   [(job.job_id, event['id'], pickle.dumps(event, protocol=pickle.HIGHEST_PROTOCOL))
+                                    for event in events])
+            cursor.execute("SELECT Tokens, Cancel_Votes FROM PlannerJob WHERE Job_ID = ?", (job.job_id,))
+            row = cursor.fetchone()
+            conn.commit()
+        if row is None:
+            return set(), set()
+        return self._tokens(row[0]), self._tokens(row[1])
+
+    def unfinished(self):
+        """Queued and running jobs with a live heartbeat, oldest first, as dicts"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute(
+                "SELECT Job_ID, Job_Key, Status, Accepting, Tokens FROM PlannerJob "
+                "WHERE Status IN (?, ?) AND Updated >= ? ORDER BY Created",
+                self.UNFINISHED + (time.time() - self.stale_seconds,)
+            )
+            rows = cursor.fetchall()
+        return [{'job_id': job_id, 'key': key, 'status': status, 'accepting': bool(accepting),
+                 'tokens': self._tokens(tokens)} for job_id, key, status, accepting, tokens in rows]
+
+    def _update_members(self, job_id, change, require_accepting=False):
+        """Apply change(tokens, votes) to a job's member/vote sets with a compare-and-set - returns the new sets"""
+        condition = " AND Accepting = 1" if require_accepting else ""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            while True:
+                cursor.execute("SELECT Tokens, Cancel_Votes FROM PlannerJob WHERE Job_ID = ? AND Status IN (?, ?)"
+                               + condition, (job_id,) + self.UNFINISHED)
+                row = cursor.fetchone()
+                if row is None:
+                    return None
+                tokens, votes = self._tokens(row[0]), self._tokens(row[1])
+                change(tokens, votes)
+                cursor.execute("UPDATE PlannerJob SET Tokens = ?, Cancel_Votes = ? "
+                               "WHERE Job_ID = ? AND Tokens = ? AND Cancel_Votes = ?" + condition,
+                               (json.dumps(sorted(tokens)), json.dumps(sorted(votes)), job_id, row[0], row[1]))
+                if cursor.rowcount:
+                    conn.commit()
+                    return tokens, votes
+
+    def join(self, job_id, token):
+        """Add a workspace to a job still taking followers - returns False if it no longer is"""
+        def change(tokens, votes):
+            tokens.add(token)
+            votes.discard(token)
+        return self._update_members(job_id, change, require_accepting=True) is not None
+
+    def vote_cancel(self, job_id, token):
+        """Record a workspace's cancel vote - returns (tokens, votes), or None if the job is finished"""
+        return self._update_members(job_id, lambda tokens, votes: votes.add(token))
+
+    def close(self, job_id):
+        """Stop a job taking followers - returns the workspaces that joined it"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("UPDATE PlannerJob SET Accepting = 0 WHERE Job_ID = ?", (job_id,))
+            cursor.execute("SELECT Tokens FROM PlannerJob WHERE Job_ID = ?", (job_id,))
+            row = cursor.fetchone()
+            conn.commit()
+        return self._tokens(row[0]) if row is not None else set()
+
+    def load(self, job_id):
+        """SharedJob for job_id, or None if it is unknown or was pruned"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("SELECT Status, Updated, Payload, Tokens FROM PlannerJob WHERE Job_ID = ?", (job_id,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        status, updated, payload, tokens = row
+        state = pickle.loads(payload)
+        if status in self.UNFINISHED and updated < time.time() - self.stale_seconds:
+            state.update(status='failed', phase='failed',
+                         error='The worker process running this job stopped responding')
+        return SharedJob(self, job_id, state, self._tokens(tokens))
+
+    def events(self, job_id, position):
+        """Published events of a job from index position on"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("SELECT Payload FROM PlannerJobEvent WHERE Job_ID = ? AND Event_ID >= ? ORDER BY Event_ID",
+                           (job_id, position))
+            rows = cursor.fetchall()
+        return [pickle.loads(payload) for payload, in rows]
+
+    def result(self, job_id):
+        """Result of a succeeded job"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("SELECT Result FROM PlannerJob WHERE Job_ID = ?", (job_id,))
+            row = cursor.fetchone()
+        return pickle.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def prune(self, retention_seconds, max_retained):
+        """Drop jobs finished (or lost) more than retention_seconds ago, and the oldest beyond max_retained"""
+        cutoff = time.time() - retention_seconds
+        stale = time.time() - self.stale_seconds
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("SELECT Job_ID, Status, Updated FROM PlannerJob ORDER BY Updated DESC")
+            finished = [(job_id, updated) for job_id, status, updated in cursor.fetchall()
+                        if status not in self.UNFINISHED or updated < stale]
+            expired = [job_id for k, (job_id, updated) in enumerate(finished)
+                       if updated < cutoff or k >= max_retained]
+            for job_id in expired:
+                cursor.execute("DELETE FROM PlannerJobEvent WHERE Job_ID = ?", (job_id,))
+                cursor.execute("DELETE FROM PlannerJob WHERE Job_ID = ?", (job_id,))
+            conn.commit()
+        return len(expired)
+
+    def stats(self):
+        """Job counts by status across all workers"""
+        with self.connection() as conn:
+            cursor = self._cursor_for(conn)
+            cursor.execute("SELECT Status, COUNT(*) FROM PlannerJob GROUP BY Status")
+            rows = cursor.fetchall()
+        return {status: count for status, count in rows}
+
+
+JOB_TABLE_SQL = {
+    'sqlite': [
+        """
+        CREATE TABLE IF NOT EXISTS PlannerJob (
+            Job_ID TEXT PRIMARY KEY, Job_Key TEXT, Status TEXT NOT NULL, Accepting INTEGER NOT NULL,
+            Tokens TEXT NOT NULL, Cancel_Votes TEXT NOT NULL, Created REAL NOT NULL, Updated REAL NOT NULL,
+            Payload BLOB NOT NULL, Result BLOB
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS PlannerJobEvent (
+            Job_ID TEXT NOT NULL, Event_ID INTEGER NOT NULL, Payload BLOB NOT NULL, PRIMARY KEY (Job_ID, Event_ID)
+        )
+        """
+    ],
+    'sqlserver': [
+        """
+        IF OBJECT_ID('dbo.PlannerJob', 'U') IS NULL
+        CREATE TABLE dbo.PlannerJob (
+            Job_ID VARCHAR(32) NOT NULL PRIMARY KEY, Job_Key VARCHAR(64) NULL, Status VARCHAR(16) NOT NULL,
+            Accepting BIT NOT NULL, Tokens NVARCHAR(MAX) NOT NULL, Cancel_Votes NVARCHAR(MAX) NOT NULL,
+            Created FLOAT NOT NULL, Updated FLOAT NOT NULL, Payload VARBINARY(MAX) NOT NULL, Result VARBINARY(MAX) NULL
+        )
+        """,
+        """
+        IF OBJECT_ID('dbo.PlannerJobEvent', 'U') IS NULL
+        CREATE TABLE dbo.PlannerJobEvent (
+            Job_ID VARCHAR(32) NOT NULL, Event_ID INT NOT NULL, Payload VARBINARY(MAX) NOT NULL,
+            PRIMARY KEY (Job_ID, Event_ID)
+        )
+        """
+    ]
+}
+
+
+def create_job_store(backend, db_connection=None):
+    """Shared job records for STATE_BACKEND, or None for 'memory' (jobs are only seen by this process)"""
+    if backend == 'memory':
+        return None
+    if backend == 'sqlite':
+        return SqlJobStore(sqlite_connection(STATE_SQLITE_PATH), JOB_TABLE_SQL['sqlite'])
+    if backend == 'sqlserver':
+        return SqlJobStore(db_connection, JOB_TABLE_SQL['sqlserver'])
+    raise ValueError(f"Unknown STATE_BACKEND {backend!r} (expected 'memory', 'sqlite' or 'sqlserver')")
+
+
+class JobManager:
+    """Runs schedule jobs on a bounded thread pool and keeps their results for a while
+
+    Each workspace has at most one unfinished job, and a request whose key
+    matches an unfinished job joins it instead of starting another solve.
+    At most max_queued jobs wait for a worker; submit() refuses more.
+    Finished jobs are kept for retention_seconds, and at most max_retained
+    of them (oldest dropped first).
+
+    Without a shared store, jobs are only known to this process. With one
+    (a SqlJobStore), every job is published there and republished every
+    publish_seconds while it runs, so any worker process can report on it,
+    stream its events, join it or cancel it; the queue limit then counts
+    queued jobs across all workers.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, retention_seconds=JOB_RETENTION_SECONDS,
+                 max_retained=JOB_MAX_RETAINED, max_queued=JOB_MAX_QUEUED, shared=None,
+                 publish_seconds=JOB_PUBLISH_SECONDS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='schedule-job')
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self.max_retained = max_retained
+        self.max_queued = max_queued
+        self.shared = shared
+        self.publish_seconds = publish_seconds
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()  # job_id -> job run by this process, oldest first
+        self.metrics = {'submitted': 0, 'coalesced': 0, 'rejected': 0}
+        self.publish_lock = threading.Lock()
+        self.published = {}  # job_id -> number of its events already in the shared store
+        self.publisher = None
+
+    def submit(self, workspace, run, key=None):
+        """Queue run(job) for a workspace - returns (job, outcome)
+        
+        outcome is 'queued' for a new job, 'coalesced' when an unfinished
+        job with the same key was joined, 'busy' when the workspace already
+        has a different unfinished job (that job is returned), or 'full'
+        when max_queued jobs are already waiting (job is None).
+        """
+        if self.shared is not None:
+            return self._submit_shared(workspace.token, run, key)
+        token = workspace.token
+        with self.lock:
+            self._prune()
+            unfinished = [job for job in self.jobs.values() if not job.done]
+            for job in unfinished:
+                if key is not None and job.key == key and job.accepting:
+                    job.workspace_tokens.add(token)
+                    job.cancel_votes.discard(token)
+                    self.metrics['coalesced'] += 1
+                    return job, 'coalesced'
+            for job in unfinished:
+                if token in job.workspace_tokens:
+                    return job, 'busy'
+            if sum(1 for job in unfinished if job.status == 'queued') >= self.max_queued:
+                self.metrics['rejected'] += 1
+                return None, 'full'
+            job = ScheduleJob(token, key)
+            self.jobs[job.job_id] = job
+            self.metrics['submitted'] += 1
+        job.future = self.executor.submit(self._run, job, run)
+        return job, 'queued'
+
+    def _submit_shared(self, token, run, key):
+        """submit() against the jobs of every worker, as recorded in the shared store"""
+        with self.lock:
+            self._prune()
+        self.shared.prune(self.retention_seconds, self.max_retained)
+        unfinished = self.shared.unfinished()
+        for row in unfinished:
+            if key is not None and row['key'] == key and row['accepting'] and self.shared.join(row['job_id'], token):
+                with self.lock:
+                    self.metrics['coalesced'] += 1
+                return self.get(row['job_id'], token), 'coalesced'
+        for row in unfinished:
+            if token in row['tokens']:
+                job = self.get(row['job_id'], token)
+                if job is not None:  # Else it finished and was pruned since unfinished() was read
+                    return job, 'busy'
+        if sum(1 for row in unfinished if row['status'] == 'queued') >= self.max_queued:
+            with self.lock:
+                self.metrics['rejected'] += 1
+            return None, 'full'
+
+        job = ScheduleJob(token, key)
+        self.shared.insert(job)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self.published[job.job_id] = 0
+            self.metrics['submitted'] += 1
+            if self.publisher is None:
+                self.publisher = threading.Thread(target=self._publish_loop, name='schedule-job-publisher', daemon=True)
+                self.publisher.start()
+        job.future = self.executor.submit(self._run, job, run)
+        return job, 'queued'
+
+    def close(self, job):
+        """Stop a job taking followers (its results are final) - returns every workspace token that joined it"""
+        tokens = self.shared.close(job.job_id) if self.shared is not None else set()
+        with self.lock:
+            job.accepting = False
+            job.workspace_tokens |= tokens
+            return set(job.workspace_tokens)
+
+    def describe(self, job, include_result=False):
+        """job.status_dict(), plus its place in the queue while it waits for a worker of this process"""
+        status = job.status_dict(include_result)
+        if job.status == 'queued':
+            with self.lock:
+                queued = [queued_job for queued_job in self.jobs.values() if queued_job.status == 'queued']
+            status['queue_position'] = queued.index(job) + 1 if job in queued else None
+        return status
+
+    def _run(self, job, run):
+        if job.cancel_requested.is_set():
+            job.finish('cancelled')
+            self._publish(job)
+            return
+        job.status = 'running'
+        job.started = time.monotonic()
+        self._publish(job)
+        try:
+            result = run(job)
+        except JobCancelled:
+            job.finish('cancelled')
+        except Exception as e:
+            print(f"Schedule job {job.job_id} failed: {str(e)}")
+            job.finish('failed', str(e))
+        else:
+            if result.get('success'):
+                job.result = result
+                job.finish('succeeded')
+            else:
+                job.finish('failed', result.get('error', 'Schedule generation failed'))
+        self._publish(job)
+
+    def _publish(self, job):
+        """Write a job's progress to the shared store and pick up members and cancel votes from other workers"""
+        if self.shared is None:
+            return
+        try:
+            with self.publish_lock:
+                published = self.published.get(job.job_id, 0)
+                with job.events_changed:
+                    events = job.events[published:]
+                    status = job.status_dict()
+                result = job.result if status['status'] == 'succeeded' else None
+                tokens, votes = self.shared.publish(job, status, events, result)
+                self.published[job.job_id] = published + len(events)
+        except Exception as e:
+            print(f"Could not publish schedule job {job.job_id}: {str(e)}")
+            return
+        with self.lock:
+            job.workspace_tokens |= tokens
+            job.cancel_votes |= votes
+            stop = not job.done and job.cancel_votes >= job.workspace_tokens
+        if stop and not job.cancel_requested.is_set():
+            self._stop(job)
+
+    def _publish_loop(self):
+        # Heartbeat, progress and cancel votes for this process's unfinished jobs
+        while True:
+            time.sleep(self.publish_seconds)
+            with self.lock:
+                unfinished = [job for job in self.jobs.values() if not job.done]
+            for job in unfinished:
+                self._publish(job)
+
+    def _stop(self, job):
+        job.cancel_requested.set()
+        if job.future is not None and job.future.cancel():
+            job.finish('cancelled')
+            self._publish(job)
+
+    def get(self, job_id, workspace_token):
+        """Job with this ID if it belongs to the workspace, else None
+        
+        Jobs run by another worker come back from the shared store as a SharedJob.
+        """
+        with self.lock:
+            self._prune()
+            job = self.jobs.get(job_id)
+            if job is not None and workspace_token in job.workspace_tokens:
+                return job
+        if self.shared is None:
+            return None
+        shared_job = self.shared.load(job_id)
+        if shared_job is None or workspace_token not in shared_job.workspace_tokens:
+            return None
+        if job is None:
+            return shared_job
+        with self.lock:  # Joined through another worker since the last publish
+            job.workspace_tokens.add(workspace_token)
+        return job
+
+    def cancel(self, job_id, workspace_token):
+        """Ask a job to stop at its next checkpoint (before anything is saved) - returns the job or None
+        
+        A job shared by several workspaces only stops once all of them have asked.
+        """
+        job = self.get(job_id, workspace_token)
+        if job is None or job.done:
+            return job
+        if self.shared is not None:
+            members = self.shared.vote_cancel(job_id, workspace_token)
+            if members is None:
+                return job
+            tokens, votes = members
+            with self.lock:
+                if job_id in self.jobs:
+                    job.workspace_tokens |= tokens
+                    job.cancel_votes |= votes
+        else:
+            with self.lock:
+                job.cancel_votes.add(workspace_token)
+                tokens, votes = job.workspace_tokens, job.cancel_votes
+        if votes >= tokens:
+            if isinstance(job, SharedJob):
+                job.state['cancel_requested'] = True  # Its worker stops it on its next publish
+            else:
+                self._stop(job)
+        return job
+
+    def _prune(self):
+        # Caller holds self.lock
+        now = time.monotonic()
+        finished = [job for job in self.jobs.values() if job.done and job.finished is not None]
+        expired = {job.job_id for job in finished if now - job.finished > self.retention_seconds}
+        excess = len(finished) - len(expired) - self.max_retained
+        for job in finished:
+            if excess <= 0:
+                break
+            if job.job_id not in expired:
+                expired.add(job.job_id)
+                excess -= 1
+        for job_id in expired:
+            del self.jobs[job_id]
+            self.published.pop(job_id, None)
+
+    def stats(self):
+        """Job counts by status (this process, and all workers with a shared store)"""
+        with self.lock:
+            counts = Counter(job.status for job in self.jobs.values())
+            metrics = dict(self.metrics)
+        stats = dict(metrics, workers=self.max_workers, max_queued=self.max_queued,
+                     jobs=dict(counts), retained=sum(counts.values()))
+        if self.shared is not None:
+            stats['shared_jobs'] = self.shared.stats()
+        return stats
+
+
+# ===============================================
+#  Scheduling Engine Helpers
+# ===============================================
+
+RoomRecord = namedtuple('RoomRecord', ['Room_ID', 'Capacity', 'Facil_ID', 'Description'])
+
+
+class RoomIndex:
+    """Capacity-sorted room index built once per timetable run"""
+
+    def __init__(self, rooms, room_ids=None):
+        # Compact Room_ID -> record map, restricted to the rooms usable in this run
+        allowed = set(room_ids) if room_ids is not None else None
+        self.by_id = {}
+        for room in rooms:
+            room_id, capacity, facil_id, description = room.Room_ID, room.Capacity, room.Facil_ID, room.Description
+            if allowed is not None and room_id not in allowed:
+                continue
+            if room_id in self.by_id:
+                continue
+            self.by_id[room_id] = RoomRecord(room_id, int(capacity), facil_id, description)
+
+        # Ascending capacity order (stable, so ties keep the query order)
+        self.sorted_rooms = sorted(self.by_id.values(), key=lambda room: room.Capacity)
+        self.capacities = [room.Capacity for room in self.sorted_rooms]
+
+    def __len__(self):
+        return len(self.sorted_rooms)
+
+    def get(self, room_id):
+        """Get the compact record for a room, or None if it is not in this run"""
+        return self.by_id.get(room_id)
+
+    def start_position(self, min_capacity):
+        """Position of the first room in sorted_rooms with Capacity >= min_capacity"""
+        return bisect_left(self.capacities, min_capacity or 0)
+
+    def rooms_with_capacity(self, min_capacity):
+        """Rooms with Capacity >= min_capacity, smallest first"""
+        return self.sorted_rooms[self.start_position(min_capacity):]
+
+
+class OccupancyGrid:
+    """Dense room/teacher occupancy matrices over the time slots of one timetable run
+
+    Room IDs, teacher F_IDs and time slot IDs are interned to row/column
+    numbers. Rows of the room matrices follow the order the rooms were given
+    in, so building the grid from RoomIndex.sorted_rooms makes "rooms big
+    enough for a class" the rows from RoomIndex.start_position() onward.
+    Teacher index -1 stands for "no assigned teacher" and is always free.
+    """
+
+    def __init__(self, room_ids, time_ids, teacher_ids=()):
+        self.room_ids = list(room_ids)
+        self.room_pos = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        self.time_ids = list(time_ids)
+        self.slot_pos = {time_id: i for i, time_id in enumerate(self.time_ids)}
+        self.teacher_ids = []
+        self.teacher_pos = {}
+
+        n_rooms, n_slots = len(self.room_ids), len(self.time_ids)
+        self.room_busy = np.zeros((n_rooms, n_slots), dtype=bool)
+        self.room_owner = np.full((n_rooms, n_slots), -1, dtype=np.int64)
+        self.teacher_busy = np.zeros((max(len(teacher_ids), 16), n_slots), dtype=bool)
+        self.teacher_owner = np.full(self.teacher_busy.shape, -1, dtype=np.int64)
+
+        for teacher_id in teacher_ids:
+            self.intern_teacher(teacher_id)
+
+    @property
+    def n_rooms(self):
+        return len(self.room_ids)
+
+    @property
+    def n_slots(self):
+        return len(self.time_ids)
+
+    def intern_teacher(self, teacher_id):
+        """Get the row number for a teacher F_ID, adding a row if it is new"""
+        if teacher_id is None or teacher_id == '':
+            return -1
+        pos = self.teacher_pos.get(teacher_id)
+        if pos is not None:
+            return pos
+
+        pos = len(self.teacher_ids)
+        if pos >= self.teacher_busy.shape[0]:
+            # Grow by doubling so interning stays amortised O(1)
+            extra = self.teacher_busy.shape[0]
+            self.teacher_busy = np.vstack([self.teacher_busy, np.zeros((extra, self.n_slots), dtype=bool)])
+            self.teacher_owner = np.vstack([self.teacher_owner, np.full((extra, self.n_slots), -1, dtype=np.int64)])
+        self.teacher_ids.append(teacher_id)
+        self.teacher_pos[teacher_id] = pos
+        return pos
+
+    def is_room_free(self, room, slot):
+        return not self.room_busy[room, slot]
+
+    def is_teacher_free(self, teacher, slot):
+        return teacher < 0 or not self.teacher_busy[teacher, slot]
+
+    def free_rooms(self, slot, room_start=0):
+        """Boolean vector of free rooms (from room_start onward) in one slot"""
+        return ~self.room_busy[room_start:, slot]
+
+    def teacher_free_slots(self, teacher):
+        """Boolean vector of the slots in which a teacher is free"""
+        if teacher < 0:
+            return np.ones(self.n_slots, dtype=bool)
+        return ~self.teacher_busy[teacher]
+
+    def free_pairs(self, room_start, teacher):
+        """Boolean rooms x slots matrix of (room, slot) pairs usable by a class
+
+        Covers the rooms from room_start onward, ANDed with the slots the
+        teacher is free in, for every slot at once.
+        """
+        return ~self.room_busy[room_start:] & self.teacher_free_slots(teacher)
+
+    def first_fit(self, room_start, teacher, slot_order):
+        """First (room, slot) pair in slot_order with a free room and a free teacher
+
+        Rooms are tried in row order from room_start. Returns None when no
+        pair is free.
+        """
+        if room_start >= self.n_rooms or not len(slot_order):
+            return None
+        free = ~self.room_busy[room_start:, slot_order]
+        if teacher >= 0:
+            free &= ~self.teacher_busy[teacher, slot_order]
+        usable = free.any(axis=0)
+        if not usable.any():
+            return None
+        k = int(usable.argmax())
+        room = room_start + int(free[:, k].argmax())
+        return room, int(slot_order[k])
+
+    def occupy(self, room, slot, teacher, class_nbr):
+        """Mark a room (and the teacher, if any) as used by a class in a slot"""
+        self.room_busy[room, slot] = True
+        self.room_owner[room, slot] = class_nbr
+        if teacher >= 0:
+            self.teacher_busy[teacher, slot] = True
+            self.teacher_owner[teacher, slot] = class_nbr
+
+    def release(self, room, slot, teacher):
+        """Free a room (and the teacher, if any) in a slot"""
+        self.room_busy[room, slot] = False
+        self.room_owner[room, slot] = -1
+        if teacher >= 0:
+            self.teacher_busy[teacher, slot] = False
+            self.teacher_owner[teacher, slot] = -1
+
+
+class FeasibilityMask:
+    """Static class x room x slot feasibility for one timetable run, built in one vectorized pass
+
+    A class can use a room when Cap_Enrl <= Capacity and a slot when the slot
+    is not disabled. Capacities are given in RoomIndex order, so each class's
+    usable rooms are the suffix from room_starts[i]; teachers holds the grid
+    teacher rows (-1 for none). Teacher availability changes while solving
+    and is left to OccupancyGrid, but teachers with more classes than
+    enabled slots are already known to leave conflicts.
+    """
+
+    def __init__(self, capacities, requirements, teachers, slot_enabled):
+        self.capacities = np.asarray(capacities, dtype=np.int64)
+        self.requirements = np.asarray(requirements, dtype=np.int64)
+        self.teachers = np.asarray(teachers, dtype=np.int64)
+        self.slot_enabled = np.asarray(slot_enabled, dtype=bool)
+
+        self.room_fits = self.requirements[:, None] <= self.capacities[None, :]
+        self.room_starts = np.searchsorted(self.capacities, self.requirements, side='left')
+        self.grid_slots = np.flatnonzero(self.slot_enabled)
+
+    def tensor(self):
+        """Full boolean class x room x slot tensor (slots over the whole week)"""
+        return self.room_fits[:, :, None] & self.slot_enabled[None, None, :]
+
+    def room_options(self):
+        """Number of rooms big enough for each class"""
+        return len(self.capacities) - self.room_starts
+
+    def option_counts(self):
+        """Number of (room, slot) pairs each class could use on an empty timetable"""
+        return self.room_options() * len(self.grid_slots)
+
+    def infeasible(self):
+        """Indexes of classes with no usable (room, slot) pair at all"""
+        return np.flatnonzero(self.option_counts() == 0)
+
+    def teacher_load(self, n_teachers=0):
+        """Number of classes per grid teacher row"""
+        assigned = self.teachers[self.teachers >= 0]
+        return np.bincount(assigned, minlength=n_teachers)
+
+    def candidates(self, i, occupancy):
+        """Boolean rooms x slots matrix of free pairs for class i, rooms from room_starts[i] on"""
+        return occupancy.free_pairs(int(self.room_starts[i]), int(self.teachers[i]))
+
+    def capacity_tiers(self):
+        """Demand vs supply per capacity tier: (first room row, classes needing it or larger, room-slots)
+
+        Tiers start at every distinct first usable room row; a class that
+        needs tier k can also use any larger tier, so demand and supply are
+        both counted from row k upward.
+        """
+        n_rooms, n_slots = len(self.capacities), len(self.grid_slots)
+        starts = np.sort(self.room_starts)
+        tiers = []
+        for k in np.unique(starts):
+            demand = len(starts) - int(np.searchsorted(starts, k, side='left'))
+            tiers.append((int(k), demand, (n_rooms - int(k)) * n_slots))
+        return tiers
+
+    def conflict_lower_bounds(self):
+        """Lower bounds on conflicts every solver must leave, without solving
+
+        capacity: worst capacity tier's demand over its room-slots.
+        teacher: classes over each teacher's enabled-slot count.
+        flow: classes minus a max-flow relaxation that enforces both limits
+        at once (source -> teacher (slots) -> capacity tier -> larger tiers,
+        each tier draining its room-slots into the sink); it is always at
+        least the larger of the other two.
+        """
+        n_rooms, n_slots = len(self.capacities), len(self.grid_slots)
+        tiers = self.capacity_tiers()
+        capacity = max([max(demand - supply, 0) for _, demand, supply in tiers] or [0])
+        load = self.teacher_load()
+        n_teachers = len(load)
+        teacher = int(np.maximum(load - n_slots, 0).sum())
+
+        # Nodes: 0 source, 1 sink, teachers, then one per tier (rows >= n_rooms have no tier)
+        tier_rows = [k for k, _, _ in tiers if k < n_rooms]
+        tier_node = {k: 2 + n_teachers + t for t, k in enumerate(tier_rows)}
+        edges = [(0, 2 + t, n_slots) for t in range(n_teachers) if load[t]]
+        groups = Counter(zip(self.teachers.tolist(), self.room_starts.tolist()))
+        for (t, k), count in groups.items():
+            if k in tier_node:
+                edges.append((0 if t < 0 else 2 + t, tier_node[k], count))
+        for t, k in enumerate(tier_rows):
+            upper = tier_rows[t + 1] if t + 1 < len(tier_rows) else n_rooms
+            edges.append((tier_node[k], 1, (upper - k) * n_slots))
+            if t + 1 < len(tier_rows):
+                edges.append((tier_node[k], tier_node[upper], len(self.requirements)))
+        flow = len(self.requirements) - max_flow(2 + n_teachers + len(tier_rows), edges, 0, 1)
+
+        return {'capacity': capacity, 'teacher': teacher, 'flow': flow}
+
+
+class DsaturSolver:
+    """Most-constrained-first placement with forward checking and bounded backtracking
+
+    Classes are given as parallel lists of grid room starts (first room row
+    big enough, see RoomIndex.start_position), grid teacher rows (-1 for no
+    teacher) and Class_Nbrs. At every step the unplaced class with the fewest
+    free (room, slot) pairs goes next, ties going to the busiest teacher and
+    then to the largest class, and its candidate placements are checked ahead
+    so the one stranding the fewest other classes wins.
+
+    A class left with no free option is not given up straight away: a bounded
+    backtracking search revisits earlier placements, moving one blocking class
+    (the room's occupant or the teacher's other class in that slot) to another
+    free pair, recursively up to max_depth moves. Every revisited placement
+    counts against max_backtracks; once that is spent, classes left without
+    options become conflicts. Classes no move can help (no room big enough,
+    no slot, or a teacher already busy in every slot) skip the search.
+    """
+
+    def __init__(self, occupancy, room_starts, teachers, class_nbrs,
+                 max_backtracks=2000, max_branching=8, max_depth=2):
+        self.occupancy = occupancy
+        self.room_starts = np.asarray(room_starts, dtype=np.int64)
+        self.teachers = np.asarray(teachers, dtype=np.int64)
+        self.class_nbrs = list(class_nbrs)
+        self.max_backtracks = max_backtracks
+        self.max_branching = max_branching
+        self.max_depth = max_depth
+        self.backtracks = 0
+        self.repairs_skipped = 0
+
+        # Teacher rows for indexing, with "no teacher" mapped onto an extra always-free row
+        self.n_teachers = len(occupancy.teacher_ids)
+        self.teacher_rows = np.where(self.teachers < 0, self.n_teachers, self.teachers)
+
+        self.active = np.ones(len(self.class_nbrs), dtype=bool)
+        self.placements = {}
+        self.index_of = {class_nbr: i for i, class_nbr in enumerate(self.class_nbrs)}
+
+    def _free_suffix(self):
+        """free_suffix[k, s] = number of free rooms among rows k.. in slot s"""
+        grid = self.occupancy
+        suffix = np.zeros((grid.n_rooms + 1, grid.n_slots), dtype=np.int32)
+        if grid.n_rooms:
+            free = (~grid.room_busy).astype(np.int32)
+            suffix[:-1] = free[::-1].cumsum(axis=0)[::-1]
+        return suffix
+
+    def _teacher_free(self):
+        """Teacher free-slot matrix plus the always-free "no teacher" row"""
+        grid = self.occupancy
+        free = np.ones((self.n_teachers + 1, grid.n_slots), dtype=bool)
+        free[:self.n_teachers] = ~grid.teacher_busy[:self.n_teachers]
+        return free
+
+    def _candidates(self, i, suffix):
+        """Smallest free room in every usable slot, least constraining first"""
+        start, teacher = int(self.room_starts[i]), int(self.teachers[i])
+        free = self.occupancy.free_pairs(start, teacher)
+        candidates = []
+        for slot in np.flatnonzero(free.any(axis=0)):
+            room = start + int(free[:, slot].argmax())
+            candidates.append((room, int(slot)))
+        # Best fit first, then the slot that keeps the most rooms free for others
+        candidates.sort(key=lambda c: (c[0], -suffix[start, c[1]]))
+        return candidates[:self.max_branching]
+
+    def _impact(self, i, candidate, others, sizes, suffix, teacher_free):
+        """Cost of a placement for the other classes: (classes left with no option, weighted lost options)"""
+        room, slot = candidate
+        teacher = self.teachers[i]
+        starts = self.room_starts[others]
+        if teacher >= 0:
+            same_teacher = self.teachers[others] == teacher
+        else:
+            same_teacher = np.zeros(len(others), dtype=bool)
+        # Same teacher: the whole slot is lost. Others: just this room in this slot.
+        lost = np.where(
+            same_teacher,
+            suffix[starts, slot],
+            (starts <= room) & teacher_free[self.teacher_rows[others], slot]
+        )
+        stranded = int(np.count_nonzero(lost >= sizes))
+        return stranded, float((lost / sizes).sum())
+
+    def _assign(self, i, candidate):
+        room, slot = candidate
+        self.occupancy.occupy(room, slot, int(self.teachers[i]), self.class_nbrs[i])
+        self.active[i] = False
+        self.placements[i] = candidate
+
+    def _unassign(self, i):
+        room, slot = self.placements.pop(i)
+        self.occupancy.release(room, slot, int(self.teachers[i]))
+        self.active[i] = True
+
+    def _repairable(self, i):
+        """Whether moving other classes could ever free a pair for class i
+
+        Not when no room is big enough or there are no slots, nor when the
+        teacher is busy in every slot: each slot is then blocked by one of
+        the teacher's own classes, which has no free slot to move to.
+        """
+        grid = self.occupancy
+        if self.room_starts[i] >= grid.n_rooms or not grid.n_slots:
+            return False
+        teacher = int(self.teachers[i])
+        return teacher < 0 or not grid.teacher_busy[teacher].all()
+
+    def _moves(self, i, slot):
+        """(blocking class Class_Nbr, room for i) pairs worth trying in one slot
+
+        When the teacher teaches another class in the slot, only moving that
+        class helps, and every room it would leave i is equivalent, so it is
+        tried once with the smallest usable room. Otherwise each occupant of
+        a big enough room is a separate move.
+        """
+        grid = self.occupancy
+        start, teacher = int(self.room_starts[i]), int(self.teachers[i])
+        owners = grid.room_owner[start:, slot]
+        teacher_blocker = int(grid.teacher_owner[teacher, slot]) if teacher >= 0 else -1
+        if teacher_blocker >= 0:
+            usable = np.flatnonzero((owners < 0) | (owners == teacher_blocker))
+            return [(teacher_blocker, start + int(usable[0]))] if len(usable) else []
+        return [(int(owner), start + k) for k, owner in enumerate(owners.tolist()) if owner >= 0]
+
+    def _repair(self, i, depth, locked):
+        """Place class i by moving one blocking class elsewhere, recursing up to depth moves"""
+        grid = self.occupancy
+        for slot in range(grid.n_slots):
+            for blocker, room in self._moves(i, slot):
+                j = self.index_of.get(blocker)
+                if j is None or j in locked:
+                    continue
+                if self.backtracks >= self.max_backtracks:
+                    return False
+
+                # Revisit j's placement: give its pair to i and look for a new home for j
+                self.backtracks += 1
+                previous = self.placements[j]
+                self._unassign(j)
+                self._assign(i, (room, slot))
+                home = grid.first_fit(int(self.room_starts[j]), int(self.teachers[j]), range(grid.n_slots))
+                if home is not None:
+                    self._assign(j, home)
+                    return True
+                if depth > 1 and self._repair(j, depth - 1, locked | {i, j}):
+                    return True
+                self._unassign(i)
+                self._assign(j, previous)
+        return False
+
+    def solve(self):
+        """Place as many classes as possible - returns (index -> (room, slot), unplaced indexes)"""
+        unplaced = []
+
+        while True:
+            remaining = np.flatnonzero(self.active)
+            if not len(remaining):
+                break
+
+            suffix = self._free_suffix()
+            teacher_free = self._teacher_free()
+            rows = self.teacher_rows[remaining]
+            sizes = (suffix[self.room_starts[remaining]] * teacher_free[rows]).sum(axis=1)
+
+            # Classes with no free option left: backtrack into earlier placements or give up
+            empty = sizes == 0
+            if empty.any():
+                for i in remaining[empty]:
+                    i = int(i)
+                    if not self._repairable(i):
+                        self.repairs_skipped += 1
+                    elif self._repair(i, self.max_depth, {i}):
+                        continue
+                    self.active[i] = False
+                    unplaced.append(i)
+                continue
+
+            # Fewest options first, then busiest teacher, then largest class
+            load = np.bincount(rows, minlength=self.n_teachers + 1)
+            load[self.n_teachers] = 0
+            order = np.lexsort((-self.room_starts[remaining], -load[rows], sizes))
+            pick = order[0]
+            i = int(remaining[pick])
+
+            others = np.delete(remaining, pick)
+            other_sizes = np.delete(sizes, pick)
+            scored = []
+            for candidate in self._candidates(i, suffix):
+                stranded, pressure = self._impact(i, candidate, others, other_sizes, suffix, teacher_free)
+                scored.append((stranded, pressure, candidate))
+            scored.sort(key=lambda item: (item[0], item[1]))
+
+            self._assign(i, scored[0][2])
+
+        return dict(self.placements), unplaced
+
+
+def hopcroft_karp(adjacency, n_right, match_left=None):
+    """Maximum bipartite matching, grown from an optional initial matching
+
+    adjacency[u] lists the right vertices left vertex u may use. Augmenting
+    paths never unmatch a left vertex, so everything matched initially stays
+    matched. Returns (match_left, match_right) with -1 for unmatched.
+    """
+    n_left = len(adjacency)
+    match_left = list(match_left) if match_left is not None else [-1] * n_left
+    match_right = [-1] * n_right
+    for u, v in enumerate(match_left):
+        if v >= 0:
+            match_right[v] = u
+
+    unreached = n_left + 1
+    while True:
+        # BFS layers from every free left vertex
+        dist = [unreached] * n_left
+        queue = deque()
+        for u in range(n_left):
+            if match_left[u] < 0:
+                dist[u] = 0
+                queue.append(u)
+        found = False
+        while queue:
+            u = queue.popleft()
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w < 0:
+                    found = True
+                elif dist[w] == unreached:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        if not found:
+            break
+
+        def augment(u):
+            for v in adjacency[u]:
+                w = match_right[v]
+                if w < 0 or (dist[w] == dist[u] + 1 and augment(w)):
+                    match_left[u] = v
+                    match_right[v] = u
+                    return True
+            dist[u] = unreached
+            return False
+
+        for u in range(n_left):
+            if match_left[u] < 0:
+                augment(u)
+
+    return match_left, match_right
+
+
+def max_flow(n_nodes, edges, source, sink):
+    """Maximum flow value (Dinic) over directed (tail, head, capacity) edges"""
+    heads, caps, adjacency = [], [], [[] for _ in range(n_nodes)]
+    for tail, head, capacity in edges:
+        adjacency[tail].append(len(heads))
+        heads.append(head)
+        caps.append(capacity)
+        adjacency[head].append(len(heads))
+        heads.append(tail)
+        caps.append(0)
+
+    total = 0
+    while True:
+        # BFS levels over edges with residual capacity
+        level = [-1] * n_nodes
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for e in adjacency[u]:
+                if caps[e] > 0 and level[heads[e]] < 0:
+                    level[heads[e]] = level[u] + 1
+                    queue.append(heads[e])
+        if level[sink] < 0:
+            return total
+
+        position = [0] * n_nodes
+
+        def push(u, limit):
+            if u == sink:
+                return limit
+            while position[u] < len(adjacency[u]):
+                e = adjacency[u][position[u]]
+                v = heads[e]
+                if caps[e] > 0 and level[v] == level[u] + 1:
+                    pushed = push(v, min(limit, caps[e]))
+                    if pushed:
+                        caps[e] -= pushed
+                        caps[e ^ 1] += pushed
+                        return pushed
+                position[u] += 1
+            return 0
+
+        while True:
+            pushed = push(source, float('inf'))
+            if not pushed:
+                break
+            total += pushed
+
+
+def min_waste_assignment(room_starts, n_rooms):
+    """Assign each class the smallest free room that fits, largest class first
+
+    Room rows are in ascending capacity order and a class may use every row
+    from its room start onward, so eligibility is nested. For nested
+    eligibility this exchange-argument greedy gives a minimum-cost matching
+    (wasted seats = Room.Capacity - Cap_Enrl) and succeeds whenever any
+    matching of all the classes exists. Returns a list of room rows, or None
+    if some class could not be seated.
+    """
+    free_rows = list(range(n_rooms))
+    rooms = [None] * len(room_starts)
+    for k in sorted(range(len(room_starts)), key=lambda k: -room_starts[k]):
+        pos = bisect_left(free_rows, room_starts[k])
+        if pos == len(free_rows):
+            return None
+        rooms[k] = free_rows.pop(pos)
+    return rooms
+
+
+def match_rooms_per_slot(occupancy, capacities, room_starts, requirements, teachers, class_nbrs,
+                         placements, unplaced):
+    """Post-pass: maximise placed sections and minimise wasted seats in every slot
+
+    For each slot, the classes already placed there plus the unplaced
+    classes whose teacher is free in that slot are matched to the slot's
+    rooms with Hopcroft-Karp, starting from the current assignment so no
+    placed class is lost. At most one newly placed class per teacher is kept
+    per slot. The matched set is then re-seated with min_waste_assignment.
+    Works on any solver's output; placements maps class index -> (room row,
+    slot) and the occupancy grid is updated in place.
+    """
+    placements = dict(placements)
+    waiting = sorted(unplaced, key=lambda i: -room_starts[i])
+    n_rooms = occupancy.n_rooms
+
+    def waste(assignment):
+        return sum(capacities[room] - requirements[i] for i, (room, _) in assignment.items())
+
+    stats = {'wasted_seats_before': int(waste(placements)), 'added_sections': 0}
+    by_slot = defaultdict(list)
+    for i, (room, slot) in placements.items():
+        by_slot[slot].append(i)
+
+    for slot in range(occupancy.n_slots):
+        placed = by_slot[slot]
+        candidates = [
+            i for i in waiting
+            if room_starts[i] < n_rooms and occupancy.is_teacher_free(teachers[i], slot)
+        ]
+        if not placed and not candidates:
+            continue
+
+        left = placed + candidates
+        adjacency = [range(room_starts[i], n_rooms) for i in left]
+        initial = [placements[i][0] for i in placed] + [-1] * len(candidates)
+        match_left, _ = hopcroft_karp(adjacency, n_rooms, initial)
+
+        # A teacher can only take one new class per slot; drop extras and re-augment
+        while True:
+            seen_teachers = set()
+            dropped = False
+            for k in range(len(placed), len(left)):
+                teacher = teachers[left[k]]
+                if match_left[k] < 0 or teacher < 0:
+                    continue
+                if teacher in seen_teachers:
+                    match_left[k] = -1
+                    adjacency[k] = ()
+                    dropped = True
+                else:
+                    seen_teachers.add(teacher)
+            if not dropped:
+                break
+            match_left, _ = hopcroft_karp(adjacency, n_rooms, match_left)
+
+        matched = [k for k in range(len(left)) if match_left[k] >= 0]
+        rooms = min_waste_assignment([room_starts[left[k]] for k in matched], n_rooms)
+        if rooms is None:
+            rooms = [match_left[k] for k in matched]
+
+        # Re-seat the slot on the occupancy grid
+        for i in placed:
+            occupancy.release(placements[i][0], slot, teachers[i])
+        for k, room in zip(matched, rooms):
+            i = left[k]
+            occupancy.occupy(room, slot, teachers[i], class_nbrs[i])
+            placements[i] = (room, slot)
+
+        added = {left[k] for k in matched if k >= len(placed)}
+        if added:
+            stats['added_sections'] += len(added)
+            waiting = [i for i in waiting if i not in added]
+
+    stats['wasted_seats_after'] = int(waste(placements))
+    return placements, sorted(waiting), stats
+
+
+class LocalSearchImprover:
+    """Anytime local search that makes space for unplaced classes within a time budget
+
+    Each step picks an unplaced class and a (room, slot) pair it fits,
+    evicts the classes in the way (the room's occupant and/or the teacher's
+    other class in that slot) and tries to re-home them elsewhere. Moves
+    that place more classes are always kept; moves that only trade one
+    unplaced class for another are accepted simulated-annealing style on
+    the wasted-seat delta, with recently moved-in classes tabu for eviction.
+    The objective (conflicts, wasted seats) is tracked incrementally and the
+    best solution seen is what run() leaves on the occupancy grid.
+
+    Classes no move can place are not picked, and run() stops early once
+    none are left or stall_iterations steps in a row kept no move.
+    """
+
+    def __init__(self, occupancy, room_starts, teachers, class_nbrs, requirements, capacities,
+                 placements, unplaced, seed=None, tabu_tenure=50, start_temperature=10.0,
+                 stall_iterations=10000):
+        self.occupancy = occupancy
+        self.room_starts = list(room_starts)
+        self.teachers = list(teachers)
+        self.class_nbrs = list(class_nbrs)
+        self.requirements = list(requirements)
+        self.capacities = list(capacities)
+        self.placements = dict(placements)
+        self.unplaced = set(unplaced)
+        self.rng = random.Random(seed)
+        self.tabu_tenure = tabu_tenure
+        self.start_temperature = start_temperature
+        self.stall_iterations = stall_iterations
+        self.index_of = {class_nbr: i for i, class_nbr in enumerate(self.class_nbrs)}
+        self.tabu_until = {}
+        self.wasted = sum(self._waste(i, room) for i, (room, _) in self.placements.items())
+
+    def _waste(self, i, room):
+        return self.capacities[room] - self.requirements[i]
+
+    def _place(self, i, room, slot):
+        self.occupancy.occupy(room, slot, self.teachers[i], self.class_nbrs[i])
+        self.placements[i] = (room, slot)
+        self.unplaced.discard(i)
+        self.wasted += self._waste(i, room)
+
+    def _remove(self, i):
+        room, slot = self.placements.pop(i)
+        self.occupancy.release(room, slot, self.teachers[i])
+        self.unplaced.add(i)
+        self.wasted -= self._waste(i, room)
+        return room, slot
+
+    def _rehome(self, i):
+        """Place an evicted class in any free pair, or leave it unplaced"""
+        slot_order = list(range(self.occupancy.n_slots))
+        self.rng.shuffle(slot_order)
+        placement = self.occupancy.first_fit(self.room_starts[i], self.teachers[i], slot_order)
+        if placement is None:
+            return False
+        self._place(i, placement[0], placement[1])
+        return True
+
+    def _placeable(self, i):
+        """Whether some move could place class i (same test as DsaturSolver._repairable)"""
+        grid = self.occupancy
+        if self.room_starts[i] >= grid.n_rooms or not grid.n_slots:
+            return False
+        teacher = self.teachers[i]
+        return teacher < 0 or not grid.teacher_busy[teacher].all()
+
+    def _candidates(self):
+        return tuple(i for i in self.unplaced if self._placeable(i))
+
+    def _try_insert(self, i, iteration, temperature):
+        """One move for unplaced class i - returns True if the move was kept"""
+        grid = self.occupancy
+        start = self.room_starts[i]
+        if start >= grid.n_rooms:
+            return False
+
+        # Direct placement if a free pair appeared
+        if self._rehome(i):
+            return True
+
+        slot = self.rng.randrange(grid.n_slots)
+        room = self.rng.randrange(start, grid.n_rooms)
+        owners = {int(grid.room_owner[room, slot])}
+        if self.teachers[i] >= 0:
+            owners.add(int(grid.teacher_owner[self.teachers[i], slot]))
+        owners.discard(-1)
+        blockers = [self.index_of.get(owner) for owner in owners]
+        if not blockers or None in blockers:
+            return False
+        if any(self.tabu_until.get(j, -1) > iteration for j in blockers):
+            return False
+
+        before = (len(self.unplaced), self.wasted)
+        previous = {j: self._remove(j) for j in blockers}
+        self._place(i, room, slot)
+        for j in blockers:
+            self._rehome(j)
+
+        conflicts_delta = len(self.unplaced) - before[0]
+        waste_delta = self.wasted - before[1]
+        if conflicts_delta < 0 or (conflicts_delta == 0 and (
+                waste_delta <= 0 or self.rng.random() < np.exp(-waste_delta / max(temperature, 1e-6)))):
+            self.tabu_until[i] = iteration + self.tabu_tenure
+            return True
+
+        # Undo the move
+        self._remove(i)
+        for j in blockers:
+            if j in self.placements:
+                self._remove(j)
+        for j, (room_j, slot_j) in previous.items():
+            self._place(j, room_j, slot_j)
+        return False
+
+    def _restore(self, best):
+        """Put the best solution seen back on the occupancy grid"""
+        for i in list(self.placements):
+            self._remove(i)
+        for i, (room, slot) in best.items():
+            self._place(i, room, slot)
+
+    def run(self, seconds):
+        """Improve until the budget runs out, nothing placeable is left unplaced or the search stalls
+        - returns (placements, unplaced, stats)"""
+        started = time.perf_counter()
+        deadline = started + seconds
+        stats = {'conflicts_before': len(self.unplaced), 'iterations': 0, 'accepted_moves': 0}
+        best = dict(self.placements)
+        best_score = (len(self.unplaced), self.wasted)
+
+        # Rejected moves are undone, so the candidates only change when a move is kept
+        candidates = self._candidates()
+        iteration = stalled = 0
+        while candidates and stalled < self.stall_iterations and time.perf_counter() < deadline:
+            iteration += 1
+            remaining = (deadline - time.perf_counter()) / seconds
+            temperature = self.start_temperature * max(remaining, 0.0)
+            i = self.rng.choice(candidates)
+            if not self._try_insert(i, iteration, temperature):
+                stalled += 1
+                continue
+            stalled = 0
+            stats['accepted_moves'] += 1
+            candidates = self._candidates()
+            score = (len(self.unplaced), self.wasted)
+            if score < best_score:
+                best, best_score = dict(self.placements), score
+
+        if (len(self.unplaced), self.wasted) > best_score:
+            self._restore(best)
+
+        stats['iterations'] = iteration
+        stats['stalled'] = stalled >= self.stall_iterations
+        stats['conflicts_after'] = len(self.unplaced)
+        stats['seconds'] = round(time.perf_counter() - started, 4)
+        return dict(self.placements), sorted(self.unplaced), stats
+
+
+def place_first_fit(occupancy, room_start, teacher, class_nbr, rng=random):
+    """Greedy step: first free (room, slot) over a shuffled slot order, marked as used
+
+    Shared by the in-process greedy pass and the multi-start workers so a
+    seed reproduces the same timetable in either place.
+    """
+    slot_order = list(range(occupancy.n_slots))
+    rng.shuffle(slot_order)
+
+    placement = occupancy.first_fit(room_start, teacher, slot_order)
+    if placement is not None:
+        occupancy.occupy(placement[0], placement[1], teacher, class_nbr)
+    return placement
+
+
+# Compact problem shipped once to each multi-start worker process
+_restart_problem = None
+
+
+def _init_restart_worker(problem):
+    global _restart_problem
+    _restart_problem = problem
+
+
+def _run_greedy_restart(seed, problem=None):
+    """One seeded greedy pass over a compact problem - returns (conflicts, wasted seats, seed, placements)"""
+    problem = problem or _restart_problem
+    occupancy = OccupancyGrid(range(problem['n_rooms']), range(problem['n_slots']),
+                              range(problem['n_teachers']))
+    rng = random.Random(seed)
+    capacities = problem['capacities']
+    placements = {}
+    conflicts = 0
+    wasted = 0
+    for i, (room_start, teacher, class_nbr, required) in enumerate(zip(
+            problem['room_starts'], problem['teachers'], problem['class_nbrs'], problem['requirements'])):
+        placement = place_first_fit(occupancy, room_start, teacher, class_nbr, rng)
+        if placement is None:
+            conflicts += 1
+        else:
+            placements[i] = placement
+            wasted += capacities[placement[0]] - required
+    return conflicts, wasted, seed, placements
+
+
+SCHEDULING_ENGINES = ('greedy', 'dsatur')
+
+
+def count_option(value, name, maximum):
+    """Request option that must be a whole number >= 1, capped at maximum
+
+    Raises ValueError (with a message for the client) for anything else.
+    """
+    message = f"{name} must be a whole number of at least 1"
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(message)
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(message)
+    if count < 1:
+        raise ValueError(message)
+    return min(count, maximum)
+
+
+def seconds_option(value, name, maximum):
+    """Request option that must be a finite number of seconds >= 0, capped at maximum"""
+    message = f"{name} must be a number of seconds of at least 0"
+    if isinstance(value, bool):
+        raise ValueError(message)
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(message)
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(message)
+    return min(seconds, maximum)
+
+
+def seed_option(value, name='seed'):
+    """Request option that must be a whole number, or None for a random seed"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be a whole number")
+    return value
+
+
 # ===============================================
 
+# Tables each cached resource is read from, for change-driven reloads
+RESOURCE_SOURCE_TABLES = {
+    'terms': {'Term'},
+    'campuses': {'Campus'},
+    'acad_groups': {'CourseCatalog'},
+    'subjects': {'CourseCatalog'},
+    'teachers': {'Teacher', 'ClassInstructor'},
+    'rooms': {'Room'}
+}
+CATALOG_SOURCE_TABLES = {'CourseCatalog', 'ClassSection', 'CourseOffering'}
+# Column each cached resource is looked up by (ResourceTable.get)
+RESOURCE_KEYS = {
+    'terms': 'Term_Code',
+    'campuses': 'Campus',
+    'acad_groups': 'Acad_Group',
+    'teachers': 'F_ID',
+    'rooms': 'Room_ID'
+}
+
+
 class WebSchedulingSystem:
     def __init__(self):
         # Database connections using configuration macros
         if USE_WINDOWS_AUTH:
             # Windows Authentication
-            self.conn_string = (
-                f"mssql+pyodbc://@{DB_SERVER}/{DB_NAME}?"
-                f"driver={DB_DRIVER.replace(' ', '+')}&trusted_connection=yes"
-            )
             self.pyodbc_conn_string = (
                 f"Driver={{{DB_DRIVER}}};"
                 f"Server={DB_SERVER};"
@@ -51,10 +2642,6 @@ class WebSchedulingSystem:
             )
         else:
             # SQL Server Authentication
-            self.conn_string = (
-                f"mssql+pyodbc://{DB_USER}:{DB_PASSWORD}@{DB_SERVER}/{DB_NAME}?"
-                f"driver={DB_DRIVER.replace(' ', '+')}"
-            )
             self.pyodbc_conn_string = (
                 f"Driver={{{DB_DRIVER}}};"
                 f"Server={DB_SERVER};"
@@ -63,34 +2650,40 @@ class WebSchedulingSystem:
                 f"PWD={DB_PASSWORD};"
             )
         
-        self.engine = create_engine(self.conn_string)
-        self.conn = pyodbc.connect(self.pyodbc_conn_string)
+        # Connections are opened on first checkout, never here
+        self.pool = ConnectionPool(lambda: pyodbc.connect(self.pyodbc_conn_string, timeout=DB_LOGIN_TIMEOUT))
+        self.warmup_thread = None
         
-        # Resource selection state
-        self.selections = {
-            'term': None,
-            'session': None,
-            'campus': None,
-            'acad_group': None,
-            'subject': None,
-            'classes': [],
-            'teachers': [],
-            'rooms': []
-        }
+        # Per-planner state: selections, disabled time slots and results live in a
+        # PlannerWorkspace; the web API binds one per request (see use_workspace)
+        self.workspaces = create_workspace_store(STATE_BACKEND, self._new_workspace, self.pool.connection)
+        self.default_workspace = self._new_workspace('default')  # CLI / scripts outside a request
+        self.request_state = threading.local()
+        self.jobs = JobManager(shared=create_job_store(STATE_BACKEND, self.pool.connection))
+        self.export_gate = AdmissionGate('export', EXPORT_CONCURRENCY, EXPORT_MAX_WAITING, EXPORT_WAIT_SECONDS)
+        self.export_flight = SingleFlight()
         
-        # Available options cache
+        # Available options cache, kept fresh by the change watcher (see check_for_changes)
         self.available_options = {}
+        self.resources_lock = threading.Lock()
+        self.change_monitor = TableChangeMonitor(
+            self.pool.connection,
+            sorted(set().union(CATALOG_SOURCE_TABLES, *RESOURCE_SOURCE_TABLES.values()))
+        )
+        self.change_watcher = None
+        self.change_watcher_stop = threading.Event()
+        self.change_poll_seconds = None
         
-        # Time slot management - 
-        self.disabled_time_slots = self._initialize_disabled_time_slots()
+        # Catalog snapshot serving the hierarchical lookups (see get_catalog / refresh_catalog)
+        self.catalog = None
+        self.catalog_lock = threading.Lock()
         
-       
-        self.current_schedule_results = {
-            'scheduled_sessions': [],
-            'conflicts': [],
-            'generated': False,
-            'timestamp': None
-        }
+        # Warm-start copy of the reference data on local disk (see _restore_snapshot)
+        self.snapshot_file = ReferenceSnapshotFile(REFERENCE_SNAPSHOT_PATH) if REFERENCE_SNAPSHOT_PATH else None
+        self.snapshot_entries = {}  # name -> {'markers', 'rows'} as last loaded
+        self.snapshot_lock = threading.Lock()
+        self.restored_from_snapshot = []  # Entries served from disk and not yet checked against the database
+        self._restore_snapshot()
         
         # Standard Excel columns (36 columns)
         self.standard_columns = [
@@ -102,6 +2695,140 @@ class WebSchedulingSystem:
             'Cap_Enrl', 'Facil_ID', 'Day', 'Room_ID', 'Room_Capacity'
         ]
     
+    def _new_workspace(self, token):
+        """Fresh workspace with the default time slot setup"""
+        return PlannerWorkspace(token, self._initialize_disabled_time_slots())
+    
+    def use_workspace(self, workspace):
+        """Bind a workspace to the calling thread (None restores the default one)
+        
+        workspace may also be a callable returning it, called the first time
+        the workspace is needed, so callers that never need it never load it.
+        """
+        self.request_state.workspace = workspace
+    
+    @property
+    def workspace(self):
+        """Workspace bound to the calling thread"""
+        workspace = getattr(self.request_state, 'workspace', None)
+        if callable(workspace):
+            workspace = self.request_state.workspace = workspace()
+        return workspace or self.default_workspace
+    
+    @property
+    def selections(self):
+        """Selections of the bound workspace, or the copy a running job was submitted with"""
+        inputs = getattr(self.request_state, 'inputs', None)
+        return inputs['selections'] if inputs is not None else self.workspace.selections
+    
+    @property
+    def disabled_time_slots(self):
+        inputs = getattr(self.request_state, 'inputs', None)
+        return inputs['disabled_time_slots'] if inputs is not None else self.workspace.disabled_time_slots
+    
+    @property
+    def current_schedule_results(self):
+        return self.workspace.current_schedule_results
+    
+    @current_schedule_results.setter
+    def current_schedule_results(self, results):
+        workspace = self.workspace
+        workspace.current_schedule_results = results
+        workspace.dirty = True
+    
+    def _report_progress(self, phase, placed=None, total=None, conflicts=None, cancellable=True):
+        """Forward progress to the background job running on this thread, if any (see ScheduleJob.report)"""
+        job = getattr(self.request_state, 'job', None)
+        if job is not None:
+            job.report(phase, placed, total, conflicts, cancellable)
+    
+    def _placement_stream(self, phase, classes_data, assigned_teachers, room_index, time_slots, placed=0,
+                          preview=False):
+        """PlacementStream feeding the job running on this thread, or None outside a job"""
+        job = getattr(self.request_state, 'job', None)
+        if job is None:
+            return None
+        return PlacementStream(job, phase, classes_data, assigned_teachers, room_index, time_slots, placed,
+                               preview=preview)
+    
+    def _job_key(self, inputs, options):
+        """Hash of everything that decides a run's outcome: selections, disabled slots and options"""
+        state = {
+            'selections': inputs['selections'],
+            'disabled_time_slots': sorted(inputs['disabled_time_slots']),
+            'options': options
+        }
+        if options.get('incremental') and self.current_schedule_results['generated']:
+            # Builds on this workspace's previous schedule, so it only matches its own repeats
+            state['previous'] = [self.workspace.token, self.current_schedule_results['timestamp']]
+        return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def start_timetable_job(self, selections=None, **options):
+        """Queue generate_timetable(**options) for the current workspace on the job pool
+        
+        The job solves a copy of the workspace's selections (updated with
+        the given ones) and disabled slots, taken here; edits made while it
+        runs do not reach it. The selections are only stored in the workspace
+        once the job is admitted, so a refused request changes nothing.
+        
+        An identical request (same selections, disabled slots and options)
+        already queued or running joins that job; its results are copied to
+        every workspace that joined.
+        """
+        workspace = self.workspace
+        inputs = {
+            'selections': copy.deepcopy(workspace.selections),
+            'disabled_time_slots': set(workspace.disabled_time_slots)
+        }
+        for key, value in (selections or {}).items():
+            if key in inputs['selections']:
+                inputs['selections'][key] = copy.deepcopy(value)
+        
+        def run(job):
+            self.use_workspace(workspace)
+            self.request_state.job = job
+            self.request_state.inputs = inputs
+            result = None
+            try:
+                result = self.generate_timetable(**options)
+                return result
+            finally:
+                members = self.jobs.close(job)
+                if result is not None and result.get('success'):
+                    for token in members - {workspace.token}:
+                        follower = self.workspaces.get(token, create=False)
+                        if follower is None:  # Evicted while the job ran
+                            continue
+                        follower.current_schedule_results = workspace.current_schedule_results
+                        follower.dirty = True
+                        self.workspaces.release(follower)
+                self.request_state.job = None
+                self.request_state.inputs = None
+                self.use_workspace(None)
+                self.workspaces.release(workspace)
+        
+        job, outcome = self.jobs.submit(workspace, run, key=self._job_key(inputs, options))
+        if outcome == 'full':
+            return {
+                'success': False,
+                'error': 'Too many schedules are queued, try again shortly',
+                'max_queued': self.jobs.max_queued
+            }
+        if outcome == 'busy':
+            return {
+                'success': False,
+                'error': 'A schedule is already being generated for this session',
+                'job': self.jobs.describe(job)
+            }
+        if selections:
+            self.set_selections(**selections)
+        return {
+            'success': True,
+            'job_id': job.job_id,
+            'coalesced': outcome == 'coalesced',
+            'job': self.jobs.describe(job)
+        }
+    
     def _initialize_disabled_time_slots(self):
         """Initialize disabled time slots, only keeping 7/49 time slots available"""
         days = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
@@ -137,207 +2864,303 @@ class WebSchedulingSystem:
         disabled_slots = all_time_slots - available_slots
         return disabled_slots
     
-    def get_temp_connection(self):
-        """Create a temporary database connection using the same configuration"""
-        return pyodbc.connect(self.pyodbc_conn_string)
-    
-    def load_available_resources(self):
-        """Load all available resources for selection"""
-        print("Loading available resources...")
+    def load_available_resources(self, options=None):
+        """Load available resources for selection - all of them, or only the given option keys
         
-        # 1. Load Terms
-        terms_sql = "SELECT Term_Code, Term_Name, Session, Start_Date, End_Date FROM Term ORDER BY Term_Code"
-        self.available_options['terms'] = pd.read_sql(terms_sql, self.engine)
-        
-        # 2. Load Campuses
-        campus_sql = "SELECT Campus, Description FROM Campus ORDER BY Campus"
-        self.available_options['campuses'] = pd.read_sql(campus_sql, self.engine)
-        
-        # 3. Load Academic Groups
-        acad_group_sql = "SELECT DISTINCT Acad_Group FROM CourseCatalog WHERE Acad_Group IS NOT NULL ORDER BY Acad_Group"
-        self.available_options['acad_groups'] = pd.read_sql(acad_group_sql, self.engine)
-        
-        # 4. Load Subjects (by Academic Group)
-        subject_sql = """
-        SELECT cc.Subject, cc.Acad_Group, COUNT(*) as Course_Count
-        FROM CourseCatalog cc 
-        WHERE cc.Subject IS NOT NULL 
-        GROUP BY cc.Subject, cc.Acad_Group 
-        ORDER BY cc.Acad_Group, cc.Subject
+        Each option is loaded into a ResourceTable. The fresh tables are
+        swapped into available_options in one assignment, so readers never
+        block or see a half-loaded cache.
         """
-        self.available_options['subjects'] = pd.read_sql(subject_sql, self.engine)
+        print("Loading available resources...")
         
-        # 5. Load Teachers
-        teacher_sql = """
-        SELECT t.F_ID, t.First_Name, t.Last_Name, 
-               COUNT(DISTINCT ci.Class_Nbr) as Teaching_Load
-        FROM Teacher t
-        LEFT JOIN ClassInstructor ci ON t.F_ID = ci.F_ID
-        GROUP BY t.F_ID, t.First_Name, t.Last_Name
-        ORDER BY t.Last_Name, t.First_Name
+        queries = {
+            # 1. Load Terms
+            'terms': "SELECT Term_Code, Term_Name, Session, Start_Date, End_Date FROM Term ORDER BY Term_Code",
+            
+            # 2. Load Campuses
+            'campuses': "SELECT Campus, Description FROM Campus ORDER BY Campus",
+            
+            # 3. Load Academic Groups
+            'acad_groups': "SELECT DISTINCT Acad_Group FROM CourseCatalog WHERE Acad_Group IS NOT NULL ORDER BY Acad_Group",
+            
+            # 4. Load Subjects (by Academic Group)
+            'subjects': """
+            SELECT cc.Subject, cc.Acad_Group, COUNT(*) as Course_Count
+            FROM CourseCatalog cc 
+            WHERE cc.Subject IS NOT NULL 
+            GROUP BY cc.Subject, cc.Acad_Group 
+            ORDER BY cc.Acad_Group, cc.Subject
+            """,
+            
+            # 5. Load Teachers
+            'teachers': """
+            SELECT t.F_ID, t.First_Name, t.Last_Name, 
+                   COUNT(DISTINCT ci.Class_Nbr) as Teaching_Load
+            FROM Teacher t
+            LEFT JOIN ClassInstructor ci ON t.F_ID = ci.F_ID
+            GROUP BY t.F_ID, t.First_Name, t.Last_Name
+            ORDER BY t.Last_Name, t.First_Name
+            """,
+            
+            # 6. Load Rooms
+            'rooms': """
+            SELECT Room_ID, Description, Capacity, Gender, Location, Facil_ID
+            FROM Room 
+            WHERE Capacity > 0
+            ORDER BY Location, Capacity DESC
+            """
+        }
+        
+        markers = dict(self.change_monitor.markers)  # Last poll, taken before the rows are read
+        fresh = {}
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for option in (options or queries):
+                cursor.execute(queries[option])
+                fresh[option] = ResourceTable.from_cursor(option, cursor, RESOURCE_KEYS.get(option))
+        with self.resources_lock:
+            self.available_options = {**self.available_options, **fresh}
+        self._update_snapshot({option: (RESOURCE_SOURCE_TABLES[option], table) for option, table in fresh.items()}, markers)
+        
+        print(f"Resources loaded successfully! ({', '.join(fresh)})")
+        return self.available_options
+    
+    def check_for_changes(self):
+        """Poll the change markers once and reload only what the changed tables feed"""
+        changed = set(self.change_monitor.poll())
+        reloaded = [option for option, tables in RESOURCE_SOURCE_TABLES.items()
+                    if option in self.available_options and changed & tables]
+        if reloaded:
+            self.load_available_resources(reloaded)
+        if changed & CATALOG_SOURCE_TABLES and self.catalog is not None:
+            self.refresh_catalog()
+            reloaded.append('catalog')
+        if changed:
+            print(f"Tables changed: {', '.join(sorted(changed))}; reloaded: {', '.join(reloaded) or 'nothing cached'}")
+        return {'changed_tables': sorted(changed), 'reloaded': reloaded}
+    
+    def start_change_watcher(self, interval=CACHE_POLL_SECONDS):
+        """Poll for table changes every interval seconds on a daemon thread"""
+        if not interval or self.change_watcher is not None:
+            return
+        self.change_monitor.poll()  # Baseline before anything is served
+        
+        def watch():
+            while not self.change_watcher_stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"Change check failed: {str(e)}")
+        
+        self.change_poll_seconds = interval
+        self.change_watcher = threading.Thread(target=watch, name='resource-change-watcher', daemon=True)
+        self.change_watcher.start()
+    
+    def start_warmup(self, initial_delay=DB_CONNECT_RETRY_INITIAL, max_delay=DB_CONNECT_RETRY_MAX):
+        """Start the change watcher, check a restored snapshot and load the catalog on a daemon thread,
+        retrying until the database is up
+        
+        Retries back off exponentially from initial_delay to max_delay
+        seconds. Until it succeeds, requests are served from the restored
+        snapshot, or load what they need themselves.
         """
-        self.available_options['teachers'] = pd.read_sql(teacher_sql, self.engine)
+        if self.warmup_thread is not None:
+            return
         
-        # 6. Load Rooms
-        room_sql = """
-        SELECT Room_ID, Description, Capacity, Gender, Location, Facil_ID
-        FROM Room 
-        WHERE Capacity > 0
-        ORDER BY Location, Capacity DESC
+        def warm_up():
+            delay = initial_delay
+            while True:
+                try:
+                    self.start_change_watcher()
+                    self.refresh_stale_snapshot()
+                    self.get_catalog()
+                    print("Database reachable, caches warmed up")
+                    return
+                except Exception as e:
+                    print(f"Database not ready ({str(e)}), retrying in {delay}s")
+                if self.change_watcher_stop.wait(delay):
+                    return
+                delay = min(delay * 2, max_delay)
+        
+        self.warmup_thread = threading.Thread(target=warm_up, name='cache-warmup', daemon=True)
+        self.warmup_thread.start()
+    
+    def get_cache_status(self):
+        """Cached resources, catalog version and the last change markers seen"""
+        monitor = self.change_monitor
+        return {
+            'cached_options': sorted(self.available_options),
+            'catalog_version': self.catalog.version if self.catalog else None,
+            'watcher_running': self.change_watcher is not None and self.change_watcher.is_alive(),
+            'poll_seconds': self.change_poll_seconds,
+            'last_poll': monitor.last_poll.isoformat() if monitor.last_poll else None,
+            'markers': {table: [str(v) for v in marker] for table, marker in monitor.markers.items()},
+            'snapshot_path': self.snapshot_file.path if self.snapshot_file else None,
+            'snapshot_unchecked': list(self.restored_from_snapshot)
+        }
+    
+    def get_catalog(self):
+        """Current catalog snapshot, loading it on first use"""
+        catalog = self.catalog
+        if catalog is None:
+            with self.catalog_lock:
+                if self.catalog is None:
+                    self._load_catalog()
+                catalog = self.catalog
+        return catalog
+    
+    def refresh_catalog(self):
+        """Reload the catalog snapshot from the database and swap it in"""
+        with self.catalog_lock:
+            self._load_catalog()
+        return self.catalog.status()
+    
+    def _load_catalog(self):
+        """Build the next catalog snapshot version (caller holds catalog_lock)"""
+        catalog_sql = """
+        SELECT Catalog, Course_Code, Course_Title, Subject, Acad_Group
+        FROM CourseCatalog
+        """
+        # Same columns and joins as the per-request section lookup it replaces
+        sections_sql = """
+        SELECT 
+            cs.Class_Nbr, cs.Catalog, cs.Section, cs.Cap_Enrl, cs.Tot_Enrl, cs.Class_Stat,
+            cc.Course_Title, cc.Subject, cc.Course_Code, cc.Max_Units,
+            COALESCE(co.Term, '2401') as Term, 
+            COALESCE(co.Session, 'FAL') as Session, 
+            COALESCE(co.Assign_Type, 'CLS') as Assign_Type, 
+            COALESCE(co.Component, 'LEC') as Component
+        FROM ClassSection cs
+        JOIN CourseCatalog cc ON cs.Catalog = cc.Catalog
+        LEFT JOIN CourseOffering co ON cs.Catalog = co.Catalog AND 
+                  (cs.Offer_Nbr = co.Offer_Nbr OR (cs.Offer_Nbr IS NULL AND co.Offer_Nbr = 1))
+        WHERE cs.Class_Stat = 'A'
+        """
+        offerings_sql = """
+        SELECT Catalog, Offer_Nbr, Term, Session, Assign_Type, Component
+        FROM CourseOffering
         """
-        self.available_options['rooms'] = pd.read_sql(room_sql, self.engine)
         
-        print("Resources loaded successfully!")
-        return self.available_options
+        started = time.perf_counter()
+        markers = dict(self.change_monitor.markers)
+        raw = []
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for sql in (catalog_sql, sections_sql, offerings_sql):
+                cursor.execute(sql)
+                raw.append(([col[0] for col in cursor.description], [tuple(row) for row in cursor.fetchall()]))
+        
+        version = self.catalog.version + 1 if self.catalog else 1
+        self.catalog = CatalogSnapshot(*[[dict(zip(columns, row)) for row in rows] for columns, rows in raw],
+                                       version=version)
+        print(f"Loaded catalog snapshot v{version} in {time.perf_counter() - started:.2f}s: {self.catalog.counts}")
+        self._update_snapshot({'catalog': (CATALOG_SOURCE_TABLES, raw)}, markers)
+    
+    def _update_snapshot(self, entries, markers):
+        """Record freshly loaded entries (name -> (source tables, rows)) and rewrite the snapshot file"""
+        if self.snapshot_file is None:
+            return
+        with self.snapshot_lock:
+            for name, (tables, rows) in entries.items():
+                self.snapshot_entries[name] = {'markers': {table: markers.get(table) for table in tables}, 'rows': rows}
+            try:
+                self.snapshot_file.save(self.snapshot_entries)
+            except Exception as e:
+                print(f"Reference snapshot not written: {str(e)}")
+    
+    def _restore_snapshot(self):
+        """Serve the reference data from the local snapshot until the database has been checked"""
+        payload = self.snapshot_file.load() if self.snapshot_file else None
+        if payload is None:
+            return
+        entries = {name: entry for name, entry in payload['entries'].items()
+                   if name in RESOURCE_SOURCE_TABLES or name == 'catalog'}
+        self.available_options = {name: entry['rows'] for name, entry in entries.items() if name != 'catalog'}
+        if 'catalog' in entries:
+            self.catalog = CatalogSnapshot(*[[dict(zip(columns, row)) for row in rows]
+                                             for columns, rows in entries['catalog']['rows']])
+        self.snapshot_entries = entries
+        self.restored_from_snapshot = sorted(entries)
+        print(f"Restored {', '.join(self.restored_from_snapshot)} from the reference snapshot "
+              f"written {payload['written_at']:%Y-%m-%d %H:%M:%S}")
+    
+    def refresh_stale_snapshot(self):
+        """Reload the restored entries whose source tables changed since the snapshot was written"""
+        restored = self.restored_from_snapshot
+        if not restored:
+            return []
+        if self.change_monitor.last_poll is None:
+            self.change_monitor.poll()
+        current = self.change_monitor.markers
+        stale = [name for name in restored
+                 if any(marker is None or current.get(table) != marker
+                        for table, marker in self.snapshot_entries[name]['markers'].items())]
+        options = [name for name in stale if name != 'catalog']
+        if options:
+            self.load_available_resources(options)
+        if 'catalog' in stale:
+            self.refresh_catalog()
+        self.restored_from_snapshot = []
+        print(f"Reference snapshot checked: {len(restored) - len(stale)} current, reloaded {', '.join(stale) or 'nothing'}")
+        return stale
     
     def get_terms(self):
         """Get available terms"""
         if 'terms' not in self.available_options:
             self.load_available_resources()
-        return self.available_options['terms'].to_dict('records')
+        return self.available_options['terms'].records()
     
     def get_sessions(self):
         """Get available sessions"""
         if 'terms' not in self.available_options:
             self.load_available_resources()
-        sessions = self.available_options['terms']['Session'].unique()
+        sessions = dict.fromkeys(self.available_options['terms'].column('Session'))
         return [{'Session': s} for s in sessions]
     
     def get_campuses(self):
         """Get available campuses"""
         if 'campuses' not in self.available_options:
             self.load_available_resources()
-        return self.available_options['campuses'].to_dict('records')
+        return self.available_options['campuses'].records()
     
     def get_acad_groups(self):
         """Get available academic groups"""
         if 'acad_groups' not in self.available_options:
             self.load_available_resources()
-        return self.available_options['acad_groups'].to_dict('records')
+        return self.available_options['acad_groups'].records()
     
     def get_subjects_by_acad_group(self, acad_group):
         """Get subjects filtered by academic group with correct course count (distinct courses)"""
-        if 'subjects' not in self.available_options:
-            self.load_available_resources()
-        
-        # Use deduplicated course count statistics
-        subject_sql = """
-        SELECT cc.Subject, cc.Acad_Group, 
-               COUNT(DISTINCT cc.Course_Code) as Course_Count
-        FROM CourseCatalog cc 
-        WHERE cc.Acad_Group = ? AND cc.Subject IS NOT NULL 
-          AND cc.Course_Code IS NOT NULL AND cc.Course_Code != ''
-        GROUP BY cc.Subject, cc.Acad_Group 
-        ORDER BY cc.Subject
-        """
-        
-        # Create new database connection to avoid concurrency conflicts
-        temp_conn = self.get_temp_connection()
-        
-        try:
-            cursor = temp_conn.cursor()
-            cursor.execute(subject_sql, acad_group)
-            
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-            
-            subjects_data = []
-            for row in rows:
-                subjects_data.append(dict(zip(columns, row)))
-            
-            return subjects_data
-        finally:
-            temp_conn.close()
+        return self.get_catalog().subjects([acad_group])
     
     def get_classes_by_subject(self, subject):
         """Get unique courses (not classes) filtered by subject - returns Course_Code and Course_Title only"""
-        courses_sql = """
-        SELECT DISTINCT
-            cc.Course_Code, cc.Course_Title
-        FROM CourseCatalog cc
-        WHERE cc.Subject = ? AND cc.Course_Code IS NOT NULL AND cc.Course_Code != ''
-        ORDER BY cc.Course_Code
-        """
-        
-        # Create new database connection to avoid concurrency conflicts
-        temp_conn = self.get_temp_connection()
-        
-        try:
-            cursor = temp_conn.cursor()
-            cursor.execute(courses_sql, subject)
-            
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-            
-            courses_data = []
-            for row in rows:
-                courses_data.append(dict(zip(columns, row)))
-            
-            return courses_data
-        finally:
-            temp_conn.close()
+        return self.get_catalog().courses(subject)
     
     def get_classes_by_course_codes(self, course_codes):
         """Get all class sections for selected course codes"""
         if not course_codes:
             return []
         
-        placeholders = ','.join(['?' for _ in course_codes])
-        # Fix: Simplify query, don't rely on CourseOffering JOIN, because new ClassSection's Offer_Nbr may be NULL
-        classes_sql = f"""
-        SELECT 
-            cs.Class_Nbr, cs.Catalog, cs.Section, cs.Cap_Enrl, cs.Tot_Enrl, cs.Class_Stat,
-            cc.Course_Title, cc.Subject, cc.Course_Code, cc.Max_Units,
-            COALESCE(co.Term, '2401') as Term, 
-            COALESCE(co.Session, 'FAL') as Session, 
-            COALESCE(co.Assign_Type, 'CLS') as Assign_Type, 
-            COALESCE(co.Component, 'LEC') as Component
-        FROM ClassSection cs
-        JOIN CourseCatalog cc ON cs.Catalog = cc.Catalog
-        LEFT JOIN CourseOffering co ON cs.Catalog = co.Catalog AND 
-                  (cs.Offer_Nbr = co.Offer_Nbr OR (cs.Offer_Nbr IS NULL AND co.Offer_Nbr = 1))
-        WHERE cc.Course_Code IN ({placeholders}) AND cs.Class_Stat = 'A'
-        ORDER BY cc.Course_Code, cs.Section
-        """
-        
-        # Create new database connection to avoid concurrency conflicts
-        temp_conn = self.get_temp_connection()
-        
-        try:
-            cursor = temp_conn.cursor()
-            cursor.execute(classes_sql, course_codes)
-            
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-            
-            classes_data = []
-            for row in rows:
-                classes_data.append(dict(zip(columns, row)))
-            
-            return classes_data
-        finally:
-            temp_conn.close()
+        return self.get_catalog().sections(course_codes)
     
     def get_teachers_for_classes(self, class_nbrs):
         """Get teachers assigned to specific classes"""
         if not class_nbrs:
             return []
         
-        placeholders = ','.join(['?' for _ in class_nbrs])
         teachers_sql = f"""
         SELECT DISTINCT t.F_ID, t.First_Name, t.Last_Name, ci.Class_Nbr
         FROM Teacher t
         JOIN ClassInstructor ci ON t.F_ID = ci.F_ID
-        WHERE ci.Class_Nbr IN ({placeholders}) AND ci.Role = 'PI'
+        WHERE ci.Class_Nbr IN {id_list_sql()} AND ci.Role = 'PI'
         ORDER BY t.Last_Name, t.First_Name
         """
         
-        # Create new database connection to avoid concurrency conflicts
-        temp_conn = self.get_temp_connection()
-        
-        try:
-            cursor = temp_conn.cursor()
-            cursor.execute(teachers_sql, class_nbrs)
+        # Pooled connection: one per thread at a time, no login per call
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(teachers_sql, id_list_param(class_nbrs))
             
             columns = [col[0] for col in cursor.description]
             rows = cursor.fetchall()
@@ -347,8 +3170,6 @@ class WebSchedulingSystem:
                 teachers_data.append(dict(zip(columns, row)))
             
             return teachers_data
-        finally:
-            temp_conn.close()
     
     def get_available_rooms(self, min_capacity=0):
         """Get available rooms with minimum capacity"""
@@ -356,8 +3177,13 @@ class WebSchedulingSystem:
             self.load_available_resources()
         
         rooms = self.available_options['rooms']
-        filtered_rooms = rooms[rooms['Capacity'] >= min_capacity]
-        return filtered_rooms.to_dict('records')
+        return rooms.records([room for room in rooms if room.Capacity >= min_capacity])
+    
+    def get_resource_table(self, option):
+        """Cached ResourceTable for one resource option, loading it on first use"""
+        if option not in self.available_options:
+            self.load_available_resources([option])
+        return self.available_options[option]
     
     def set_selections(self, **selections):
         """Set user selections"""
@@ -368,16 +3194,177 @@ class WebSchedulingSystem:
         
         return self.selections
     
-    def generate_timetable(self):
-        """Generate timetable based on current selections - 不自动导出Excel"""
+    def generate_timetable(self, engine='greedy', match_rooms=True, restarts=1, workers=1, seed=None,
+                           improve_seconds=0, incremental=False):
+        """Generate timetable based on current selections - 不自动导出Excel
+        
+        engine='greedy' places classes first-fit in query order over shuffled
+        slots. engine='dsatur' also runs the greedy pass, then the
+        most-constrained-first DsaturSolver, and keeps whichever leaves fewer
+        conflicts; both wall-clock times are reported in run_stats, and
+        run_stats['engine_fallback'] says when the greedy result was kept.
+        
+        With match_rooms, the chosen result is post-processed slot by slot
+        with match_rooms_per_slot, which can only add sections and reduce
+        wasted seats.
+        
+        restarts > 1 replaces the single greedy pass with that many seeded
+        passes run across `workers` processes (see _run_multistart); seed
+        makes the greedy pass reproducible.
+        
+        improve_seconds > 0 adds an anytime local-search phase
+        (LocalSearchImprover) that returns the best solution found when the
+        budget runs out, so latency stays bounded.
+        
+        incremental=True diffs the selection against the last generated
+        schedule and only places what changed (see _generate_incremental);
+        without a previous schedule it does a full run.
+        """
         print("Generating timetable...")
         
         # Validate selections
         if not self.selections['classes']:
             return {'error': 'No classes selected'}
         
+        if engine not in SCHEDULING_ENGINES:
+            return {'error': f"Unknown scheduling engine '{engine}'. Choose one of: {', '.join(SCHEDULING_ENGINES)}"}
+        
+        if incremental and self.current_schedule_results['generated']:
+            return self._generate_incremental(improve_seconds, seed)
+        
         # Get selected classes data
-        class_placeholders = ','.join(['?' for _ in self.selections['classes']])
+        self._report_progress('loading', total=len(self.selections['classes']))
+        classes_data = self._fetch_classes(self.selections['classes'])
+        
+        # Generate time slots
+        time_slots = self.get_available_time_slots()  # Use available time slots (excluding disabled)
+        
+        # Get available rooms and teachers
+        available_rooms = self.selections['rooms'] if self.selections['rooms'] else [r['Room_ID'] for r in self.get_available_rooms()]
+        available_teachers = self.selections['teachers'] if self.selections['teachers'] else []
+        
+        # Index rooms once for the whole run instead of re-filtering the DataFrame per slot
+        if 'rooms' not in self.available_options:
+            self.load_available_resources()
+        room_index = RoomIndex(self.available_options['rooms'], available_rooms)
+        
+        # Prefetch instructors for every selected class in one query
+        class_instructors, teacher_names = self._load_class_instructors([c['Class_Nbr'] for c in classes_data])
+        run_stats = {
+            'class_count': len(classes_data),
+            'instructor_queries': 1 if classes_data else 0,
+            'instructor_queries_saved': max(len(classes_data) - 1, 0),
+            'engine': engine
+        }
+        
+        # Get assigned teacher for each class (first PI from the prefetched map)
+        assigned_teachers = self._assign_teachers(classes_data, class_instructors, available_teachers)
+        
+        # Room/slot feasibility of every class, computed once and shared by all solvers
+        feasibility = self._build_feasibility(classes_data, assigned_teachers, room_index, time_slots)
+        run_stats['conflict_lower_bounds'] = feasibility.conflict_lower_bounds()
+        
+        # Schedule classes
+        self._report_progress('greedy', placed=0, total=len(classes_data))
+        started = time.perf_counter()
+        if restarts > 1:
+            placements, unplaced, occupancy, run_stats['multistart'] = self._run_multistart(
+                classes_data, assigned_teachers, room_index, time_slots, feasibility, restarts, workers, seed
+            )
+        else:
+            placements, unplaced, occupancy = self._run_greedy_pass(
+                classes_data, assigned_teachers, room_index, time_slots, feasibility, seed,
+                preview=engine != 'greedy'
+            )
+        run_stats['engine_seconds'] = {'greedy': round(time.perf_counter() - started, 4)}
+        run_stats['engine_conflicts'] = {'greedy': len(unplaced)}
+        
+        if engine == 'dsatur':
+            self._report_progress('dsatur', placed=len(placements), conflicts=len(unplaced))
+            started = time.perf_counter()
+            dsatur_placements, dsatur_unplaced, dsatur_occupancy, search = self._run_dsatur_pass(
+                classes_data, assigned_teachers, room_index, time_slots, feasibility
+            )
+            run_stats['engine_seconds']['dsatur'] = round(time.perf_counter() - started, 4)
+            run_stats['engine_conflicts']['dsatur'] = len(dsatur_unplaced)
+            run_stats['dsatur_backtracks'] = search['backtracks']
+            run_stats['dsatur_search'] = search
+            
+            # Keep the greedy result only if the search did worse, and say so
+            if len(dsatur_unplaced) <= len(unplaced):
+                placements, unplaced, occupancy = dsatur_placements, dsatur_unplaced, dsatur_occupancy
+            else:
+                run_stats['engine'] = 'greedy'
+                run_stats['engine_fallback'] = {
+                    'requested': 'dsatur',
+                    'used': 'greedy',
+                    'reason': f"dsatur left {len(dsatur_unplaced)} conflicts, greedy {len(unplaced)}"
+                }
+                print(f"DSATUR left more conflicts than the greedy pass ({len(dsatur_unplaced)} vs {len(unplaced)}), keeping greedy")
+        
+        # Time-budgeted local search to make space for conflicting classes
+        if improve_seconds and unplaced:
+            self._report_progress('local_search', placed=len(placements), conflicts=len(unplaced))
+            placements, unplaced, run_stats['local_search'] = self._run_local_search(
+                classes_data, feasibility, occupancy, placements, unplaced, improve_seconds, seed
+            )
+        
+        # Optimal room assignment per slot on top of whichever solver ran
+        if match_rooms:
+            self._report_progress('room_matching', placed=len(placements), conflicts=len(unplaced))
+            started = time.perf_counter()
+            placements, unplaced, matching_stats = self._run_room_matching(
+                classes_data, feasibility, occupancy, placements, unplaced
+            )
+            matching_stats['seconds'] = round(time.perf_counter() - started, 4)
+            run_stats['room_matching'] = matching_stats
+        
+        scheduled_sessions = self._build_sessions(
+            classes_data, assigned_teachers, room_index, time_slots, placements
+        )
+        
+        # Create conflict records
+        conflicts = [
+            self._create_conflict_record(
+                classes_data[i], available_rooms, assigned_teachers[i], classes_data[i]['Cap_Enrl']
+            )
+            for i in unplaced
+        ]
+        
+        # Save results to database (replacing any stored rows of these classes); last point a job can be cancelled
+        self._report_progress('saving', placed=len(placements), conflicts=len(unplaced))
+        run_stats['persistence'] = self._save_schedule(
+            scheduled_sessions, conflicts, [c['Class_Nbr'] for c in classes_data]
+        )
+        
+        # Save current schedule results to memory
+        class_details = self._class_details(classes_data, class_instructors, teacher_names)
+        self.current_schedule_results = {
+            'scheduled_sessions': scheduled_sessions,
+            'conflicts': conflicts,
+            'class_details': class_details,
+            'generated': True,
+            'timestamp': datetime.now()
+        }
+        
+        # Generate timetable view (do not generate Excel file)
+        self._report_progress('rendering', cancellable=False)
+        started = time.perf_counter()
+        timetable_data = self._generate_timetable_view(scheduled_sessions, class_details)
+        run_stats['view_seconds'] = round(time.perf_counter() - started, 4)
+        
+        return {
+            'success': True,
+            'scheduled_count': len(scheduled_sessions),
+            'conflict_count': len(conflicts),
+            'timetable': timetable_data,
+            'conflicts': conflicts,
+            'available_time_slots': len(time_slots),
+            'run_stats': run_stats
+        }
+    
+    def _fetch_classes(self, class_nbrs):
+        """Fetch the active class sections to schedule, as dicts"""
         classes_sql = f"""
         SELECT 
             cs.Class_Nbr, cs.Catalog, cs.Section, cs.Cap_Enrl, cs.Tot_Enrl,
@@ -386,91 +3373,164 @@ class WebSchedulingSystem:
         FROM ClassSection cs
         JOIN CourseCatalog cc ON cs.Catalog = cc.Catalog
         JOIN CourseOffering co ON cs.Catalog = co.Catalog AND cs.Offer_Nbr = co.Offer_Nbr
-        WHERE cs.Class_Nbr IN ({class_placeholders}) AND cs.Class_Stat = 'A'
+        WHERE cs.Class_Nbr IN {id_list_sql()} AND cs.Class_Stat = 'A'
         """
         
         # Use pyodbc connection to avoid SQLAlchemy parameter issues
-        cursor = self.conn.cursor()
-        cursor.execute(classes_sql, self.selections['classes'])
-        
-        columns = [col[0] for col in cursor.description]
-        rows = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(classes_sql, id_list_param(class_nbrs))
+            
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
         
         classes_data = []
         for row in rows:
             classes_data.append(dict(zip(columns, row)))
         
-        # Generate time slots
-        time_slots = self.get_available_time_slots()  # Use available time slots (excluding disabled)
+        return classes_data
+    
+    def _assign_teachers(self, classes_data, class_instructors, available_teachers):
+        """First PI per class, or None if it is not among the selected teachers"""
+        assigned_teachers = []
+        for class_info in classes_data:
+            assigned_teacher = None
+            class_teachers = class_instructors.get(class_info['Class_Nbr'])
+            if class_teachers:
+                assigned_teacher = class_teachers[0]  # F_ID
+                # If specific teachers selected, check if this teacher is in the list
+                if available_teachers and assigned_teacher not in available_teachers:
+                    assigned_teacher = None
+            assigned_teachers.append(assigned_teacher)
+        return assigned_teachers
+    
+    def _generate_incremental(self, improve_seconds=0, seed=None):
+        """Re-solve only what changed since the last generated schedule
         
-        # Get available rooms and teachers
+        Sessions of classes that are still selected stay pinned in their
+        room and slot, departed classes are dropped, and only new classes
+        (plus earlier conflicts and sessions whose room or slot is no longer
+        available) are placed around them. Only the changed rows are written
+        back to the database.
+        """
+        print("Rescheduling incrementally...")
+        self._report_progress('loading', total=len(self.selections['classes']))
+        started = time.perf_counter()
+        selected = set(self.selections['classes'])
+        previous_sessions = self.current_schedule_results['scheduled_sessions']
+        previous_conflicts = self.current_schedule_results['conflicts']
+        
+        time_slots = self.get_available_time_slots()
         available_rooms = self.selections['rooms'] if self.selections['rooms'] else [r['Room_ID'] for r in self.get_available_rooms()]
         available_teachers = self.selections['teachers'] if self.selections['teachers'] else []
+        if 'rooms' not in self.available_options:
+            self.load_available_resources()
+        room_index = RoomIndex(self.available_options['rooms'], available_rooms)
+        
+        occupancy = self._new_occupancy(room_index, time_slots, [s['F_ID'] for s in previous_sessions])
+        
+        # Pin sessions that are still selected and still fit the current rooms and slots
+        kept_sessions = []
+        for session in previous_sessions:
+            if session['Class_Nbr'] not in selected:
+                continue
+            room = occupancy.room_pos.get(session['Room_ID'])
+            slot = occupancy.slot_pos.get(
+                f"{session['Day']}_{str(session['Mtg_Start'])[:5]}-{str(session['Mtg_End'])[:5]}"
+            )
+            teacher = occupancy.intern_teacher(session['F_ID'])
+            if room is None or slot is None or not occupancy.is_room_free(room, slot) \
+                    or not occupancy.is_teacher_free(teacher, slot):
+                continue
+            occupancy.occupy(room, slot, teacher, session['Class_Nbr'])
+            kept_sessions.append(session)
         
-        # Schedule classes
-        scheduled_sessions = []
-        conflicts = []
+        kept = {s['Class_Nbr'] for s in kept_sessions}
+        previous = {s['Class_Nbr'] for s in previous_sessions} | {c['Class_Nbr'] for c in previous_conflicts}
+        departed = previous - selected
+        to_place = [class_nbr for class_nbr in self.selections['classes'] if class_nbr not in kept]
         
-        # Resource tracking
-        teacher_schedule = {}
-        room_schedule = {}
+        classes_data = self._fetch_classes(to_place) if to_place else []
+        class_instructors, teacher_names = self._load_class_instructors([c['Class_Nbr'] for c in classes_data])
+        assigned_teachers = self._assign_teachers(classes_data, class_instructors, available_teachers)
+        feasibility = self._build_feasibility(classes_data, assigned_teachers, room_index, time_slots, occupancy)
         
-        for class_info in classes_data:
-            class_nbr = class_info['Class_Nbr']
-            required_capacity = class_info['Cap_Enrl']
-            
-            # Get assigned teacher for this class
-            teacher_sql = """
-            SELECT t.F_ID, t.First_Name, t.Last_Name
-            FROM Teacher t
-            JOIN ClassInstructor ci ON t.F_ID = ci.F_ID
-            WHERE ci.Class_Nbr = ? AND ci.Role = 'PI'
-            """
-            
-            # Use pyodbc to query teacher information
-            teacher_cursor = self.conn.cursor()
-            teacher_cursor.execute(teacher_sql, class_nbr)
-            teacher_rows = teacher_cursor.fetchall()
-            
-            assigned_teacher = None
-            if teacher_rows:
-                assigned_teacher = teacher_rows[0][0]  # F_ID
-                # If specific teachers selected, check if this teacher is in the list
-                if available_teachers and assigned_teacher not in available_teachers:
-                    assigned_teacher = None
-            
-            # Try to schedule this class
-            scheduled = self._schedule_single_class(
-                class_info, available_rooms, time_slots, 
-                teacher_schedule, room_schedule, assigned_teacher
+        placements = {}
+        unplaced = []
+        self._report_progress('incremental', placed=len(kept_sessions))
+        stream = self._placement_stream(
+            'incremental', classes_data, assigned_teachers, room_index, time_slots, len(kept_sessions)
+        )
+        rng = random.Random(seed) if seed is not None else random
+        for i, class_info in enumerate(classes_data):
+            placement = place_first_fit(
+                occupancy, int(feasibility.room_starts[i]), int(feasibility.teachers[i]),
+                class_info['Class_Nbr'], rng
             )
-            
-            if scheduled:
-                scheduled_sessions.append(scheduled)
+            if placement:
+                placements[i] = placement
             else:
-                # Create conflict record
-                conflict_info = self._create_conflict_record(
-                    class_info, available_rooms, assigned_teacher, required_capacity
-                )
-                conflicts.append(conflict_info)
+                unplaced.append(i)
+            if stream is not None:
+                stream.add(i, placement)
+        if stream is not None:
+            stream.flush()
+        
+        run_stats = {
+            'class_count': len(selected),
+            'instructor_queries': 1 if classes_data else 0,
+            'instructor_queries_saved': max(len(classes_data) - 1, 0),
+            'engine': 'incremental',
+            'incremental': {
+                'kept': len(kept_sessions),
+                'departed': len(departed),
+                'placed': len(placements),
+                'unplaced': len(unplaced)
+            }
+        }
         
-        # Save results to database
-        if scheduled_sessions:
-            self._save_scheduled_sessions(scheduled_sessions)
+        # Pinned sessions are not owned by the improver, so it only moves new ones
+        if improve_seconds and unplaced:
+            self._report_progress('local_search', placed=len(kept_sessions) + len(placements), conflicts=len(unplaced))
+            placements, unplaced, run_stats['local_search'] = self._run_local_search(
+                classes_data, feasibility, occupancy, placements, unplaced, improve_seconds, seed
+            )
         
-        if conflicts:
-            self._save_conflicts(conflicts)
+        new_sessions = self._build_sessions(
+            classes_data, assigned_teachers, room_index, time_slots, placements
+        )
+        conflicts = [
+            self._create_conflict_record(
+                classes_data[i], available_rooms, assigned_teachers[i], classes_data[i]['Cap_Enrl']
+            )
+            for i in unplaced
+        ]
         
-        # Save current schedule results to memory
+        # Write only the changed rows: drop departed and re-placed classes, add the new results
+        self._report_progress('saving', placed=len(kept_sessions) + len(placements), conflicts=len(unplaced))
+        run_stats['persistence'] = self._save_schedule(
+            new_sessions, conflicts, departed | {c['Class_Nbr'] for c in classes_data}
+        )
+        
+        selection_order = {class_nbr: k for k, class_nbr in enumerate(self.selections['classes'])}
+        scheduled_sessions = sorted(kept_sessions + new_sessions, key=lambda s: selection_order[s['Class_Nbr']])
+        class_details = {
+            class_nbr: details
+            for class_nbr, details in self.current_schedule_results.get('class_details', {}).items()
+            if class_nbr in selected
+        }
+        class_details.update(self._class_details(classes_data, class_instructors, teacher_names))
         self.current_schedule_results = {
             'scheduled_sessions': scheduled_sessions,
             'conflicts': conflicts,
+            'class_details': class_details,
             'generated': True,
             'timestamp': datetime.now()
         }
+        run_stats['engine_seconds'] = {'incremental': round(time.perf_counter() - started, 4)}
         
-        # Generate timetable view (do not generate Excel file)
-        timetable_data = self._generate_timetable_view(scheduled_sessions)
+        self._report_progress('rendering', cancellable=False)
+        timetable_data = self._generate_timetable_view(scheduled_sessions, class_details)
         
         return {
             'success': True,
@@ -478,9 +3538,44 @@ class WebSchedulingSystem:
             'conflict_count': len(conflicts),
             'timetable': timetable_data,
             'conflicts': conflicts,
-            'available_time_slots': len(time_slots)
+            'available_time_slots': len(time_slots),
+            'run_stats': run_stats
         }
     
+    def _load_class_instructors(self, class_nbrs, include_secondary=False):
+        """Load instructors for many classes in one set-based query
+        
+        Returns (Class_Nbr -> [F_ID], F_ID -> (First_Name, Last_Name)). PI
+        instructors come first in each list; other roles are only included
+        when include_secondary is set.
+        """
+        class_instructors = {}
+        teacher_names = {}
+        if not class_nbrs:
+            return class_instructors, teacher_names
+        
+        role_filter = "" if include_secondary else "AND ci.Role = 'PI'"
+        instructors_sql = f"""
+        SELECT ci.Class_Nbr, t.F_ID, t.First_Name, t.Last_Name
+        FROM Teacher t
+        JOIN ClassInstructor ci ON t.F_ID = ci.F_ID
+        WHERE ci.Class_Nbr IN {id_list_sql()} {role_filter}
+        ORDER BY ci.Class_Nbr, CASE WHEN ci.Role = 'PI' THEN 0 ELSE 1 END, ci.ID
+        """
+        
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(instructors_sql, id_list_param(class_nbrs))
+            rows = cursor.fetchall()
+        
+        for class_nbr, f_id, first_name, last_name in rows:
+            f_ids = class_instructors.setdefault(class_nbr, [])
+            if f_id not in f_ids:
+                f_ids.append(f_id)
+            teacher_names[f_id] = (first_name, last_name)
+        
+        return class_instructors, teacher_names
+    
     def _generate_time_slots(self):
         """Generate available time slots"""
         time_slots = []
@@ -507,65 +3602,181 @@ class WebSchedulingSystem:
         
         return time_slots
     
-    def _schedule_single_class(self, class_info, available_rooms, time_slots, 
-                              teacher_schedule, room_schedule, assigned_teacher):
-        """Schedule a single class"""
-        class_nbr = class_info['Class_Nbr']
-        required_capacity = class_info['Cap_Enrl']
+    def _new_occupancy(self, room_index, time_slots, assigned_teachers):
+        """Create an empty occupancy grid whose room rows follow the room index order"""
+        return OccupancyGrid(
+            [room.Room_ID for room in room_index.sorted_rooms],
+            [slot['time_id'] for slot in time_slots],
+            [f_id for f_id in dict.fromkeys(assigned_teachers) if f_id is not None and f_id != '']
+        )
+    
+    def _build_feasibility(self, classes_data, assigned_teachers, room_index, time_slots, occupancy=None):
+        """Build the FeasibilityMask for a run - teacher rows follow occupancy (or a fresh grid)"""
+        if occupancy is None:
+            occupancy = self._new_occupancy(room_index, time_slots, assigned_teachers)
+        all_slots = self._generate_time_slots()
+        return FeasibilityMask(
+            room_index.capacities,
+            [c['Cap_Enrl'] or 0 for c in classes_data],
+            [occupancy.intern_teacher(f_id) for f_id in assigned_teachers],
+            [slot['time_id'] not in self.disabled_time_slots for slot in all_slots]
+        )
+    
+    def _run_greedy_pass(self, classes_data, assigned_teachers, room_index, time_slots, feasibility, seed=None,
+                         preview=False):
+        """Place classes first-fit in query order - returns (placements, unplaced class indexes, occupancy)
         
-        # Shuffle time slots for variety
-        random.shuffle(time_slots)
+        preview streams the placements as provisional (another engine may replace them).
+        """
+        occupancy = self._new_occupancy(room_index, time_slots, assigned_teachers)
+        rng = random.Random(seed) if seed is not None else random
+        placements = {}
+        unplaced = []
+        stream = self._placement_stream('greedy', classes_data, assigned_teachers, room_index, time_slots,
+                                        preview=preview)
         
-        for time_slot in time_slots:
-            time_id = time_slot['time_id']
-            
-            # Check teacher availability
-            teacher_key = (assigned_teacher, time_id)
-            if assigned_teacher and teacher_key in teacher_schedule:
-                continue
-            
-            # Find suitable room
-            suitable_rooms = []
-            if 'rooms' not in self.available_options:
-                self.load_available_resources()
-            
-            all_rooms = self.available_options['rooms']
-            for room_id in available_rooms:
-                room_info = all_rooms[all_rooms['Room_ID'] == room_id]
-                if len(room_info) > 0 and room_info.iloc[0]['Capacity'] >= required_capacity:
-                    suitable_rooms.append(room_info.iloc[0])
+        for i, class_info in enumerate(classes_data):
+            # Shuffled slot order, first free room that fits; marks resources as used
+            placement = place_first_fit(
+                occupancy, int(feasibility.room_starts[i]), int(feasibility.teachers[i]),
+                class_info['Class_Nbr'], rng
+            )
             
-            for room in suitable_rooms:
-                room_id = room['Room_ID']
-                room_key = (room_id, time_id)
-                
-                # Check room availability
-                if room_key in room_schedule:
-                    continue
-                
-                # Success! Create session record
-                session_record = {
-                    'Class_Nbr': class_nbr,
-                    'Day': time_slot['day'],
-                    'Mtg_Start': time_slot['start_time'],
-                    'Mtg_End': time_slot['end_time'],
-                    'Room_ID': room_id,
-                    'Facil_ID': room.get('Facil_ID', room_id),
-                    'Campus': self.selections.get('campus', 'AD'),  # Use user-selected campus
-                    'Start_Date': '2024-09-01',
-                    'End_Date': '2024-12-15',
-                    'F_ID': assigned_teacher,
-                    'Room_Capacity': room['Capacity']
-                }
-                
-                # Mark resources as used
-                if assigned_teacher:
-                    teacher_schedule[teacher_key] = class_nbr
-                room_schedule[room_key] = class_nbr
-                
-                return session_record
+            if placement:
+                placements[i] = placement
+            else:
+                unplaced.append(i)
+            if stream is not None:
+                stream.add(i, placement)
         
-        return None
+        if stream is not None:
+            stream.flush()
+        return placements, unplaced, occupancy
+    
+    def _run_multistart(self, classes_data, assigned_teachers, room_index, time_slots, feasibility,
+                        restarts, workers, seed=None):
+        """Run seeded greedy passes in a process pool and keep the best one
+        
+        The winner has the fewest conflicts, ties going to the fewest wasted
+        seats and then the lowest seed. Returns (placements, unplaced class
+        indexes, occupancy, stats); passing the winning seed back as seed
+        with restarts=1 reproduces the same timetable.
+        """
+        occupancy = self._new_occupancy(room_index, time_slots, assigned_teachers)
+        teachers = feasibility.teachers.tolist()
+        problem = {
+            'n_rooms': occupancy.n_rooms,
+            'n_slots': occupancy.n_slots,
+            'n_teachers': len(occupancy.teacher_ids),
+            'capacities': room_index.capacities,
+            'room_starts': feasibility.room_starts.tolist(),
+            'requirements': feasibility.requirements.tolist(),
+            'teachers': teachers,
+            'class_nbrs': [c['Class_Nbr'] for c in classes_data]
+        }
+        
+        base_seed = seed if seed is not None else random.randrange(2 ** 31)
+        seeds = [base_seed + k for k in range(restarts)]
+        results = None
+        workers = min(workers, restarts, os.cpu_count() or 1)  # More processes than seeds or cores only cost forks
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_restart_worker,
+                                         initargs=(problem,)) as pool:
+                    results = list(pool.map(_run_greedy_restart, seeds))
+            except Exception as e:
+                print(f"Process pool unavailable, running restarts in-process: {str(e)}")
+        if results is None:
+            results = [_run_greedy_restart(s, problem) for s in seeds]
+        
+        conflicts, wasted, winning_seed, placements = min(results, key=lambda r: (r[0], r[1], r[2]))
+        
+        # Replay the winning placements onto this process's grid
+        for i, (room_row, slot) in placements.items():
+            occupancy.occupy(room_row, slot, teachers[i], problem['class_nbrs'][i])
+        unplaced = [i for i in range(len(classes_data)) if i not in placements]
+        
+        stats = {
+            'restarts': restarts,
+            'workers': workers,
+            'winning_seed': winning_seed,
+            'wasted_seats': wasted,
+            'conflicts_best': conflicts,
+            'conflicts_worst': max(r[0] for r in results)
+        }
+        return placements, unplaced, occupancy, stats
+    
+    def _run_dsatur_pass(self, classes_data, assigned_teachers, room_index, time_slots, feasibility):
+        """Place classes most-constrained-first - returns (placements, unplaced class indexes, occupancy, search stats)"""
+        occupancy = self._new_occupancy(room_index, time_slots, assigned_teachers)
+        solver = DsaturSolver(
+            occupancy,
+            feasibility.room_starts,
+            feasibility.teachers,
+            [c['Class_Nbr'] for c in classes_data]
+        )
+        placements, unplaced = solver.solve()
+        stats = {
+            'backtracks': solver.backtracks,
+            'max_backtracks': solver.max_backtracks,
+            'repairs_skipped': solver.repairs_skipped
+        }
+        return placements, sorted(unplaced), occupancy, stats
+    
+    def _run_local_search(self, classes_data, feasibility, occupancy,
+                          placements, unplaced, improve_seconds, seed=None):
+        """Improve a solver's output for at most improve_seconds - returns (placements, unplaced, stats)"""
+        improver = LocalSearchImprover(
+            occupancy,
+            feasibility.room_starts.tolist(),
+            feasibility.teachers.tolist(),
+            [c['Class_Nbr'] for c in classes_data],
+            feasibility.requirements.tolist(),
+            feasibility.capacities.tolist(),
+            placements,
+            unplaced,
+            seed
+        )
+        return improver.run(float(improve_seconds))
+    
+    def _run_room_matching(self, classes_data, feasibility, occupancy, placements, unplaced):
+        """Re-match rooms slot by slot on a solver's output - returns (placements, unplaced, stats)"""
+        return match_rooms_per_slot(
+            occupancy,
+            feasibility.capacities.tolist(),
+            feasibility.room_starts.tolist(),
+            feasibility.requirements.tolist(),
+            feasibility.teachers.tolist(),
+            [c['Class_Nbr'] for c in classes_data],
+            placements,
+            unplaced
+        )
+    
+    def _build_sessions(self, classes_data, assigned_teachers, room_index, time_slots, placements):
+        """Build session records for placed classes, in class order"""
+        scheduled_sessions = []
+        for i in sorted(placements):
+            room_row, slot = placements[i]
+            scheduled_sessions.append(self._build_session_record(
+                classes_data[i], room_index.sorted_rooms[room_row], time_slots[slot], assigned_teachers[i]
+            ))
+        return scheduled_sessions
+    
+    def _build_session_record(self, class_info, room, time_slot, assigned_teacher):
+        """Build the ClassSession record for a class placed in a room and time slot"""
+        return {
+            'Class_Nbr': class_info['Class_Nbr'],
+            'Day': time_slot['day'],
+            'Mtg_Start': time_slot['start_time'],
+            'Mtg_End': time_slot['end_time'],
+            'Room_ID': room.Room_ID,
+            'Facil_ID': room.Facil_ID,
+            'Campus': self.selections.get('campus', 'AD'),  # Use user-selected campus
+            'Start_Date': '2024-09-01',
+            'End_Date': '2024-12-15',
+            'F_ID': assigned_teacher,
+            'Room_Capacity': room.Capacity
+        }
     
     def _create_conflict_record(self, class_info, available_rooms, assigned_teacher, required_capacity):
         """Create conflict record with proper field order"""
@@ -595,7 +3806,7 @@ class WebSchedulingSystem:
     
     def _extract_campus_from_location(self, location):
         """Extract campus from room location"""
-        if pd.isna(location):
+        if location is None or location != location:  # NULL or NaN
             return 'AD'
         location_str = str(location).upper()
         if 'AD' in location_str:
@@ -607,60 +3818,139 @@ class WebSchedulingSystem:
         else:
             return 'AD'
     
-    def _save_scheduled_sessions(self, scheduled_sessions):
-        """Save scheduled sessions to database"""
-        cursor = self.conn.cursor()
+    def _save_schedule(self, scheduled_sessions, conflicts, class_nbrs):
+        """Replace the stored sessions and conflicts of class_nbrs in one transaction - returns write stats
         
-        # Clear existing sessions for selected classes
-        class_list = ','.join([str(s['Class_Nbr']) for s in scheduled_sessions])
-        cursor.execute(f"DELETE FROM ClassSession WHERE Class_Nbr IN ({class_list})")
-        
-        # Insert new sessions
-        for session in scheduled_sessions:
-            sql = """
-            INSERT INTO ClassSession 
-            (Class_Nbr, Day, Mtg_Start, Mtg_End, Start_Date, End_Date, Room_ID, Facil_ID, Campus)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(sql, (
-                session['Class_Nbr'], session['Day'], session['Mtg_Start'], session['Mtg_End'],
-                session['Start_Date'], session['End_Date'], session['Room_ID'], 
-                session['Facil_ID'], session['Campus']
-            ))
+        Old rows go with one set-based delete per table; new rows are
+        inserted with executemany in DB_BULK_CHUNK_SIZE batches
+        (fast_executemany sends each batch as one parameter array).
+        """
+        started = time.perf_counter()
+        class_nbrs = list(dict.fromkeys(class_nbrs))
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if hasattr(cursor, 'fast_executemany'):
+                cursor.fast_executemany = True
+            
+            chunks = self._delete_schedule_rows(cursor, class_nbrs)
+            chunks += self._save_scheduled_sessions(cursor, scheduled_sessions)
+            chunks += self._save_conflicts(cursor, conflicts)
+            conn.commit()
         
-        self.conn.commit()
-        print(f"Saved {len(scheduled_sessions)} scheduled sessions to database")
-    
-    def _save_conflicts(self, conflicts):
-        """Save conflicts to database"""
-        cursor = self.conn.cursor()
-        
-        # Clear existing conflicts for selected classes
-        class_list = ','.join([str(c['Class_Nbr']) for c in conflicts])
-        cursor.execute(f"DELETE FROM SchedulingConflicts WHERE Class_Nbr IN ({class_list})")
-        
-        # Insert new conflicts
-        for conflict in conflicts:
-            sql = """
-            INSERT INTO SchedulingConflicts 
-            (Class_Nbr, Term, Session, Catalog, Course_Code, Course_Title, Subject, 
-             Section, Component, F_ID, Cap_Enrl, Tot_Enrl, 
-             Conflict_Type, Conflict_Reason, Required_Room_Capacity, Status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'PENDING')
-            """
-            cursor.execute(sql, (
-                conflict['Class_Nbr'], conflict['Term'], conflict['Session'], conflict['Catalog'],
-                conflict['Course_Code'], conflict['Course_Title'], conflict['Subject'], 
-                conflict['Section'], conflict['Component'], conflict['F_ID'], 
-                conflict['Cap_Enrl'], conflict['Tot_Enrl'],
-                conflict['Conflict_Type'], conflict['Conflict_Reason'], conflict['Required_Room_Capacity']
-            ))
+        seconds = time.perf_counter() - started
+        rows = len(scheduled_sessions) + len(conflicts)
+        print(f"Saved {len(scheduled_sessions)} scheduled sessions and {len(conflicts)} conflicts to database")
+        return {
+            'deleted_classes': len(class_nbrs),
+            'sessions': len(scheduled_sessions),
+            'conflicts': len(conflicts),
+            'statements': chunks,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(rows / seconds) if seconds > 0 else None
+        }
+    
+    def _delete_schedule_rows(self, cursor, class_nbrs):
+        """Delete the stored sessions and conflicts of the given classes - returns the statement count"""
+        if not class_nbrs:
+            return 0
+        cursor.execute(f"DELETE FROM ClassSession WHERE Class_Nbr IN {id_list_sql()}", id_list_param(class_nbrs))
+        cursor.execute(f"DELETE FROM SchedulingConflicts WHERE Class_Nbr IN {id_list_sql()}", id_list_param(class_nbrs))
+        return 2
+    
+    def _save_scheduled_sessions(self, cursor, scheduled_sessions):
+        """Bulk insert scheduled sessions - returns the batch count"""
+        sql = """
+        INSERT INTO ClassSession 
+        (Class_Nbr, Day, Mtg_Start, Mtg_End, Start_Date, End_Date, Room_ID, Facil_ID, Campus)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        rows = [
+            (session['Class_Nbr'], session['Day'], session['Mtg_Start'], session['Mtg_End'],
+             session['Start_Date'], session['End_Date'], session['Room_ID'], 
+             session['Facil_ID'], session['Campus'])
+            for session in scheduled_sessions
+        ]
+        return self._executemany_chunked(cursor, sql, rows)
+    
+    def _save_conflicts(self, cursor, conflicts):
+        """Bulk insert conflicts - returns the batch count"""
+        sql = """
+        INSERT INTO SchedulingConflicts 
+        (Class_Nbr, Term, Session, Catalog, Course_Code, Course_Title, Subject, 
+         Section, Component, F_ID, Cap_Enrl, Tot_Enrl, 
+         Conflict_Type, Conflict_Reason, Required_Room_Capacity, Status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'PENDING')
+        """
+        rows = [
+            (conflict['Class_Nbr'], conflict['Term'], conflict['Session'], conflict['Catalog'],
+             conflict['Course_Code'], conflict['Course_Title'], conflict['Subject'], 
+             conflict['Section'], conflict['Component'], conflict['F_ID'], 
+             conflict['Cap_Enrl'], conflict['Tot_Enrl'],
+             conflict['Conflict_Type'], conflict['Conflict_Reason'], conflict['Required_Room_Capacity'])
+            for conflict in conflicts
+        ]
+        return self._executemany_chunked(cursor, sql, rows)
+    
+    def _executemany_chunked(self, cursor, sql, rows):
+        """executemany in DB_BULK_CHUNK_SIZE batches - returns the batch count"""
+        batches = 0
+        for k in range(0, len(rows), DB_BULK_CHUNK_SIZE):
+            cursor.executemany(sql, rows[k:k + DB_BULK_CHUNK_SIZE])
+            batches += 1
+        return batches
+    
+    def _class_details(self, classes_data, class_instructors, teacher_names):
+        """Display fields of each class for the timetable view, from data a run already loaded"""
+        class_details = {}
+        for class_info in classes_data:
+            f_ids = class_instructors.get(class_info['Class_Nbr'])
+            first_name, last_name = teacher_names.get(f_ids[0], (None, None)) if f_ids else (None, None)
+            class_details[class_info['Class_Nbr']] = {
+                'course_code': class_info['Course_Code'],
+                'course_title': class_info['Course_Title'],
+                'section': class_info['Section'],
+                'subject': class_info['Subject'],
+                'teacher': f"{first_name} {last_name}" if first_name else 'TBD'
+            }
+        return class_details
+    
+    def _load_class_details(self, class_nbrs):
+        """Timetable display fields for classes a run did not load, in one set-based query"""
+        if not class_nbrs:
+            return {}
+        class_sql = f"""
+        SELECT 
+            cs.Class_Nbr, cs.Section, cc.Course_Code, cc.Course_Title, cc.Subject,
+            t.First_Name, t.Last_Name
+        FROM ClassSection cs
+        JOIN CourseCatalog cc ON cs.Catalog = cc.Catalog
+        LEFT JOIN ClassInstructor ci ON cs.Class_Nbr = ci.Class_Nbr AND ci.Role = 'PI'
+        LEFT JOIN Teacher t ON ci.F_ID = t.F_ID
+        WHERE cs.Class_Nbr IN {id_list_sql()}
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(class_sql, id_list_param(class_nbrs))
+            rows = cursor.fetchall()
         
-        self.conn.commit()
-        print(f"Saved {len(conflicts)} conflicts to database")
+        class_details = {}
+        for class_nbr, section, course_code, course_title, subject, first_name, last_name in rows:
+            class_details.setdefault(class_nbr, {
+                'course_code': course_code,
+                'course_title': course_title,
+                'section': section,
+                'subject': subject,
+                'teacher': f"{first_name} {last_name}" if first_name else 'TBD'
+            })
+        return class_details
     
-    def _generate_timetable_view(self, scheduled_sessions):
-        """Generate timetable view for web display"""
+    def _generate_timetable_view(self, scheduled_sessions, class_details=None):
+        """Generate timetable view for web display
+        
+        Built in memory from class_details (see _class_details) and the
+        cached rooms; classes missing from class_details are loaded with a
+        single query.
+        """
         if not scheduled_sessions:
             return {}
         
@@ -672,54 +3962,58 @@ class WebSchedulingSystem:
         
         for day in days:
             timetable[day] = {}
-            for time in times:
-                timetable[day][time] = []
+            for time_slot in times:
+                timetable[day][time_slot] = []
+        
+        class_details = dict(class_details or {})
+        missing = [s['Class_Nbr'] for s in scheduled_sessions if s['Class_Nbr'] not in class_details]
+        class_details.update(self._load_class_details(missing))
+        
+        rooms = self.get_resource_table('rooms')
         
-        # Get class details for each session
         for session in scheduled_sessions:
             class_nbr = session['Class_Nbr']
             day = session['Day']
             time_slot = f"{session['Mtg_Start']}-{session['Mtg_End']}"
+            details = class_details.get(class_nbr)
+            room = rooms.get(session['Room_ID'])
             
-            # Get class details
-            class_sql = """
-            SELECT 
-                cs.Class_Nbr, cs.Section, cc.Course_Code, cc.Course_Title, cc.Subject,
-                t.First_Name, t.Last_Name, r.Description as Room_Description
-            FROM ClassSection cs
-            JOIN CourseCatalog cc ON cs.Catalog = cc.Catalog
-            LEFT JOIN ClassInstructor ci ON cs.Class_Nbr = ci.Class_Nbr AND ci.Role = 'PI'
-            LEFT JOIN Teacher t ON ci.F_ID = t.F_ID
-            LEFT JOIN Room r ON ? = r.Room_ID
-            WHERE cs.Class_Nbr = ?
-            """
-            
-            # Use pyodbc to query course details
-            details_cursor = self.conn.cursor()
-            details_cursor.execute(class_sql, (session['Room_ID'], class_nbr))
-            details_rows = details_cursor.fetchall()
-            
-            if details_rows:
-                details_row = details_rows[0]
-                if day in timetable and time_slot in timetable[day]:
-                    timetable[day][time_slot].append({
-                        'class_nbr': class_nbr,
-                        'course_code': details_row[2],  # Course_Code
-                        'course_title': details_row[3],  # Course_Title
-                        'section': details_row[1],  # Section
-                        'subject': details_row[4],  # Subject
-                        'teacher': f"{details_row[5]} {details_row[6]}" if details_row[5] else 'TBD',  # First_Name Last_Name
-                        'room': session['Room_ID'],
-                        'room_description': details_row[7] if details_row[7] else session['Room_ID']  # Room_Description
-                    })
+            if details and day in timetable and time_slot in timetable[day]:
+                timetable[day][time_slot].append({
+                    'class_nbr': class_nbr,
+                    'course_code': details['course_code'],
+                    'course_title': details['course_title'],
+                    'section': details['section'],
+                    'subject': details['subject'],
+                    'teacher': details['teacher'],
+                    'room': session['Room_ID'],
+                    'room_description': (room.Description if room else None) or session['Room_ID']
+                })
         
         return timetable
     
     
     
     
+    def export_latest_results(self):
+        """export_schedule_results_to_excel behind the export admission gate
+        
+        Repeated requests for the same results while an export is running
+        (a double click) share its file instead of writing another one.
+        Raises AdmissionRejected when the export queue is full.
+        """
+        key = (self.workspace.token, str(self.current_schedule_results['timestamp']))
+        
+        def export():
+            with self.export_gate.admit():
+                return self.export_schedule_results_to_excel()
+        
+        result, shared = self.export_flight.do(key, export)
+        return dict(result, coalesced=shared)
+    
     def export_schedule_results_to_excel(self):
         """Export the latest schedule results including scheduled sessions and conflicts"""
+        import pandas as pd  # Only the Excel paths need pandas/openpyxl; keep them off the startup path
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"Schedule_Results_{timestamp}.xlsx"
@@ -749,7 +4043,6 @@ class WebSchedulingSystem:
                     session_map = {str(session['Class_Nbr']): session for session in scheduled_sessions}
                     
                     # Use a SQL query to get complete information for all courses
-                    placeholders = ','.join(['?' for _ in class_nbrs])
                     complete_sql = f"""
                     SELECT 
                         co.Access, co.Term, co.Assign_Type, cs.Class_Nbr, co.Offer_Nbr, cc.Max_Units,
@@ -766,14 +4059,16 @@ class WebSchedulingSystem:
                     LEFT JOIN Term term ON co.Term = term.Term_Code AND co.Session = term.Session
                     LEFT JOIN ClassInstructor ci ON cs.Class_Nbr = ci.Class_Nbr AND ci.Role = 'PI'
                     LEFT JOIN Teacher t ON ci.F_ID = t.F_ID
-                    WHERE cs.Class_Nbr IN ({placeholders})
+                    WHERE cs.Class_Nbr IN {id_list_sql()}
                     """
                     
                     try:
-                        cursor = self.conn.cursor()
-                        cursor.execute(complete_sql, class_nbrs)
+                        with self.pool.connection() as conn:
+                            cursor = conn.cursor()
+                            cursor.execute(complete_sql, id_list_param(class_nbrs))
+                            rows = cursor.fetchall()
                         
-                        for row in cursor.fetchall():
+                        for row in rows:
                             # Create a record with all standard columns
                             record = {}
                             for i, col_name in enumerate(self.standard_columns):
@@ -859,6 +4154,7 @@ class WebSchedulingSystem:
     
     def import_excel_data(self, file_path):
         """Simulate Excel data import (for testing purposes)"""
+        import pandas as pd
         try:
             # Read Excel file for simulation
             df = pd.read_excel(file_path)
@@ -888,6 +4184,7 @@ class WebSchedulingSystem:
     
     def export_all_data_to_excel(self):
         """Export all scheduling data to Excel file"""
+        import pandas as pd
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"Full_Schedule_Export_{timestamp}.xlsx"
@@ -913,11 +4210,12 @@ class WebSchedulingSystem:
             """
             
             # Use pyodbc to execute query
-            cursor = self.conn.cursor()
-            cursor.execute(export_sql)
-            
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(export_sql)
+                
+                columns = [col[0] for col in cursor.description]
+                rows = cursor.fetchall()
             
             # Convert to DataFrame
             export_data = []
@@ -945,6 +4243,76 @@ class WebSchedulingSystem:
                 'error': str(e)
             }
 
+    def benchmark_id_lists(self, sizes=(10, 100, 1000, 5000), repeats=3):
+        """Time per-item placeholder IN-lists against one OPENJSON parameter for growing ID sets
+        
+        Placeholder lists above 2000 IDs have to be split into several
+        statements. distinct_statements is the number of different query
+        texts (so cached plans) each approach produced over all sizes.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT Class_Nbr FROM ClassSection WHERE Class_Nbr IS NOT NULL")
+            known = [row[0] for row in cursor.fetchall()]
+        # Pad with IDs past the real ones so every size can be tested
+        padding = (max(known) if known else 0) + 1
+        base_sql = "SELECT ci.Class_Nbr, ci.F_ID FROM ClassInstructor ci WHERE ci.Class_Nbr IN {ids}"
+        
+        def placeholder_run(cursor, ids):
+            statements = set()
+            for k in range(0, len(ids), 2000):
+                chunk = ids[k:k + 2000]
+                sql = base_sql.format(ids='(' + ','.join(['?' for _ in chunk]) + ')')
+                cursor.execute(sql, chunk)
+                cursor.fetchall()
+                statements.add(sql)
+            return statements
+        
+        def json_run(cursor, ids):
+            sql = base_sql.format(ids=id_list_sql())
+            cursor.execute(sql, id_list_param(ids))
+            cursor.fetchall()
+            return {sql}
+        
+        results = []
+        seen = {'placeholders': set(), 'openjson': set()}
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            for size in sizes:
+                ids = (known + list(range(padding, padding + size)))[:size]
+                row = {'ids': size}
+                for name, run in (('placeholders', placeholder_run), ('openjson', json_run)):
+                    timings = []
+                    for _ in range(repeats):
+                        started = time.perf_counter()
+                        seen[name] |= run(cursor, ids)
+                        timings.append(time.perf_counter() - started)
+                    row[f'{name}_ms'] = round(min(timings) * 1000, 2)
+                results.append(row)
+        
+        return {
+            'results': results,
+            'distinct_statements': {name: len(statements) for name, statements in seen.items()}
+        }
+    
+    def benchmark_resource_memory(self):
+        """Compare the memory held by each cached ResourceTable with the equivalent DataFrame
+        
+        Both sizes are deep (they include the str/date values), in bytes.
+        """
+        import pandas as pd
+        self.load_available_resources()
+        results = []
+        for option, table in self.available_options.items():
+            frame = pd.DataFrame.from_records(table.rows, columns=table.columns)
+            results.append({
+                'option': option,
+                'rows': len(table),
+                'table_bytes': deep_sizeof([table.rows, table.by_key]),
+                'dataframe_bytes': int(frame.memory_usage(index=True, deep=True).sum())
+            })
+        return {'results': results}
+    
     def get_available_time_slots(self):
         """Get available time slots (excluding disabled ones)"""
         all_slots = self._generate_time_slots()
@@ -960,6 +4328,70 @@ class WebSchedulingSystem:
             'timestamp': self.current_schedule_results['timestamp'].isoformat() if self.current_schedule_results['timestamp'] else None
         }
     
+    def get_feasibility_summary(self):
+        """Count each selected class's (room, slot) options before solving, without running a solver
+        
+        Also reports lower bounds on the conflicts any solver must leave
+        (FeasibilityMask.conflict_lower_bounds) and the capacity tiers and
+        teachers responsible; no_options lists the classes certain to fail.
+        """
+        if not self.selections['classes']:
+            return {'error': 'No classes selected'}
+        
+        classes_data = self._fetch_classes(self.selections['classes'])
+        time_slots = self.get_available_time_slots()
+        available_rooms = self.selections['rooms'] if self.selections['rooms'] else [r['Room_ID'] for r in self.get_available_rooms()]
+        available_teachers = self.selections['teachers'] if self.selections['teachers'] else []
+        if 'rooms' not in self.available_options:
+            self.load_available_resources()
+        room_index = RoomIndex(self.available_options['rooms'], available_rooms)
+        class_instructors, _ = self._load_class_instructors([c['Class_Nbr'] for c in classes_data])
+        assigned_teachers = self._assign_teachers(classes_data, class_instructors, available_teachers)
+        
+        occupancy = self._new_occupancy(room_index, time_slots, assigned_teachers)
+        feasibility = self._build_feasibility(classes_data, assigned_teachers, room_index, time_slots, occupancy)
+        room_options = feasibility.room_options()
+        option_counts = feasibility.option_counts()
+        teacher_load = feasibility.teacher_load(len(occupancy.teacher_ids))
+        
+        classes = []
+        for i, class_info in enumerate(classes_data):
+            classes.append({
+                'Class_Nbr': class_info['Class_Nbr'],
+                'Course_Code': class_info['Course_Code'],
+                'Section': class_info['Section'],
+                'Cap_Enrl': class_info['Cap_Enrl'],
+                'F_ID': assigned_teachers[i],
+                'room_options': int(room_options[i]),
+                'options': int(option_counts[i])
+            })
+        
+        overloaded_teachers = [
+            {'F_ID': occupancy.teacher_ids[t], 'class_count': int(teacher_load[t]),
+             'excess': int(teacher_load[t]) - len(time_slots)}
+            for t in np.flatnonzero(teacher_load > len(time_slots))
+        ]
+        
+        # Capacity tiers with more classes than room-slots (a tier starting past the last room has none)
+        capacities = room_index.capacities
+        overloaded_tiers = [
+            {'min_capacity': capacities[k] if k < len(capacities) else None, 'class_count': demand,
+             'room_slots': supply, 'excess': demand - supply}
+            for k, demand, supply in feasibility.capacity_tiers() if demand > supply
+        ]
+        
+        return {
+            'success': True,
+            'class_count': len(classes_data),
+            'room_count': len(room_index),
+            'available_time_slots': len(time_slots),
+            'classes': classes,
+            'no_options': [classes_data[i]['Class_Nbr'] for i in feasibility.infeasible()],
+            'overloaded_teachers': overloaded_teachers,
+            'overloaded_capacity_tiers': overloaded_tiers,
+            'conflict_lower_bounds': feasibility.conflict_lower_bounds()
+        }
+    
     def disable_time_slots(self, time_slot_patterns):
         """Batch disable time slots - now accepts exact time slot ID list"""
         # Clear existing disabled time slots
@@ -987,16 +4419,16 @@ class WebSchedulingSystem:
             return self.get_available_rooms()
         
         # Get course information
-        placeholders = ','.join(['?' for _ in course_codes])
         courses_sql = f"""
         SELECT DISTINCT Course_Code, Course_Title, Subject
         FROM CourseCatalog 
-        WHERE Course_Code IN ({placeholders})
+        WHERE Course_Code IN {id_list_sql('VARCHAR(50)')}
         """
         
-        cursor = self.conn.cursor()
-        cursor.execute(courses_sql, course_codes)
-        courses = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(courses_sql, id_list_param(course_codes))
+            courses = cursor.fetchall()
         
         # Analyze course types
         lab_keywords = ['lab', 'laboratory', 'practical', 'experiment', 'workshop']
@@ -1087,9 +4519,11 @@ class WebSchedulingSystem:
             Capacity DESC
         """
         
-        cursor.execute(rooms_sql)
-        columns = [col[0] for col in cursor.description]
-        rows = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(rooms_sql)
+            columns = [col[0] for col in cursor.description]
+            rows = cursor.fetchall()
         
         rooms_data = []
         for row in rows:
@@ -1115,99 +4549,27 @@ class WebSchedulingSystem:
         if isinstance(acad_groups, str):
             acad_groups = [acad_groups]
         
-        # Get subjects from selected academic groups
-        placeholders = ','.join(['?' for _ in acad_groups])
-        subject_sql = f"""
-        SELECT cc.Subject, cc.Acad_Group, 
-               COUNT(DISTINCT cc.Course_Code) as Course_Count
-        FROM CourseCatalog cc 
-        WHERE cc.Acad_Group IN ({placeholders}) 
-          AND cc.Subject IS NOT NULL 
-          AND cc.Course_Code IS NOT NULL AND cc.Course_Code != ''
-        GROUP BY cc.Subject, cc.Acad_Group 
-        ORDER BY cc.Acad_Group, cc.Subject
-        """
-        
-        # Create new database connection to avoid concurrency conflicts
-        temp_conn = self.get_temp_connection()
-        
-        try:
-            cursor = temp_conn.cursor()
-            cursor.execute(subject_sql, acad_groups)
-            
-            columns = [col[0] for col in cursor.description]
-            rows = cursor.fetchall()
-            
-            regular_subjects = []
-            for row in rows:
-                regular_subjects.append(dict(zip(columns, row)))
-            
-            return {
-                'regular_subjects': regular_subjects,
-                'selected_groups': acad_groups,
-                'is_multi_group': len(acad_groups) > 1
-            }
-        finally:
-            temp_conn.close()
+        return {
+            'regular_subjects': self.get_catalog().subjects(acad_groups),
+            'selected_groups': acad_groups,
+            'is_multi_group': len(acad_groups) > 1
+        }
     
     def get_cross_departmental_subjects(self, acad_groups):
         """Get subjects that appear in multiple selected academic groups"""
         if not acad_groups or len(acad_groups) < 2:
             return []
         
-        placeholders = ','.join(['?' for _ in acad_groups])
-        cross_sql = f"""
-        SELECT cc.Subject, 
-               COUNT(DISTINCT cc.Acad_Group) as Group_Count,
-               COUNT(DISTINCT cc.Course_Code) as Course_Count
-        FROM CourseCatalog cc 
-        WHERE cc.Acad_Group IN ({placeholders})
-          AND cc.Subject IS NOT NULL 
-          AND cc.Course_Code IS NOT NULL AND cc.Course_Code != ''
-        GROUP BY cc.Subject
-        HAVING COUNT(DISTINCT cc.Acad_Group) > 1
-        ORDER BY COUNT(DISTINCT cc.Acad_Group) DESC, cc.Subject
-        """
-        
-        # Create new database connection to avoid concurrency conflicts
-        temp_conn = self.get_temp_connection()
-        
-        try:
-            cursor = temp_conn.cursor()
-            cursor.execute(cross_sql, acad_groups)
-            
-            cross_subjects = []
-            for row in cursor.fetchall():
-                subject, group_count, course_count = row
-                
-                # Get detailed groups for this subject
-                group_sql = f"""
-                SELECT DISTINCT Acad_Group 
-                FROM CourseCatalog 
-                WHERE Subject = ? AND Acad_Group IN ({placeholders})
-                ORDER BY Acad_Group
-                """
-                cursor.execute(group_sql, [subject] + acad_groups)
-                groups = [g[0] for g in cursor.fetchall()]
-                
-                cross_subjects.append({
-                    'Subject': subject,
-                    'Course_Count': course_count,
-                    'Group_Count': group_count,
-                    'Academic_Groups': groups
-                })
-            
-            return cross_subjects
-        finally:
-            temp_conn.close()
+        return self.get_catalog().cross_departmental_subjects(acad_groups)
 
 # Flask Web API Interface
 def create_web_api():
     """Create Flask web API for the scheduling system"""
-    from flask import Flask, request, jsonify, render_template_string
+    from flask import Flask, g, request, jsonify, render_template_string
     
     app = Flask(__name__)
     scheduler = WebSchedulingSystem()
+    scheduler.start_warmup()  # Background: the listener does not wait for SQL Server
     
     # HTML Template for the web interface
     HTML_TEMPLATE = """
@@ -1406,6 +4768,11 @@ def create_web_api():
             </div>
             
             <div class="section">
+                <label for="engineSelect">Scheduling Engine:</label>
+                <select id="engineSelect">
+                    <option value="greedy">Greedy (fast)</option>
+                    <option value="dsatur">Most-constrained first (fewer conflicts)</option>
+                </select>
                 <button onclick="generateSchedule()" style="font-size: 18px; padding: 15px 30px;">
                     Generate Timetable
                 </button>
@@ -2223,42 +5590,146 @@ def create_web_api():
                     subject: $('#subjectSelect').val(),
                     classes: classNumbers,  // Use class numbers instead of course codes
                     teachers: $('input[name="teachers"]:checked').map(function() { return this.value; }).get(),
-                    rooms: $('input[name="rooms"]:checked').map(function() { return this.value; }).get()
+                    rooms: $('input[name="rooms"]:checked').map(function() { return this.value; }).get(),
+                    engine: $('#engineSelect').val()
                 };
                 
                 $('#results').html('<p>Generating schedule...</p>').show();
                 
+                // Runs as a background job: start it, then poll its progress until it finishes
+                function showResult(data) {
+                    if (data.success) {
+                        $('#results').html(`
+                            <h3>Schedule Generation Results</h3>
+                            <p><strong>Selected Academic Groups:</strong> ${selectedAcadGroups.join(', ')}</p>
+                            <p><strong>Selected Courses:</strong> ${selectedCourses.length} courses</p>
+                            <p><strong>Class Sections:</strong> ${classNumbers.length} sections</p>
+                            <p><strong>Successfully Scheduled:</strong> ${data.scheduled_count} classes</p>
+                            <p><strong>Conflicts:</strong> ${data.conflict_count} classes</p>
+                            <p><strong>Available Time Slots:</strong> ${data.available_time_slots}</p>
+                            ${formatEngineStats(data.run_stats)}
+                        `);
+                        
+                        // Enable export schedule results button
+                        $('#exportScheduleBtn').prop('disabled', false).css('background-color', '#28a745');
+                        
+                        displayTimetable(data.timetable);
+                    } else {
+                        $('#results').html(`<p style="color: red;">Error: ${data.error}</p>`);
+                    }
+                }
+                
+                function pollJob(jobId) {
+                    $.getJSON(`/api/jobs/${jobId}`, function(job) {
+                        if (job.status === 'succeeded') {
+                            showResult(job.result);
+                        } else if (job.status === 'failed') {
+                            showResult({success: false, error: job.error});
+                        } else if (job.status === 'cancelled') {
+                            $('#results').html('<p>Schedule generation cancelled.</p>');
+                        } else {
+                            showProgress(jobId, job);
+                            setTimeout(function() { pollJob(jobId); }, 1000);
+                        }
+                    }).fail(function() {
+                        $('#results').html('<p style="color: red;">Lost track of the schedule job.</p>');
+                    });
+                }
+                
+                function showProgress(jobId, job) {
+                    $('#results').html(`
+                        <p>Generating schedule... <strong>${job.phase}</strong>
+                           (${job.placed}/${job.total} placed, ${job.conflicts} conflicts${job.rate ? `, ${job.rate} classes/s` : ''})
+                           ${job.preview ? '<em>- preview from the greedy pass, may be replaced</em>' : ''}
+                           <button id="cancelJobBtn">Cancel</button></p>
+                    `);
+                    $('#cancelJobBtn').click(function() {
+                        $.post(`/api/jobs/${jobId}/cancel`);
+                        $(this).prop('disabled', true);
+                    });
+                }
+                
+                // Follow the job's event stream, drawing placements into the grid as they arrive
+                function watchJob(jobId) {
+                    if (!window.EventSource) {
+                        pollJob(jobId);
+                        return;
+                    }
+                    const preview = {};
+                    const progress = {phase: 'queued', placed: 0, total: 0, conflicts: 0};
+                    const source = new EventSource(`/api/jobs/${jobId}/events`);
+                    
+                    source.addEventListener('phase', function(e) {
+                        Object.assign(progress, JSON.parse(e.data));
+                        showProgress(jobId, progress);
+                    });
+                    source.addEventListener('placed', function(e) {
+                        const batch = JSON.parse(e.data);
+                        batch.sessions.forEach(cls => {
+                            preview[cls.day] = preview[cls.day] || {};
+                            (preview[cls.day][cls.time] = preview[cls.day][cls.time] || []).push(cls);
+                        });
+                        Object.assign(progress, {placed: batch.placed, conflicts: batch.conflicts, rate: batch.classes_per_second, preview: batch.preview});
+                        showProgress(jobId, progress);
+                        displayTimetable(preview);
+                    });
+                    source.addEventListener('conflict', function(e) {
+                        const batch = JSON.parse(e.data);
+                        Object.assign(progress, {placed: batch.placed, conflicts: batch.conflicts, rate: batch.classes_per_second, preview: batch.preview});
+                        showProgress(jobId, progress);
+                    });
+                    source.addEventListener('done', function(e) {
+                        source.close();
+                        // The final timetable (after room matching etc.) replaces the preview
+                        pollJob(jobId);
+                    });
+                    source.onerror = function() {
+                        if (source.readyState === EventSource.CLOSED) {
+                            pollJob(jobId);
+                        }
+                    };
+                }
+                
                 $.ajax({
                     url: '/api/generate_schedule',
                     type: 'POST',
                     contentType: 'application/json',
                     data: JSON.stringify(selections),
                     success: function(data) {
-                        if (data.success) {
-                            $('#results').html(`
-                                <h3>Schedule Generation Results</h3>
-                                <p><strong>Selected Academic Groups:</strong> ${selectedAcadGroups.join(', ')}</p>
-                                <p><strong>Selected Courses:</strong> ${selectedCourses.length} courses</p>
-                                <p><strong>Class Sections:</strong> ${classNumbers.length} sections</p>
-                                <p><strong>Successfully Scheduled:</strong> ${data.scheduled_count} classes</p>
-                                <p><strong>Conflicts:</strong> ${data.conflict_count} classes</p>
-                                <p><strong>Available Time Slots:</strong> ${data.available_time_slots}</p>
-                            `);
-                            
-                            // Enable export schedule results button
-                            $('#exportScheduleBtn').prop('disabled', false).css('background-color', '#28a745');
-                            
-                            displayTimetable(data.timetable);
+                        watchJob(data.job_id);
+                    },
+                    error: function(xhr) {
+                        const data = xhr.responseJSON;
+                        if (data && data.job) {
+                            // A run for this session is already going: follow it instead
+                            watchJob(data.job.job_id);
+                        } else if (data && data.error) {
+                            // e.g. 429: the solve queue is full
+                            $('#results').html(`<p style="color: red;">${data.error}</p>`);
                         } else {
-                            $('#results').html(`<p style="color: red;">Error: ${data.error}</p>`);
+                            $('#results').html('<p style="color: red;">Failed to generate schedule.</p>');
                         }
-                    },
-                    error: function() {
-                        $('#results').html('<p style="color: red;">Failed to generate schedule.</p>');
                     }
                 });
             }
             
+            function formatEngineStats(runStats) {
+                if (!runStats || !runStats.engine_seconds) {
+                    return '';
+                }
+                
+                let html = `<p><strong>Engine Used:</strong> ${runStats.engine}</p>`;
+                if (runStats.engine_fallback) {
+                    html += `<p><em>Fell back from ${runStats.engine_fallback.requested} to ${runStats.engine_fallback.used}: ${runStats.engine_fallback.reason}</em></p>`;
+                }
+                html += '<ul>';
+                Object.keys(runStats.engine_seconds).forEach(name => {
+                    html += `<li>${name}: ${runStats.engine_conflicts[name]} conflicts in ${runStats.engine_seconds[name]}s</li>`;
+                });
+                html += '</ul>';
+                return html;
+            }
+            
             function displayTimetable(timetable) {
                 const days = ["Sunday","Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"];
                 const times = ["08:00:00-09:15:00", "09:30:00-10:45:00", "11:00:00-12:15:00", "13:00:00-14:15:00", "14:30:00-15:45:00", "16:00:00-17:15:00", "17:30:00-18:45:00"];
@@ -2365,8 +5836,10 @@ def create_web_api():
                     } else {
                         $('#results').html(`<p style="color: red;">Export failed: ${data.error}</p>`);
                     }
-                }).fail(function() {
-                    $('#results').html('<p style="color: red;">Failed to export schedule results.</p>');
+                }).fail(function(xhr) {
+                    const data = xhr.responseJSON;
+                    const reason = data && data.error ? data.error : 'Failed to export schedule results.';  // 429: export queue full
+                    $('#results').html(`<p style="color: red;">${reason}</p>`);
                 });
             }
             
@@ -2393,13 +5866,48 @@ def create_web_api():
     </html>
     """
     
+    @app.before_request
+    def bind_workspace():
+        """Serve each planner from their own workspace (cookie, or X-Workspace-Token for API clients)
+        
+        Loaded on first use: routes that never touch planner state do not
+        wait for the workspace store (the database, with the 'sqlserver' backend).
+        """
+        token = request.headers.get('X-Workspace-Token') or request.cookies.get(WORKSPACE_COOKIE)
+        
+        def load():
+            g.workspace = scheduler.workspaces.get(token)
+            return g.workspace
+        scheduler.use_workspace(load)
+    
+    @app.after_request
+    def release_workspace(response):
+        workspace = g.get('workspace')
+        if workspace is not None:
+            if request.method != 'GET':
+                workspace.dirty = True
+            scheduler.workspaces.release(workspace)
+            response.headers['X-Workspace-Token'] = workspace.token
+            if request.cookies.get(WORKSPACE_COOKIE) != workspace.token:
+                response.set_cookie(WORKSPACE_COOKIE, workspace.token, httponly=True, samesite='Lax')
+        return response
+    
+    @app.teardown_request
+    def unbind_workspace(exc):
+        scheduler.use_workspace(None)
+    
+    def cached_json(option):
+        """Respond with a resource list serialized once per load, not once per request"""
+        payload = scheduler.get_resource_table(option).to_json(app.json.dumps)
+        return app.response_class(payload, mimetype='application/json')
+    
     @app.route('/')
     def index():
         return render_template_string(HTML_TEMPLATE)
     
     @app.route('/api/terms')
     def get_terms():
-        return jsonify(scheduler.get_terms())
+        return cached_json('terms')
     
     @app.route('/api/sessions')
     def get_sessions():
@@ -2407,11 +5915,11 @@ def create_web_api():
     
     @app.route('/api/campuses')
     def get_campuses():
-        return jsonify(scheduler.get_campuses())
+        return cached_json('campuses')
     
     @app.route('/api/acad_groups')
     def get_acad_groups():
-        return jsonify(scheduler.get_acad_groups())
+        return cached_json('acad_groups')
     
     @app.route('/api/subjects/<acad_group>')
     def get_subjects(acad_group):
@@ -2428,14 +5936,79 @@ def create_web_api():
     
     @app.route('/api/rooms')
     def get_rooms():
-        return jsonify(scheduler.get_available_rooms())
+        return cached_json('rooms')
     
     @app.route('/api/generate_schedule', methods=['POST'])
     def generate_schedule():
         selections = request.json
-        scheduler.set_selections(**selections)
-        result = scheduler.generate_timetable()
-        return jsonify(result)
+        engine = selections.pop('engine', 'greedy')
+        match_rooms = selections.pop('match_rooms', True)
+        try:
+            restarts = count_option(selections.pop('restarts', 1), 'restarts', MULTISTART_MAX_RESTARTS)
+            workers = count_option(selections.pop('workers', 1), 'workers', MULTISTART_MAX_WORKERS)
+            improve_seconds = seconds_option(selections.pop('improve_seconds', 0), 'improve_seconds',
+                                             IMPROVE_SECONDS_MAX)
+            seed = seed_option(selections.pop('seed', None))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        incremental = bool(selections.pop('incremental', False))
+        # Runs on the job pool; poll /api/jobs/<job_id> for progress and the result
+        result = scheduler.start_timetable_job(
+            selections, engine=engine, match_rooms=match_rooms, restarts=restarts, workers=workers, seed=seed,
+            improve_seconds=improve_seconds, incremental=incremental
+        )
+        if result['success']:
+            return jsonify(result), 202
+        return jsonify(result), 409 if 'job' in result else 429
+    
+    @app.route('/api/jobs/<job_id>')
+    def get_job(job_id):
+        """Progress of a schedule job, with the result once it has succeeded"""
+        job = scheduler.jobs.get(job_id, scheduler.workspace.token)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify(scheduler.jobs.describe(job, include_result=True))
+    
+    @app.route('/api/jobs/<job_id>/events')
+    def stream_job_events(job_id):
+        """Server-sent events for a schedule job: phase, placed, conflict and a final done event"""
+        job = scheduler.jobs.get(job_id, scheduler.workspace.token)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        # A reconnecting EventSource resumes after the last event it saw; a bad id restarts from the top
+        try:
+            position = max(0, int(request.headers.get('Last-Event-ID', -1)) + 1)
+        except ValueError:
+            position = 0
+        
+        def stream():
+            nonlocal position
+            while True:
+                events, finished = job.wait_events(position, timeout=15)
+                for event in events:
+                    yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+                position += len(events)
+                if finished and not events:
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+        
+        return app.response_class(stream(), mimetype='text/event-stream',
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    @app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+    def cancel_job(job_id):
+        """Stop a schedule job before it saves anything"""
+        job = scheduler.jobs.cancel(job_id, scheduler.workspace.token)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify(scheduler.jobs.describe(job))
+    
+    @app.route('/api/feasibility_summary', methods=['POST'])
+    def feasibility_summary():
+        """Per-class option counts for the posted selections, before solving"""
+        scheduler.set_selections(**(request.json or {}))
+        return jsonify(scheduler.get_feasibility_summary())
     
     @app.route('/api/import_excel', methods=['POST'])
     def import_excel():
@@ -2471,7 +6044,7 @@ def create_web_api():
     def export_schedule_results():
         """Export latest schedule results to Excel endpoint"""
         try:
-            result = scheduler.export_schedule_results_to_excel()
+            result = scheduler.export_latest_results()
             if result['success']:
                 return jsonify({
                     'success': True, 
@@ -2479,10 +6052,13 @@ def create_web_api():
                     'record_count': result['record_count'],
                     'scheduled_count': result.get('scheduled_count', 0),
                     'conflicts_count': result.get('conflicts_count', 0),
-                    'download_url': f'/download/{result["filename"]}'
+                    'download_url': f'/download/{result["filename"]}',
+                    'coalesced': result['coalesced']
                 })
             else:
                 return jsonify(result)
+        except AdmissionRejected as e:
+            return jsonify({'success': False, 'error': str(e), 'waiting': e.waiting, 'max_waiting': e.max_waiting}), 429
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)})
     
@@ -2491,6 +6067,41 @@ def create_web_api():
         """Get current schedule results status"""
         return jsonify(scheduler.get_schedule_results_status())
     
+    @app.route('/api/catalog/status')
+    def get_catalog_status():
+        """Version and size of the in-memory catalog snapshot"""
+        return jsonify(scheduler.get_catalog().status())
+    
+    @app.route('/api/catalog/refresh', methods=['POST'])
+    def refresh_catalog():
+        """Reload the catalog snapshot after CourseCatalog/ClassSection changes"""
+        return jsonify(scheduler.refresh_catalog())
+    
+    @app.route('/api/cache_status')
+    def get_cache_status():
+        """Resource cache and change-watcher state"""
+        return jsonify(scheduler.get_cache_status())
+    
+    @app.route('/api/cache/check', methods=['POST'])
+    def check_cache():
+        """Poll the change markers now instead of waiting for the watcher"""
+        return jsonify(scheduler.check_for_changes())
+    
+    @app.route('/api/jobs_status')
+    def get_jobs_status():
+        """Schedule job pool and export gate: sizes, queues and counts"""
+        return jsonify(dict(scheduler.jobs.stats(), export=scheduler.export_gate.stats()))
+    
+    @app.route('/api/workspaces_status')
+    def get_workspaces_status():
+        """Planner workspace count, memory accounting and evictions"""
+        return jsonify(scheduler.workspaces.stats())
+    
+    @app.route('/api/db_pool_status')
+    def get_db_pool_status():
+        """Database connection pool size and wait metrics"""
+        return jsonify(scheduler.pool.stats())
+    
     @app.route('/download/<filename>')
     def download_file(filename):
         """Download generated Excel files"""
@@ -2601,7 +6212,53 @@ def create_web_api():
     
     return app
 
+def benchmark_startup(runs=3):
+    """Time module import and create_web_api() in fresh interpreters (no database needed)
+    
+    Returns the best of runs, in milliseconds.
+    """
+    import subprocess
+    probe = (
+        "import time; started = time.perf_counter(); "
+        "import web_scheduling_system as w; imported = time.perf_counter(); "
+        "w.create_web_api(); built = time.perf_counter(); "
+        "print('startup', round((imported - started) * 1000, 1), round((built - imported) * 1000, 1))"
+    )
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        line = next(line for line in output.splitlines() if line.startswith('startup '))
+        timings.append([float(v) for v in line.split()[1:]])
+    return {
+        'import_ms': min(t[0] for t in timings),
+        'create_app_ms': min(t[1] for t in timings),
+        'total_ms': min(t[0] + t[1] for t in timings)
+    }
+
+
 if __name__ == "__main__":
+    if '--benchmark-id-lists' in sys.argv:
+        # Compare IN-list parameter styles against the configured database, then exit
+        benchmark = WebSchedulingSystem().benchmark_id_lists()
+        for row in benchmark['results']:
+            print(f"{row['ids']:>6} IDs: placeholders {row['placeholders_ms']:>8} ms, openjson {row['openjson_ms']:>8} ms")
+        print(f"Distinct statements (cached plans): {benchmark['distinct_statements']}")
+        sys.exit(0)
+    if '--benchmark-startup' in sys.argv:
+        # Time import + app construction in fresh interpreters, then exit
+        benchmark = benchmark_startup()
+        print(f"Import {benchmark['import_ms']} ms, create_web_api {benchmark['create_app_ms']} ms, "
+              f"total {benchmark['total_ms']} ms")
+        sys.exit(0)
+    if '--benchmark-resources' in sys.argv:
+        # Compare cached resource memory against the DataFrames they replaced, then exit
+        benchmark = WebSchedulingSystem().benchmark_resource_memory()
+        for row in benchmark['results']:
+            print(f"{row['option']:>12} ({row['rows']:>6} rows): table {row['table_bytes']:>10} B, "
+                  f"DataFrame {row['dataframe_bytes']:>10} B")
+        sys.exit(0)
+    
     # Create and run the web application
     app = create_web_api()
     print("Starting Web Scheduling System...")